@@ -0,0 +1,209 @@
+"""
+Measures the fetch and export paths against the local mock HCRA server.
+
+Scenarios:
+- get_builder_detail / get_umbrella_detail: one call per ID from `--concurrency` threads sharing
+  one API; reports throughput and per-call latency percentiles
+- master_csv / master_xlsx / master_sql / master_parquet: save_multiple_to_master_* over all IDs;
+  reports throughput. With --processes they run through an ExportPipeline with that many
+  worker processes
+
+Every (scenario, size) runs in a fresh interpreter, so the reported peak RSS belongs to that
+run alone. The mock server runs in this process and counts the requests it served. Results are
+printed (or written with --output) as JSON; --compare prints the change against an earlier
+result file.
+
+Usage:
+    python benchmarks/bench_client.py --sizes 10,1000 --latency 0.005 --output results.json
+    python benchmarks/bench_client.py --sizes 10,1000 --compare results.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from mock_server import MockConfig, MockServer, builder_ids, umbrella_ids  # noqa: E402
+
+SCENARIOS = (
+    "get_builder_detail",
+    "get_umbrella_detail",
+    "master_csv",
+    "master_xlsx",
+    "master_sql",
+    "master_parquet",
+)
+
+# Optional dependency each scenario needs, if any.
+REQUIRES = {"master_xlsx": "openpyxl", "master_parquet": "pyarrow"}
+
+
+def peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_one(scenario: str, size: int, base_url: str, workers: int, concurrency: int, processes: int = None) -> dict:
+    """
+    Runs one scenario in this process and returns its measurements.
+    """
+    from hcraontario import Hcraontario
+
+    module = REQUIRES.get(scenario)
+    if module:
+        try:
+            __import__(module)
+        except ImportError:
+            return {"skipped": f"{module} is not installed"}
+
+    is_umbrella = scenario == "get_umbrella_detail"
+    ids = umbrella_ids(size) if is_umbrella else builder_ids(size)
+    baseline_mb = peak_rss_mb()
+    result = {}
+
+    with tempfile.TemporaryDirectory() as directory, Hcraontario.API(base_url=base_url, max_workers=workers) as api:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            if scenario.startswith("get_"):
+                fetch = api.get_umbrella_detail if is_umbrella else api.get_builder_detail
+
+                def timed(ID):
+                    call_start = time.perf_counter()
+                    fetch(ID)
+                    return time.perf_counter() - call_start
+
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    latencies = list(pool.map(timed, ids))
+                result["latency_ms"] = {
+                    "mean": statistics.mean(latencies) * 1000,
+                    "p50": percentile(latencies, 0.50) * 1000,
+                    "p95": percentile(latencies, 0.95) * 1000,
+                    "p99": percentile(latencies, 0.99) * 1000,
+                }
+            else:
+                exporter = getattr(api, "save_multiple_to_" + scenario)
+                exporter(ids, directory=directory, processes=processes)
+            seconds = time.perf_counter() - start
+
+    result.update({
+        "seconds": seconds,
+        "ids_per_sec": size / seconds,
+        "baseline_rss_mb": baseline_mb,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def run_isolated(scenario: str, size: int, server: MockServer, args) -> dict:
+    before = server.stats.snapshot()
+    command = [
+        sys.executable, os.path.abspath(__file__), "--run", scenario, str(size),
+        "--base-url", server.base_url, "--workers", str(args.workers), "--concurrency", str(args.concurrency),
+    ]
+    if args.processes is not None:
+        command += ["--processes", str(args.processes)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    after = server.stats.snapshot()
+    served = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+    result["http"] = {key: count for key, count in served.items() if not key.startswith("path:") and count}
+    requests = sum(result["http"].values())
+    if "seconds" in result:
+        result["requests"] = requests
+        result["requests_per_sec"] = requests / result["seconds"]
+    return result
+
+
+def compare(current: dict, previous: dict) -> None:
+    baseline = {(r["scenario"], r["ids"]): r for r in previous["results"]}
+    print(f"{'scenario':<22}{'ids':>7}{'ids/s':>12}{'change':>9}{'peak MB':>10}{'change':>9}")
+    for result in current["results"]:
+        old = baseline.get((result["scenario"], result["ids"]))
+        if "ids_per_sec" not in result or not old or "ids_per_sec" not in old:
+            continue
+        speed = result["ids_per_sec"] / old["ids_per_sec"] - 1
+        memory = result["peak_rss_mb"] / old["peak_rss_mb"] - 1
+        print(f"{result['scenario']:<22}{result['ids']:>7}{result['ids_per_sec']:>12,.1f}{speed:>+9.1%}"
+              f"{result['peak_rss_mb']:>10.1f}{memory:>+9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma-separated numbers of IDs")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--workers", type=int, default=16, help="API(max_workers=...)")
+    parser.add_argument("--concurrency", type=int, default=8, help="caller threads in the get_* scenarios")
+    parser.add_argument("--processes", type=int, help="worker processes of the master_* exports")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mock server random extra latency")
+    parser.add_argument("--records", type=int, default=10, help="records per list section")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of HTTP 429 responses")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--run", nargs=2, metavar=("SCENARIO", "SIZE"), help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        scenario, size = args.run
+        print(json.dumps(run_one(scenario, int(size), args.base_url, args.workers, args.concurrency, args.processes)))
+        return
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    scenarios = [scenario for scenario in args.scenarios.split(",") if scenario]
+    unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {unknown}; expected some of {list(SCENARIOS)}")
+
+    config = MockConfig(latency=args.latency, jitter=args.jitter, records=args.records,
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("run", "base_url", "output", "compare")},
+        "results": [],
+    }
+    with MockServer(config) as server:
+        for size in sizes:
+            for scenario in scenarios:
+                result = {"scenario": scenario, "ids": size, **run_isolated(scenario, size, server, args)}
+                report["results"].append(result)
+                summary = (f"{result['ids_per_sec']:,.1f} IDs/s, peak {result['peak_rss_mb']:.1f} MB"
+                           if "ids_per_sec" in result else result.get("skipped") or result.get("error"))
+                print(f"{scenario:<22}{size:>7} IDs: {summary}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures the cold import time of hcraontario.Hcraontario and guards against regressions.
+
+Every run imports the module in a fresh interpreter, so nothing is shared between runs. The
+script also checks that importing the core pulls in none of the heavy optional dependencies
+(pandas, numpy, pyarrow, openpyxl, aiohttp, multiprocessing, ...); those must only load when a feature needs them.
+It exits with status 1 if a heavy module is imported or the median exceeds --max-ms (150ms
+unless given; 0 disables the check), so it can run as a CI gate.
+
+Usage:
+    python benchmarks/bench_import.py --runs 15 --max-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Modules that must stay out of a plain `import hcraontario.Hcraontario`.
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "openpyxl", "aiohttp", "requests", "asyncio", "orjson", "multiprocessing")
+
+# Budget for the median import time, with headroom for slow CI machines.
+DEFAULT_MAX_MS = 150.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import hcraontario.Hcraontario
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once():
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15, help="number of fresh interpreters to time")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS, help="fail if the median import time exceeds this (0 disables)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    # The first run writes the bytecode cache; it is not representative of later imports
+    measure_once()
+    runs = [measure_once() for _ in range(args.runs)]
+    times = sorted(run["ms"] for run in runs)
+    loaded = sorted({module for run in runs for module in run["loaded"]})
+    results = {
+        "runs": args.runs,
+        "median_ms": statistics.median(times),
+        "min_ms": times[0],
+        "max_ms": times[-1],
+        "heavy_modules_loaded": loaded,
+    }
+
+    failures = []
+    if loaded:
+        failures.append(f"heavy modules imported eagerly: {', '.join(loaded)}")
+    if args.max_ms and results["median_ms"] > args.max_ms:
+        failures.append(f"median import time {results['median_ms']:.1f}ms exceeds {args.max_ms:.1f}ms")
+    results["ok"] = not failures
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"import hcraontario.Hcraontario: median {results['median_ms']:.1f}ms "
+              f"(min {results['min_ms']:.1f}ms, max {results['max_ms']:.1f}ms, {args.runs} runs)")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
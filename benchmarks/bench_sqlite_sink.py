@@ -0,0 +1,91 @@
+"""
+Compares master SQLite write throughput before and after SQLiteSink.
+
+"before" reproduces the original save_multiple_to_master_sql write path: one DataFrame and one
+to_sql(if_exists='append') call per ID and section, and a commit per ID. "after" writes the same
+records through SQLiteSink. No network is involved; records are synthetic.
+
+Usage:
+    python benchmarks/bench_sqlite_sink.py --ids 2000 --rows 10
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from hcraontario.Hcraontario import BUILDER_ENDPOINTS  # noqa: E402
+from hcraontario.sinks import SQLiteSink  # noqa: E402
+
+
+def make_records(id, section, rows):
+    return [
+        {
+            "builderNum": id,
+            "section": section,
+            "row": n,
+            "name": f"{section} record {n}",
+            "amount": n * 1.5,
+            "status": "Active" if n % 2 else "Closed",
+            "source_id": id,
+        }
+        for n in range(rows)
+    ]
+
+
+def before(db_path, ids, rows):
+    import pandas as pd
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for id in ids:
+            for section in BUILDER_ENDPOINTS:
+                df = pd.DataFrame(make_records(id, section, rows))
+                df.to_sql(f"builder_{section}", conn, if_exists="append", index=False)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def after(db_path, ids, rows):
+    sink = SQLiteSink(db_path)
+    try:
+        for id in ids:
+            for section in BUILDER_ENDPOINTS:
+                sink.write(f"builder_{section}", make_records(id, section, rows))
+            sink.commit_point()
+    finally:
+        sink.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ids", type=int, default=1000, help="number of IDs to write")
+    parser.add_argument("--rows", type=int, default=10, help="rows per ID and section")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    ids = [f"B{n}" for n in range(args.ids)]
+    total_rows = args.ids * args.rows * len(BUILDER_ENDPOINTS)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, writer in (("before", before), ("after", after)):
+            start = time.perf_counter()
+            writer(os.path.join(directory, f"{name}.db"), ids, args.rows)
+            elapsed = time.perf_counter() - start
+            results[name] = {"seconds": elapsed, "rows": total_rows, "rows_per_sec": total_rows / elapsed}
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    for name, result in results.items():
+        print(f"{name:>6}: {result['rows']} rows in {result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} rows/sec)")
+    print(f"speedup: {results['before']['seconds'] / results['after']['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
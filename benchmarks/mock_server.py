@@ -0,0 +1,283 @@
+"""
+Local stand-in for the HCRA API, for benchmarks and offline experiments.
+
+Implements /api/builders (paginated search), the eight builder* detail endpoints and the five
+umbrella* detail endpoints. Payloads are synthetic but deterministic per ID, so repeated runs
+see the same data. Latency, payload size and error rates are configurable.
+
+Usage:
+    python benchmarks/mock_server.py --port 8000 --latency 0.05 --records 20 --error-rate 0.01
+    # then: Hcraontario.API(base_url="http://127.0.0.1:8000/api")
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BUILDER_PATHS = (
+    "buildersummary",
+    "builderPDOs",
+    "builderConvictions",
+    "builderConditions",
+    "builderMembers",
+    "builderProperties",
+    "builderEnrolments",
+    "builderCondoProjects",
+)
+
+UMBRELLA_PATHS = (
+    "umbrellaSummary",
+    "umbrellaProperties",
+    "umbrellaMembers",
+    "umbrellaCondoProjects",
+    "umbrellaEnrolments",
+)
+
+CITIES = ("Toronto", "Ottawa", "Mississauga", "Hamilton", "London", "Barrie", "Kingston", "Windsor")
+STATUSES = ("Licensed", "Licensed", "Licensed", "Expired", "Revoked", "Suspended")
+
+
+class MockConfig:
+    """
+    Behaviour of the mock server. Attributes may be changed while it runs.
+
+    - latency: Seconds added to every response.
+    - jitter: Random extra latency, uniformly up to this many seconds.
+    - records: Records per list section; the large properties/enrolments sections get 5x as many.
+    - builders: Number of builders the search endpoint pages through.
+    - page_size: Builders per search page.
+    - error_rate: Fraction of requests answered with HTTP 500.
+    - throttle_rate: Fraction of requests answered with HTTP 429 and a Retry-After header.
+    - retry_after: Seconds sent in Retry-After.
+    - envelope: Wrap search pages in {"data": [...], "totalPages": n} instead of a bare list.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, records: int = 10, builders: int = 1000,
+                 page_size: int = 20, error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: float = 0.1,
+                 envelope: bool = False) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.records = records
+        self.builders = builders
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.envelope = envelope
+
+
+class MockStats:
+    """
+    Thread-safe request counters of a running server. last_headers holds the headers of the
+    most recent request.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.last_headers = {}
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+def _rng(*parts) -> random.Random:
+    seed = hashlib.sha256("/".join(map(str, parts)).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(seed[:8], "big"))
+
+
+def _builder_id(n: int) -> str:
+    return f"B{10000 + n}"
+
+
+def _umbrella_id(n: int) -> str:
+    return str(12000000 + n)
+
+
+def search_page(config: MockConfig, page: int) -> list:
+    start = (page - 1) * config.page_size
+    return [
+        {
+            "ACCOUNTNUMBER": _builder_id(n),
+            "NAME": f"Builder {n} Homes Inc.",
+            "CITY": CITIES[n % len(CITIES)],
+            "LICENSESTATUS": STATUSES[n % len(STATUSES)],
+            "UMBRELLA_ID": _umbrella_id(n % 97),
+        }
+        for n in range(start, min(start + config.page_size, config.builders))
+    ]
+
+
+def detail(config: MockConfig, path: str, ID: str):
+    rng = _rng(path, ID)
+    if path in ("buildersummary", "umbrellaSummary"):
+        return {
+            "ID": ID,
+            "NAME": f"{'Umbrella' if path.startswith('umbrella') else 'Builder'} {ID}",
+            "CITY": rng.choice(CITIES),
+            "LICENSESTATUS": rng.choice(STATUSES),
+            "YEARSACTIVE": rng.randint(0, 40),
+            "PHONE": f"416-555-{rng.randint(0, 9999):04d}",
+        }
+    if path == "builderMembers":
+        return [{"UMBRELLA_ID": _umbrella_id(int(ID.lstrip("B") or 0) % 97), "NAME": f"Umbrella {ID}"}]
+    if path == "umbrellaMembers":
+        return [{"ACCOUNTNUMBER": _builder_id(rng.randint(0, 9999)), "NAME": "Member builder"} for _ in range(3)]
+
+    count = config.records * (5 if path.endswith(("Properties", "Enrolments")) else 1)
+    return [
+        {
+            "RECORDID": f"{ID}-{path}-{n}",
+            "ADDRESS": f"{rng.randint(1, 9999)} Main Street",
+            "CITY": rng.choice(CITIES),
+            "ENROLMENTDATE": f"20{rng.randint(10, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "UNITS": rng.randint(1, 400),
+            "PRICE": round(rng.uniform(300000, 2500000), 2),
+            "WARRANTY": rng.random() < 0.8,
+        }
+        for n in range(count)
+    ]
+
+
+def make_handler(config: MockConfig, stats: MockStats):
+    detail_paths = set(BUILDER_PATHS) | set(UMBRELLA_PATHS)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; with Nagle's algorithm every keep-alive
+        # response would stall on the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            path = url.path.rstrip("/").rsplit("/", 1)[-1]
+            stats.last_headers = {key.lower(): value for key, value in self.headers.items()}
+
+            delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+            if delay:
+                time.sleep(delay)
+
+            roll = random.random()
+            if roll < config.throttle_rate:
+                stats.add("429")
+                return self.__send(429, b"", {"Retry-After": str(config.retry_after)})
+            if roll < config.throttle_rate + config.error_rate:
+                stats.add("500")
+                return self.__send(500, b"<html>Internal Server Error</html>", {"Content-Type": "text/html"})
+
+            if path == "builders":
+                body = search_page(config, int(params.get("page", 1)))
+                if config.envelope:
+                    body = {"data": body, "totalPages": -(-config.builders // config.page_size)}
+            elif path in detail_paths and "id" in params:
+                body = detail(config, path, params["id"])
+            else:
+                stats.add("404")
+                return self.__send(404, b"[]", {"Content-Type": "application/json"})
+
+            data = json.dumps(body).encode("utf-8")
+            etag = '"%s"' % hashlib.md5(data).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                stats.add("304")
+                return self.__send(304, b"", {"ETag": etag})
+            stats.add("200")
+            stats.add(f"path:{path}")
+            self.__send(200, data, {"Content-Type": "application/json", "ETag": etag})
+
+        def __send(self, status: int, data: bytes, headers: dict) -> None:
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if data:
+                self.wfile.write(data)
+
+    return Handler
+
+
+class MockServer:
+    """
+    Runs the mock HCRA API on a background thread.
+
+    Example:
+        with MockServer(MockConfig(latency=0.01)) as server:
+            api = Hcraontario.API(base_url=server.base_url)
+    """
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 1024
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def builder_ids(count: int) -> list:
+    return [_builder_id(n) for n in range(count)]
+
+
+def umbrella_ids(count: int) -> list:
+    return [_umbrella_id(n) for n in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency in seconds")
+    parser.add_argument("--records", type=int, default=10, help="records per list section")
+    parser.add_argument("--builders", type=int, default=1000, help="builders returned by the search")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of HTTP 429 responses")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.records, args.builders,
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    server = MockServer(config, args.host, args.port)
+    print(f"Mock HCRA API listening on {server.base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,13 @@ setup(
     description="The `hcraontario-api` is designed for seamless interaction with the hcraontario.ca API",
     long_description=open("README.md").read(),
     long_description_content_type="text/markdown",
-    install_requires=["requests", "pandas", "os", "sqlite3"],
-    python_requires=">=3.6",
+    install_requires=["requests"],
+    extras_require={
+        "async": ["aiohttp"],
+        "parquet": ["pyarrow"],
+        "pandas": ["pandas", "openpyxl"],
+        "excel": ["openpyxl"],
+        "fast": ["orjson"],
+    },
+    python_requires=">=3.7",
 )
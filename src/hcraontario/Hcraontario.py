@@ -1,158 +1,126 @@
-import requests
-import pandas as pd
-import sqlite3
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-class API:
-    def __init__(self) -> None:
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "authority": "obd.hcraontario.ca",
-                "accept": "application/json, text/plain, */*",
-                "accept-language": "es-ES,es;q=0.8",
-                "referer": "https://obd.hcraontario.ca",
-                "sec-ch-ua": '"Not A(Brand";v="99", "Brave";v="121", "Chromium";v="121"',
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": '"Windows"',
-                "sec-fetch-dest": "empty",
-                "sec-fetch-mode": "cors",
-                "sec-fetch-site": "same-origin",
-                "sec-gpc": "1",
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            }
-        )
+import functools
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-    def search_builder(
-        self,
-        builderName: str = None,
-        builderLocation: str = None,
-        builderNum: str = None,
-        officerDirector: str = None,
-        umbrellaCo: str = None,
-        licenceStatus: str = None,
-        yearsActive: str = None,
-    ) -> list:
-        """
-        Performs a search for builders based on various criteria.
+from .cache import ResponseCache
+from .crawler import RegistryCrawler
+from .metrics import NULL_METRICS, Metrics
+from .records import loads, section_digest, tag_records
+from .scheduler import RequestScheduler, SingleFlight
+from .sinks import CSVSink, ParquetSink, SQLiteSink, XLSXSink, write_parquet_file
+from .snapshots import JSONLChangeFeed, SnapshotStore
+from .transport import RecordReplayTransport, RequestsTransport, Response
 
-        Parameters:
-        - builderName (str): Name of the builder (optional).
-        - builderLocation (str): Location of the builder (optional).
-        - builderNum (str): Number of the builder (optional).
-        - officerDirector (str): Name of the officer or director (optional).
-        - umbrellaCo (str): Umbrella company (optional).
-        - licenceStatus (str): License status (optional).
-        - yearsActive (str): Years of activity (optional).
+BASE_URL = "https://obd.hcraontario.ca/api"
 
-        Returns:
-        - A list of dictionaries, where each dictionary represents a match with the search criteria.
-        """
-        params = {
-            "builderName": builderName,
-            "builderLocation": builderLocation,
-            "builderNum": builderNum,
-            "officerDirector": officerDirector,
-            "umbrellaCo": umbrellaCo,
-            "licenceStatus": licenceStatus,
-            "yearsActive": yearsActive,
-            "page": "1",
-        }
+DEFAULT_HEADERS = {
+    "authority": "obd.hcraontario.ca",
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "es-ES,es;q=0.8",
+    "referer": "https://obd.hcraontario.ca",
+    "sec-ch-ua": '"Not A(Brand";v="99", "Brave";v="121", "Chromium";v="121"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Windows"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "sec-gpc": "1",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+}
 
-        response = self.session.get(
-            "https://obd.hcraontario.ca/api/builders", params=params
-        )
+# Endpoint paths relative to BASE_URL, keyed by the section name they are returned under.
+BUILDER_ENDPOINTS = {
+    "summary": "buildersummary",
+    "PDOs": "builderPDOs",
+    "convictions": "builderConvictions",
+    "conditions": "builderConditions",
+    "members": "builderMembers",
+    "properties": "builderProperties",
+    "enrolments": "builderEnrolments",
+    "condoProjects": "builderCondoProjects",
+}
 
-        return response.json()
+UMBRELLA_ENDPOINTS = {
+    "summary": "umbrellaSummary",
+    "properties": "umbrellaProperties",
+    "members": "umbrellaMembers",
+    "condoProjects": "umbrellaCondoProjects",
+    "enrolments": "umbrellaEnrolments",
+}
 
-    def get_builder_detail(self, ID: str) -> dict:
-        """
-        Retrieves comprehensive details for a specific builder using its ID.
+def _select_endpoints(endpoints: dict, sections) -> dict:
+    """
+    Restricts an endpoint mapping to the requested sections, keeping the mapping's order.
+    None selects every section.
+    """
+    if sections is None:
+        return endpoints
+    if isinstance(sections, str):
+        sections = [sections]
+    unknown = [section for section in sections if section not in endpoints]
+    if unknown:
+        raise ValueError(f"Unknown sections {unknown}; expected some of {list(endpoints)}")
+    return {key: path for key, path in endpoints.items() if key in sections}
 
-        Parameters:
-        - ID (str): The unique identifier for the builder.
 
-        Returns:
-        - A dictionary with all relevant information about the builder, including:
-            * 'summary': Summary of the builder.
-            * 'PDOs': Development projects.
-            * 'convictions': Legal convictions.
-            * 'conditions': Conditions.
-            * 'members': Members.
-            * 'properties': Properties.
-            * 'enrolments': Enrolments.
-            * 'condoProjects': Condo projects.
+def _load_pandas():
+    """
+    Imports pandas on first use, so that importing this module stays fast. Returns None when
+    pandas is not installed; callers then fall back to the standard library writers.
+    """
+    try:
+        import pandas
+    except ImportError:
+        return None
+    return pandas
 
-        The function utilizes ThreadPoolExecutor for concurrent HTTP GET requests to various endpoints,
-        improving efficiency and reducing overall execution time by parallelizing network I/O operations.
-        """
-        self.ID = ID  # Makes ID available throughout the instance
-        urls = {
-            "summary": "https://obd.hcraontario.ca/api/buildersummary",
-            "PDOs": "https://obd.hcraontario.ca/api/builderPDOs",
-            "convictions": "https://obd.hcraontario.ca/api/builderConvictions",
-            "conditions": "https://obd.hcraontario.ca/api/builderConditions",
-            "members": "https://obd.hcraontario.ca/api/builderMembers",
-            "properties": "https://obd.hcraontario.ca/api/builderProperties",
-            "enrolments": "https://obd.hcraontario.ca/api/builderEnrolments",
-            "condoProjects": "https://obd.hcraontario.ca/api/builderCondoProjects",
-        }
 
-        data = {}
-        with ThreadPoolExecutor() as executor:
-            # Submits all fetch_url tasks to the ThreadPoolExecutor for concurrent execution.
-            futures = {
-                executor.submit(self.__fetch_url, item): item for item in urls.items()
-            }
-            for future in as_completed(futures):
-                # As each future completes, extracts and stores the result using the key in the data dictionary.
-                key, result = future.result()
-                data[key] = result
+def _export_stage(exporter: str, stage: str = "write"):
+    """
+    Decorator timing a whole export method as one stage in the instance's metrics.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(stage, exporter):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
-        return data
-    #NEW ALL
-    def get_umbrella_detail(self, ID: str) -> dict:
-        """
-        Retrieves comprehensive details for a specific umbrella company using its ID.
 
-        Parameters:
-        - ID (str): The unique identifier for the umbrella company.
+def _error_reason(error: Exception) -> str:
+    """
+    Short label describing why a request failed, used as the metrics error reason.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code:
+        return f"http_{status_code}"
+    return type(error.__cause__ or error).__name__
 
-        Returns:
-        - A dictionary with all relevant information about the umbrella company, including:
-            * 'summary': Summary of the umbrella company.
-            * 'properties': Properties under the umbrella company.
-            * 'members': Member builders of the umbrella company.
-            * 'condoProjects': Condo projects under the umbrella company.
-            * 'enrolments': Enrolments under the umbrella company.
 
-        The function utilizes ThreadPoolExecutor for concurrent HTTP GET requests to various endpoints,
-        improving efficiency and reducing overall execution time by parallelizing network I/O operations.
-        """
-        self.ID = ID  # Makes ID available throughout the instance
-        urls = {
-            "summary": "https://obd.hcraontario.ca/api/umbrellaSummary",
-            "properties": "https://obd.hcraontario.ca/api/umbrellaProperties",
-            "members": "https://obd.hcraontario.ca/api/umbrellaMembers",  # Corrected URL
-            "condoProjects": "https://obd.hcraontario.ca/api/umbrellaCondoProjects",
-            "enrolments": "https://obd.hcraontario.ca/api/umbrellaEnrolments",
-        }
+def _json_body(response) -> bytes:
+    """
+    Returns a response body without decoding it. Bodies that clearly are not JSON, such as HTML
+    error pages, raise ValueError, so the scheduler retries them like bodies that fail to decode.
+    """
+    head = response.content[:64].lstrip()
+    if not head or head[:1] not in b'[{"-0123456789tfn':
+        raise ValueError("Response body is not JSON")
+    return response.content
 
-        data = {}
-        with ThreadPoolExecutor() as executor:
-            # Submits all fetch_url tasks to the ThreadPoolExecutor for concurrent execution.
-            futures = {
-                executor.submit(self.__fetch_url, item): item for item in urls.items()
-            }
-            for future in as_completed(futures):
-                # As each future completes, extracts and stores the result using the key in the data dictionary.
-                key, result = future.result()
-                data[key] = result
 
-        return data
-    #END NEW
+class _Exporters:
+    """
+    Export helpers shared by API and AsyncAPI. They only work on data that has already been fetched.
+    """
+
     #START NEW SAVE FUNCTIONALITY
+    @_export_stage("csv")
     def save_to_csv(self, data, base_filename: str, ID: str, directory: str = "") -> None:
         """
         Saves API results to CSV files.
@@ -163,26 +131,34 @@ class API:
         - ID: Identifier for the file naming
         - directory: Optional directory path for saving files
         """
-        import os
+        pd = _load_pandas()
+        
+        def write_csv(records, filename):
+            if pd is not None:
+                pd.DataFrame(records).to_csv(filename, index=False)
+            else:
+                # Pure standard library path when pandas is not installed
+                sink = CSVSink(filename)
+                sink.write("data", records)
+                sink.close()
         
         if isinstance(data, list):
-            df = pd.DataFrame(data)
             filename = f"{base_filename}_{ID}.csv"
             if directory:
                 filename = os.path.join(directory, filename)
-            df.to_csv(filename, index=False)
+            write_csv(data, filename)
             print(f"Saved search results to {filename}")
             
         elif isinstance(data, dict):
             for key, value in data.items():
                 if value:  # Only save if there's data
-                    df = pd.DataFrame(value)
                     filename = f"{base_filename}_{ID}_{key}.csv"
                     if directory:
                         filename = os.path.join(directory, filename)
-                    df.to_csv(filename, index=False)
+                    write_csv(value if isinstance(value, list) else [value], filename)
                     print(f"Saved {key} data to {filename}")
 
+    @_export_stage("xlsx")
     def save_to_xlsx(self, data, filename: str, ID: str, directory: str = "") -> None:
         """
         Saves API results to a single Excel file with multiple sheets.
@@ -197,6 +173,21 @@ class API:
         if directory:
             filepath = os.path.join(directory, filepath)
 
+        pd = _load_pandas()
+        if pd is None:
+            # Without pandas, write the workbook directly with openpyxl
+            sink = XLSXSink(filepath)
+            if isinstance(data, list):
+                sink.write('Search_Results', data)
+            elif isinstance(data, dict):
+                for key, value in data.items():
+                    if isinstance(value, (list, dict)) and value:
+                        sink.write(key, value if isinstance(value, list) else [value])
+            for key, (sheet_name, count) in sink.close().items():
+                print(f"Saved {key} data to sheet '{sheet_name}'")
+            print(f"Excel file saved as: {filepath}")
+            return
+
         with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
             if isinstance(data, list):
                 df = pd.DataFrame(data)
@@ -224,6 +215,7 @@ class API:
 
         print(f"Excel file saved as: {filepath}")
 
+    @_export_stage("sql")
     def save_to_sql(self, data, db_name: str, ID: str, directory: str = "") -> None:
         """
         Saves API results to a SQLite database.
@@ -238,259 +230,1477 @@ class API:
         if directory:
             db_path = os.path.join(directory, db_path)
 
-        conn = sqlite3.connect(db_path)
+        sink = SQLiteSink(db_path)
 
         try:
             if isinstance(data, list):
-                df = pd.DataFrame(data)
                 table_name = 'search_results'
-                df.to_sql(table_name, conn, if_exists='replace', index=False)
+                sink.drop_table(table_name)
+                sink.write(table_name, data)
+                sink.flush()
                 print(f"Saved search results to table '{table_name}'")
             
             elif isinstance(data, dict):
                 for key, value in data.items():
                     if value:
                         try:
-                            if isinstance(value, list):
-                                df = pd.DataFrame(value)
-                            elif isinstance(value, dict):
-                                df = pd.DataFrame([value])
-                            else:
+                            if isinstance(value, dict):
+                                value = [value]
+                            elif not isinstance(value, list):
                                 print(f"Skipping {key}: Unsupported data type")
                                 continue
                             
-                            if not df.empty:
-                                table_name = ''.join(c if c.isalnum() else '_' for c in key)
-                                df.to_sql(table_name, conn, if_exists='replace', index=False)
-                                print(f"Saved {key} data to table '{table_name}'")
+                            table_name = ''.join(c if c.isalnum() else '_' for c in key)
+                            sink.drop_table(table_name)
+                            sink.write(table_name, value)
+                            sink.flush()
+                            print(f"Saved {key} data to table '{table_name}'")
                         except Exception as e:
                             print(f"Error saving {key}: {str(e)}")
 
         finally:
-            conn.close()
+            sink.close()
 
         print(f"SQLite database saved as: {db_path}")
 
+    @_export_stage("parquet")
+    def save_to_parquet(self, data, base_filename: str, ID: str, directory: str = "", compression: str = "zstd") -> None:
+        """
+        Saves API results to compressed Parquet files. Requires the optional `pyarrow` dependency.
+
+        Parameters:
+        - data: The data to save (list or dict)
+        - base_filename: Base name for the Parquet file
+        - ID: Identifier for the file naming
+        - directory: Optional directory path for saving files
+        - compression: Parquet compression codec (optional)
+        """
+        if isinstance(data, list):
+            filename = os.path.join(directory, f"{base_filename}_{ID}.parquet")
+            write_parquet_file(filename, data, compression)
+            print(f"Saved search results to {filename}")
+
+        elif isinstance(data, dict):
+            for key, value in data.items():
+                if value:  # Only save if there's data
+                    filename = os.path.join(directory, f"{base_filename}_{ID}_{key}.parquet")
+                    write_parquet_file(filename, value if isinstance(value, list) else [value], compression)
+                    print(f"Saved {key} data to {filename}")
+
     #END NEW SAVE FUNCTIONALITY
 
     #START NEW MASTER LIST SAVE
-    def save_multiple_to_master_csv(self, ids: list, is_umbrella: bool = False, directory: str = "") -> None:
+    def _write_master_csv(self, results, ids: list, is_umbrella: bool = False, directory: str = "") -> None:
         """
-        Saves data for multiple builders or umbrella companies to consolidated CSV files.
-        Creates one CSV file per data type, containing data from all IDs.
-        
-        Parameters:
-        - ids: List of builder or umbrella IDs to process
-        - is_umbrella: Set to True for umbrella companies, False for builders
-        - directory: Optional directory path for saving files
+        Writes the (ID, data) pairs produced by fetch_many to the master CSV output.
+        Shared by the synchronous and asynchronous clients; see save_multiple_to_master_csv.
         """
         
+        total = len(ids)
         type_label = "umbrella" if is_umbrella else "builder"
-        # Dictionary to store combined data for each data type
-        combined_data = {}
+        # Records are streamed to disk per data type as each ID arrives
+        sink = CSVSink(os.path.join(directory, f"{type_label}_{{section}}_master.csv"))
         
-        for idx, id in enumerate(ids):
-            print(f"Processing {type_label} ID {id} ({idx+1}/{len(ids)})...")
-            
-            try:
-                # Get the data depending on whether it's a builder or umbrella
-                if is_umbrella:
-                    data = self.get_umbrella_detail(id)
-                else:
-                    data = self.get_builder_detail(id)
-                
-                # Combine data by data type
-                for key, value in data.items():
-                    if value:
-                        if key not in combined_data:
-                            combined_data[key] = []
-                        
-                        # Ensure we're working with a list of records
-                        if isinstance(value, list):
-                            # Add ID to each record
-                            for item in value:
-                                if isinstance(item, dict):  # Make sure it's a dict before adding ID
-                                    item['source_id'] = id
-                            combined_data[key].extend(value)
-                        elif isinstance(value, dict):
-                            value['source_id'] = id
-                            combined_data[key].append(value)
-            
-            except Exception as e:
-                print(f"Error processing ID {id}: {str(e)}")
-        
-        # Save all combined data to CSV files
-        for key, data_list in combined_data.items():
-            if data_list:
-                df = pd.DataFrame(data_list)
-                filename = f"{type_label}_{key}_master.csv"
-                if directory:
-                    filename = os.path.join(directory, filename)
-                df.to_csv(filename, index=False)
-                print(f"Saved combined {key} data ({len(data_list)} records) to {filename}")
-        
-        print(f"Completed processing {len(ids)} {type_label} IDs into master CSV files.")
+        try:
+            self.__stream_to_sink(results, sink, total, type_label, "master_csv")
+        finally:
+            with self.metrics.stage("finalize", "master_csv"):
+                written = sink.close()
+        
+        for key, (filename, count) in written.items():
+            print(f"Saved combined {key} data ({count} records) to {filename}")
+        
+        print(f"Completed processing {total} {type_label} IDs into master CSV files.")
     
-    def save_multiple_to_master_xlsx(self, ids: list, is_umbrella: bool = False, directory: str = "") -> None:
+    def _write_master_xlsx(self, results, ids: list, is_umbrella: bool = False, directory: str = "") -> None:
         """
-        Saves data for multiple builders or umbrella companies to a single Excel file.
-        Each data type becomes a separate sheet in the master Excel file.
-        
-        Parameters:
-        - ids: List of builder or umbrella IDs to process
-        - is_umbrella: Set to True for umbrella companies, False for builders
-        - directory: Optional directory path for saving files
+        Writes the (ID, data) pairs produced by fetch_many to the master Excel output.
+        Shared by the synchronous and asynchronous clients; see save_multiple_to_master_xlsx.
         """
         
+        total = len(ids)
         type_label = "umbrella" if is_umbrella else "builder"
-        # Dictionary to store combined data for each data type
-        combined_data = {}
+        filename = os.path.join(directory, f"{type_label}_master.xlsx")
+        # Records are spooled to disk per data type as each ID arrives
+        sink = XLSXSink(filename)
         
-        for idx, id in enumerate(ids):
-            print(f"Processing {type_label} ID {id} ({idx+1}/{len(ids)})...")
-            
-            try:
-                # Get the data depending on whether it's a builder or umbrella
-                if is_umbrella:
-                    data = self.get_umbrella_detail(id)
-                else:
-                    data = self.get_builder_detail(id)
-                
-                # Combine data by data type
-                for key, value in data.items():
-                    if value:
-                        if key not in combined_data:
-                            combined_data[key] = []
-                        
-                        # Ensure we're working with a list of records
-                        if isinstance(value, list):
-                            # Add ID to each record
-                            for item in value:
-                                if isinstance(item, dict):
-                                    item['source_id'] = id
-                            combined_data[key].extend(value)
-                        elif isinstance(value, dict):
-                            value['source_id'] = id
-                            combined_data[key].append(value)
-            
-            except Exception as e:
-                print(f"Error processing ID {id}: {str(e)}")
+        try:
+            self.__stream_to_sink(results, sink, total, type_label, "master_xlsx")
+        finally:
+            with self.metrics.stage("finalize", "master_xlsx"):
+                written = sink.close()
         
-        # Create master Excel file with all data
-        if combined_data:
-            filename = f"{type_label}_master.xlsx"
-            if directory:
-                filename = os.path.join(directory, filename)
-                
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                for key, data_list in combined_data.items():
-                    if data_list:
-                        df = pd.DataFrame(data_list)
-                        # Excel has a 31 character limit for sheet names
-                        sheet_name = key[:31]
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        print(f"Saved combined {key} data ({len(data_list)} records) to sheet '{sheet_name}'")
-            
+        if written:
+            for key, (sheet_name, count) in written.items():
+                print(f"Saved combined {key} data ({count} records) to sheet '{sheet_name}'")
             print(f"Master Excel file saved as: {filename}")
         else:
             print("No data was collected to save to Excel.")
         
-        print(f"Completed processing {len(ids)} {type_label} IDs into master Excel file.")
+        print(f"Completed processing {total} {type_label} IDs into master Excel file.")
     
-    def save_multiple_to_master_sql(self, ids: list, is_umbrella: bool = False, db_name: str = "master_database", directory: str = "") -> None:
+    def _write_master_parquet(self, results, ids: list, is_umbrella: bool = False, directory: str = "", partition_by: str = None, row_group_size: int = 50000) -> None:
         """
-        Saves data for multiple builders or umbrella companies to a single SQLite database.
-        Creates one table per data type, containing data from all IDs.
-        
-        Parameters:
-        - ids: List of builder or umbrella IDs to process
-        - is_umbrella: Set to True for umbrella companies, False for builders
-        - db_name: Name for the master database file
-        - directory: Optional directory path for saving the database
+        Writes the (ID, data) pairs produced by fetch_many to the master Parquet datasets.
+        Shared by the synchronous and asynchronous clients; see save_multiple_to_master_parquet.
         """
         
+        total = len(ids)
         type_label = "umbrella" if is_umbrella else "builder"
+        root = os.path.join(directory, f"{type_label}_master_parquet")
+        # Records are written as row groups per data type while IDs stream in
+        sink = ParquetSink(root, partition_by=partition_by, row_group_size=row_group_size)
         
-        # Create database path
-        db_path = f"{db_name}.db"
-        if directory:
-            db_path = os.path.join(directory, db_path)
+        try:
+            self.__stream_to_sink(results, sink, total, type_label, "master_parquet")
+        finally:
+            with self.metrics.stage("finalize", "master_parquet"):
+                written = sink.close()
         
-        # Create connection to SQLite database
-        conn = sqlite3.connect(db_path)
+        for key, (dataset, count) in written.items():
+            print(f"Saved combined {key} data ({count} records) to {dataset}")
+        
+        print(f"Completed processing {total} {type_label} IDs into master Parquet datasets.")
+    
+    def __stream_to_sink(self, results, sink, total: int, type_label: str, exporter: str) -> None:
+        """
+        Writes the records of each ID to a sink as soon as the ID has been fetched.
+        """
+        for idx, (id, data) in enumerate(self.metrics.timed(results, "fetch", exporter)):
+            if isinstance(data, Exception):
+                print(f"Error processing ID {id}: {str(data)}")
+                continue
+
+            print(f"Processed {type_label} ID {id} ({idx+1}/{total})")
+            with self.metrics.stage("write", exporter):
+                for key, records in self._tag_records(id, data).items():
+                    sink.write(key, records)
+
+    def _write_master_sql(self, results, ids: list, is_umbrella: bool = False, db_name: str = "master_database", directory: str = "", resume: bool = False) -> None:
+        """
+        Writes the (ID, data) pairs produced by fetch_many to the master SQLite database.
+        Shared by the synchronous and asynchronous clients; see save_multiple_to_master_sql.
+        """
+        
+        total = len(ids)
+        type_label = "umbrella" if is_umbrella else "builder"
+        db_path = self._master_sql_path(db_name, directory)
+        
+        # Rows are batched across IDs and committed in large transactions
+        sink = SQLiteSink(db_path)
         
         try:
-            # Create a master table to track all processed IDs
-            master_df = pd.DataFrame({"id": ids, "processed": False, "type": type_label})
-            master_df.to_sql("source_ids", conn, if_exists='append', index=False)
+            self.__ensure_sync_tables(sink.conn)
+            if not resume:
+                # Register all IDs in the master table that tracks processed IDs
+                with sink.conn:
+                    sink.conn.executemany(
+                        "INSERT INTO source_ids (id, processed, type) VALUES (?, 0, ?)",
+                        [(id, type_label) for id in ids],
+                    )
             
-            for idx, id in enumerate(ids):
-                print(f"Processing {type_label} ID {id} ({idx+1}/{len(ids)})...")
-                
-                try:
-                    # Get the data depending on whether it's a builder or umbrella
-                    if is_umbrella:
-                        data = self.get_umbrella_detail(id)
+            for idx, (id, data) in enumerate(self.metrics.timed(results, "fetch", "master_sql")):
+                if isinstance(data, Exception):
+                    print(f"Error processing ID {id}: {str(data)}")
+                    continue
+
+                print(f"Processed {type_label} ID {id} ({idx+1}/{total})")
+                with self.metrics.stage("write", "master_sql"):
+                    if resume:
+                        # Only rewrite the sections whose content changed since the last sync
+                        self.__sync_sections(sink, type_label, id, data)
                     else:
-                        data = self.get_builder_detail(id)
-                    
-                    # Process each data type and save to a table
-                    for key, value in data.items():
-                        if value:
-                            try:
-                                # Convert to DataFrame and add source_id
-                                if isinstance(value, list):
-                                    # Add ID to each record
-                                    for item in value:
-                                        if isinstance(item, dict):
-                                            item['source_id'] = id
-                                    df = pd.DataFrame(value)
-                                elif isinstance(value, dict):
-                                    value['source_id'] = id
-                                    df = pd.DataFrame([value])
-                                else:
-                                    print(f"Skipping {key} for ID {id}: Unsupported data type")
-                                    continue
-                                
-                                if not df.empty:
-                                    # Create a clean table name
-                                    table_name = f"{type_label}_{key}"
-                                    table_name = ''.join(c if c.isalnum() else '_' for c in table_name)
-                                    
-                                    # Append to existing table or create new one
-                                    df.to_sql(table_name, conn, if_exists='append', index=False)
-                                    print(f"Saved {key} data for ID {id} to table '{table_name}'")
-                            except Exception as e:
-                                print(f"Error saving {key} for ID {id}: {str(e)}")
+                        for key, records in self._tag_records(id, data).items():
+                            sink.write(self.__master_table_name(type_label, key), records)
                     
-                    # Mark this ID as processed
-                    cursor = conn.cursor()
-                    cursor.execute("UPDATE source_ids SET processed = 1 WHERE id = ?", (id,))
-                    conn.commit()
-                    
-                except Exception as e:
-                    print(f"Error processing ID {id}: {str(e)}")
+                    # Mark this ID as processed in the same transaction as its rows
+                    sink.execute(
+                        "UPDATE source_ids SET processed = 1, processed_at = ? WHERE id = ? AND type = ?",
+                        (time.time(), id, type_label),
+                    )
+                    sink.commit_point()
             
         finally:
-            conn.close()
+            with self.metrics.stage("finalize", "master_sql"):
+                written = sink.close()
+        
+        for table_name, count in written.items():
+            print(f"Saved {count} rows to table '{table_name}'")
+        print(f"Master database saved as: {db_path}")
+
+    def _write_registry_sql(self, crawler, db_name: str = "master_database", directory: str = "") -> None:
+        """
+        Runs a RegistryCrawler into the master SQLite database. The frontier tables live in the
+        same database, so the rows of an ID and its completion are checkpointed together.
+        See save_registry_to_master_sql.
+        """
+        
+        db_path = self._master_sql_path(db_name, directory)
+        sink = SQLiteSink(db_path)
+        
+        try:
+            self.__ensure_sync_tables(sink.conn)
+            
+            for idx, (type_label, id, data) in enumerate(self.metrics.timed(crawler.crawl(sink), "fetch", "registry_sql")):
+                if isinstance(data, Exception):
+                    print(f"Error processing {type_label} ID {id}: {str(data)}")
+                    continue
+
+                print(f"Processed {type_label} ID {id} ({idx+1} crawled)")
+                with self.metrics.stage("write", "registry_sql"):
+                    # Rewriting only changed sections keeps a re-fetched ID idempotent
+                    self.__sync_sections(sink, type_label, id, data)
+                    sink.execute("DELETE FROM source_ids WHERE id = ? AND type = ?", (id, type_label))
+                    sink.execute(
+                        "INSERT INTO source_ids (id, processed, type, processed_at) VALUES (?, 1, ?, ?)",
+                        (id, type_label, time.time()),
+                    )
+                    sink.commit_point()
+            
+            counts = crawler.frontier.counts()
+        finally:
+            with self.metrics.stage("finalize", "registry_sql"):
+                written = sink.close()
         
+        for table_name, count in written.items():
+            print(f"Saved {count} rows to table '{table_name}'")
+        for type_label, states in counts.items():
+            print(f"Crawled {type_label} IDs: {states}")
         print(f"Master database saved as: {db_path}")
+
+    def _write_change_feed(self, results, ids: list, is_umbrella: bool = False, db_name: str = "snapshots", directory: str = "", jsonl_filename: str = None, record_keys: dict = None, batch_size: int = 500) -> dict:
+        """
+        Diffs the (ID, data) pairs produced by fetch_many against the snapshot store and writes
+        the changes to the change feed. Shared by the synchronous and asynchronous clients; see
+        save_multiple_to_change_feed.
+        """
+        
+        total = len(ids)
+        type_label = "umbrella" if is_umbrella else "builder"
+        store = SnapshotStore(self._master_sql_path(db_name, directory), record_keys=record_keys)
+        feed = None
+        if jsonl_filename:
+            feed = JSONLChangeFeed(os.path.join(directory, jsonl_filename))
+        counts = {"added": 0, "removed": 0, "modified": 0}
+        
+        def checkpoint():
+            # The JSONL file is flushed first: a crash in between repeats changes, never loses them
+            if feed is not None:
+                feed.flush()
+            store.commit()
+        
+        try:
+            for idx, (id, data) in enumerate(self.metrics.timed(results, "fetch", "change_feed")):
+                if isinstance(data, Exception):
+                    print(f"Error processing ID {id}: {str(data)}")
+                    continue
+
+                with self.metrics.stage("write", "change_feed"):
+                    changes = store.diff(type_label, id, data)
+                    if feed is not None:
+                        feed.write(changes)
+                    for change in changes:
+                        counts[change["change"]] += 1
+                    if (idx + 1) % batch_size == 0:
+                        checkpoint()
+                print(f"Processed {type_label} ID {id} ({idx+1}/{total}): {len(changes)} changes")
+            checkpoint()
+        finally:
+            with self.metrics.stage("finalize", "change_feed"):
+                store.close()
+                if feed is not None:
+                    feed.close()
+        
+        print(f"Changes: {counts['added']} added, {counts['removed']} removed, {counts['modified']} modified")
+        print(f"Snapshot database saved as: {store.path}")
+        if feed is not None:
+            print(f"Change feed appended to: {feed.path}")
+        return counts
+
+    def _pending_master_sql_ids(self, ids: list, is_umbrella: bool = False, db_name: str = "master_database", directory: str = "", stale_after: float = None) -> list:
+        """
+        Registers IDs in the source_ids table of a master database and returns the ones that still
+        need to be fetched: IDs never processed, and processed IDs older than stale_after seconds.
+        """
+        import sqlite3
+
+        type_label = "umbrella" if is_umbrella else "builder"
+        conn = sqlite3.connect(self._master_sql_path(db_name, directory))
+        try:
+            self.__ensure_sync_tables(conn)
+
+            # Earlier non-resumable runs may have registered an ID several times
+            last_processed = {}
+            for id, processed, processed_at in conn.execute(
+                "SELECT id, processed, processed_at FROM source_ids WHERE type = ?", (type_label,)
+            ):
+                if processed:
+                    last_processed[id] = max(processed_at or 0, last_processed.get(id) or 0)
+                else:
+                    last_processed.setdefault(id, None)
+
+            unique_ids = list(dict.fromkeys(ids))
+            conn.executemany(
+                "INSERT INTO source_ids (id, processed, type) VALUES (?, 0, ?)",
+                [(id, type_label) for id in unique_ids if id not in last_processed],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        cutoff = time.time() - stale_after if stale_after is not None else None
+        pending = [
+            id for id in unique_ids
+            if last_processed.get(id) is None or (cutoff is not None and last_processed[id] < cutoff)
+        ]
+        print(f"Skipping {len(unique_ids) - len(pending)} {type_label} IDs already synced; {len(pending)} to fetch.")
+        return pending
+
+    def _master_sql_path(self, db_name: str, directory: str) -> str:
+        # Create database path
+        db_path = f"{db_name}.db"
+        if directory:
+            db_path = os.path.join(directory, db_path)
+        return db_path
+
+    def __master_table_name(self, type_label: str, key: str) -> str:
+        # Create a clean table name
+        table_name = f"{type_label}_{key}"
+        return ''.join(c if c.isalnum() else '_' for c in table_name)
+
+    def __ensure_sync_tables(self, conn) -> None:
+        """
+        Creates the bookkeeping tables used by resumable syncs, upgrading a source_ids table
+        written by an earlier non-resumable run.
+        """
+        conn.execute("CREATE TABLE IF NOT EXISTS source_ids (id TEXT, processed INTEGER, type TEXT, processed_at REAL)")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(source_ids)")]
+        if "processed_at" not in columns:
+            conn.execute("ALTER TABLE source_ids ADD COLUMN processed_at REAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS section_hashes (
+                id TEXT,
+                type TEXT,
+                section TEXT,
+                hash TEXT,
+                updated_at REAL,
+                PRIMARY KEY (id, type, section)
+            )
+            """
+        )
+        conn.commit()
+
+    def __sync_sections(self, sink: SQLiteSink, type_label: str, id: str, data: dict) -> None:
+        """
+        Replaces the rows of every section of one ID whose content hash changed since the last
+        sync, and removes the rows of sections that are now empty.
+        """
+        tagged = self._tag_records(id, data)
+        # Sections prepared by a pipeline worker come with their hashes
+        digests = getattr(data, "digests", None) or {key: section_digest(id, data[key]) for key in tagged}
+        stored = dict(
+            sink.conn.execute(
+                "SELECT section, hash FROM section_hashes WHERE id = ? AND type = ?", (id, type_label)
+            ).fetchall()
+        )
+
+        for key in list(tagged) + [key for key in stored if key not in tagged]:
+            records = tagged.get(key)
+            digest = digests.get(key) if records else None
+            if digest == stored.get(key):
+                continue
+
+            table_name = self.__master_table_name(type_label, key)
+            # Queued deletes run before the batch's inserts, so old rows never survive new ones
+            if sink.has_table(table_name):
+                sink.execute(f'DELETE FROM "{table_name}" WHERE source_id = ?', (id,))
+            if records:
+                sink.write(table_name, records)
+                sink.execute(
+                    "INSERT OR REPLACE INTO section_hashes VALUES (?, ?, ?, ?, ?)",
+                    (id, type_label, key, digest, time.time()),
+                )
+                print(f"Updated {key} data for ID {id} in table '{table_name}'")
+            else:
+                sink.execute(
+                    "DELETE FROM section_hashes WHERE id = ? AND type = ? AND section = ?",
+                    (id, type_label, key),
+                )
+                print(f"Removed {key} data for ID {id} from table '{table_name}'")
     #END NEW MASTER LIST SAVE
-    #END NEW ALL
-    def __fetch_url(self, item):
+
+    def _tag_records(self, ID: str, data: dict) -> dict:
         """
-        Helper function to perform concurrent HTTP GET requests.
+        Normalizes the result of a detail call into record batches tagged with their source ID.
+        See records.tag_records.
+        """
+        return tag_records(ID, data)
 
+
+class API(_Exporters):
+    """
+    Synchronous client of the HCRA API.
+
+    An instance is safe to share across threads: every call carries its own request context,
+    and all of them share one connection pool and one worker pool. Concurrent calls for the same
+    endpoint and parameters are coalesced into a single request.
+    """
+
+    def __init__(self, max_workers: int = 16, base_url: str = BASE_URL, cache: ResponseCache = None, scheduler: RequestScheduler = None, metrics: Metrics = None, coalesce: bool = True, transport=None) -> None:
+        """
         Parameters:
-        - item (tuple): A tuple containing the key and the URL for the request.
+        - max_workers (int): Size of the worker pool shared by every request made through this
+          instance. This is the global limit on concurrent HTTP requests (optional).
+        - base_url (str): Root of the HCRA API, e.g. to point the client at a local server (optional).
+        - cache (ResponseCache): Response cache consulted before every request (optional).
+        - scheduler (RequestScheduler): Rate limiting, adaptive concurrency and retry policy
+          (optional, defaults to retries and adaptive concurrency up to max_workers, no rate limit).
+        - metrics (Metrics): Recorder for request and exporter metrics (optional, disabled by default).
+        - coalesce (bool): Share one in-flight request between concurrent callers asking for the
+          same endpoint and parameters (optional).
+        - transport: HTTP transport every request is sent with, e.g. a RequestsTransport with
+          custom pool and timeout settings or a RecordReplayTransport (optional, defaults to a
+          RequestsTransport pooling max_workers connections).
+        """
+        self.max_workers = max_workers
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=max_workers)
+        self.metrics = metrics or NULL_METRICS
+        self.flights = SingleFlight() if coalesce else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.transport = transport or RequestsTransport(pool_maxsize=max_workers)
 
-        Returns:
-        - A tuple containing the key and the JSON result of the request.
+        # The default headers are set on the session once, so that callers can override any of
+        # them on api.session; only transports without a session get them with every request
+        requests_transport = self.__requests_transport()
+        self._headers = DEFAULT_HEADERS if requests_transport is None else {}
+        if requests_transport is not None:
+            explicit = {key.lower() for key in requests_transport.headers}
+            for key, value in DEFAULT_HEADERS.items():
+                if key not in explicit:
+                    requests_transport.session.headers[key] = value
+
+    @property
+    def session(self):
         """
-        key, url = item
-        params = {"id": self.ID}
-        response = self.session.get(url, params=params)
-        return key, response.json()
+        The requests.Session requests are sent with, e.g. to set headers or proxies. Available
+        when the transport is a RequestsTransport, or a RecordReplayTransport wrapping one.
+        """
+        requests_transport = self.__requests_transport()
+        if requests_transport is None:
+            raise AttributeError(f"{type(self.transport).__name__} has no requests session")
+        return requests_transport.session
+
+    def __requests_transport(self):
+        """
+        Returns the RequestsTransport requests go through, or None for other transports.
+        """
+        transport = self.transport
+        if isinstance(transport, RecordReplayTransport):
+            transport = transport.transport
+        return transport if isinstance(transport, RequestsTransport) else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shuts down the shared worker pool and closes the HTTP transport.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.transport.close()
+
+    def search_builder(
+        self,
+        builderName: str = None,
+        builderLocation: str = None,
+        builderNum: str = None,
+        officerDirector: str = None,
+        umbrellaCo: str = None,
+        licenceStatus: str = None,
+        yearsActive: str = None,
+        page: int = 1,
+    ) -> list:
+        """
+        Performs a search for builders based on various criteria.
+
+        Parameters:
+        - builderName (str): Name of the builder (optional).
+        - builderLocation (str): Location of the builder (optional).
+        - builderNum (str): Number of the builder (optional).
+        - officerDirector (str): Name of the officer or director (optional).
+        - umbrellaCo (str): Umbrella company (optional).
+        - licenceStatus (str): License status (optional).
+        - yearsActive (str): Years of activity (optional).
+        - page (int): Results page to fetch, starting at 1 (optional).
+
+        Returns:
+        - A list of dictionaries, where each dictionary represents a match with the search criteria.
+        """
+        params = self.__search_params(
+            builderName,
+            builderLocation,
+            builderNum,
+            officerDirector,
+            umbrellaCo,
+            licenceStatus,
+            yearsActive,
+        )
+
+        return self.__get_json("builders", {**params, "page": str(page)})
+
+    def iter_search_builder(
+        self,
+        builderName: str = None,
+        builderLocation: str = None,
+        builderNum: str = None,
+        officerDirector: str = None,
+        umbrellaCo: str = None,
+        licenceStatus: str = None,
+        yearsActive: str = None,
+        prefetch: int = 3,
+        max_pages: int = None,
+    ):
+        """
+        Walks every page of a builder search, yielding matches as each page arrives.
+
+        Takes the same search criteria as search_builder. While a page is being consumed, up to
+        `prefetch` following pages are already being requested over the shared session, so at most
+        `prefetch` pages are ever held in memory. Pages are yielded in order.
+
+        Parameters:
+        - prefetch (int): Number of pages requested ahead of the page being consumed (optional).
+        - max_pages (int): Stop after this many pages (optional).
+
+        Yields:
+        - One dictionary per builder matching the search criteria.
+        """
+        params = self.__search_params(
+            builderName,
+            builderLocation,
+            builderNum,
+            officerDirector,
+            umbrellaCo,
+            licenceStatus,
+            yearsActive,
+        )
+        if max_pages is not None and max_pages <= 0:
+            return
+        prefetch = max(1, prefetch)
+        pending = deque()
+        next_page = 1
+        page_size = None
+        total_pages = max_pages
+
+        executor = self._get_executor()
+
+        def submit_until_full():
+            nonlocal next_page
+            while len(pending) < prefetch and (total_pages is None or next_page <= total_pages):
+                pending.append(
+                    (next_page, executor.submit(self.__fetch_search_page, params, next_page))
+                )
+                next_page += 1
+
+        # The first page is fetched alone: its length tells us the page size.
+        pending.append((next_page, executor.submit(self.__fetch_search_page, params, next_page)))
+        next_page += 1
+
+        try:
+            while pending:
+                page, future = pending.popleft()
+                records, reported_pages = future.result()
+
+                if reported_pages is not None:
+                    total_pages = reported_pages if max_pages is None else min(reported_pages, max_pages)
+                if page_size is None:
+                    page_size = len(records)
+
+                # An empty page, a short page, or the reported page count marks the end.
+                last_page = (
+                    not records
+                    or len(records) < page_size
+                    or (total_pages is not None and page >= total_pages)
+                )
+                if not last_page:
+                    submit_until_full()
+
+                for record in records:
+                    yield record
+
+                if last_page:
+                    break
+        finally:
+            # Speculative requests past the last page are no longer needed.
+            for _, future in pending:
+                future.cancel()
+
+    def get_builder_detail(self, ID: str, sections: list = None, raw: bool = False) -> dict:
+        """
+        Retrieves comprehensive details for a specific builder using its ID.
+
+        Parameters:
+        - ID (str): The unique identifier for the builder.
+        - sections (list): Names of the sections to fetch, e.g. ["summary", "convictions"]
+          (optional, defaults to all). Only the matching endpoints are requested.
+        - raw (bool): Return every section as its undecoded JSON body (bytes), e.g. to decode it
+          in another process (optional).
+
+        Returns:
+        - A dictionary with all relevant information about the builder, including:
+            * 'summary': Summary of the builder.
+            * 'PDOs': Development projects.
+            * 'convictions': Legal convictions.
+            * 'conditions': Conditions.
+            * 'members': Members.
+            * 'properties': Properties.
+            * 'enrolments': Enrolments.
+            * 'condoProjects': Condo projects.
+
+        The requests to the individual endpoints run concurrently on the shared worker pool,
+        reducing overall execution time by parallelizing network I/O operations.
+        """
+        return self.__fetch_sections(ID, _select_endpoints(BUILDER_ENDPOINTS, sections), raw)
+
+    #NEW ALL
+    def get_umbrella_detail(self, ID: str, sections: list = None, raw: bool = False) -> dict:
+        """
+        Retrieves comprehensive details for a specific umbrella company using its ID.
+
+        Parameters:
+        - ID (str): The unique identifier for the umbrella company.
+        - sections (list): Names of the sections to fetch, e.g. ["summary", "members"]
+          (optional, defaults to all). Only the matching endpoints are requested.
+        - raw (bool): Return every section as its undecoded JSON body (bytes), e.g. to decode it
+          in another process (optional).
+
+        Returns:
+        - A dictionary with all relevant information about the umbrella company, including:
+            * 'summary': Summary of the umbrella company.
+            * 'properties': Properties under the umbrella company.
+            * 'members': Member builders of the umbrella company.
+            * 'condoProjects': Condo projects under the umbrella company.
+            * 'enrolments': Enrolments under the umbrella company.
+
+        The requests to the individual endpoints run concurrently on the shared worker pool,
+        reducing overall execution time by parallelizing network I/O operations.
+        """
+        return self.__fetch_sections(ID, _select_endpoints(UMBRELLA_ENDPOINTS, sections), raw)
+
+    def builder(self, ID: str, prefetch: list = None) -> "BuilderRecord":
+        """
+        Returns a lazy BuilderRecord whose sections are fetched on first access.
+
+        Parameters:
+        - ID (str): The unique identifier for the builder.
+        - prefetch (list): Sections to fetch right away, concurrently (optional).
+        """
+        return BuilderRecord(self, ID, prefetch)
+
+    def umbrella(self, ID: str, prefetch: list = None) -> "UmbrellaRecord":
+        """
+        Returns a lazy UmbrellaRecord whose sections are fetched on first access.
+
+        Parameters:
+        - ID (str): The unique identifier for the umbrella company.
+        - prefetch (list): Sections to fetch right away, concurrently (optional).
+        """
+        return UmbrellaRecord(self, ID, prefetch)
+
+    def fetch_many(self, ids: list, is_umbrella: bool = False, max_ids_in_flight: int = None, sections: list = None):
+        """
+        Fetches the details of many builders or umbrella companies on the shared worker pool.
+
+        Every (ID, endpoint) pair is an independent task on one long-lived pool, so the number of
+        concurrent HTTP requests is bounded by max_workers across all IDs rather than per ID.
+        Only a window of IDs is submitted at a time to keep memory bounded.
+
+        Parameters:
+        - ids: Iterable of builder or umbrella IDs to fetch
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - max_ids_in_flight: Number of IDs whose requests may be queued at once (optional,
+          defaults to enough IDs to keep every worker busy)
+        - sections: Names of the sections to fetch for every ID (optional, defaults to all)
+
+        Yields:
+        - A tuple (ID, data) as soon as every endpoint for that ID has completed, in completion
+          order. data is the same dictionary get_builder_detail/get_umbrella_detail returns, or
+          the exception raised while fetching it.
+        """
+        endpoints = _select_endpoints(UMBRELLA_ENDPOINTS if is_umbrella else BUILDER_ENDPOINTS, sections)
+        if not endpoints:
+            # Nothing to request; get_builder_detail(ID, sections=[]) returns an empty dict too
+            for ID in ids:
+                yield ID, {}
+            return
+        if max_ids_in_flight is None:
+            max_ids_in_flight = 2 * max(1, self.max_workers // len(endpoints)) + 1
+
+        executor = self._get_executor()
+        pending_ids = iter(ids)
+        done = queue.Queue()
+        in_flight = {}  # ticket -> [ID, futures by section, endpoints remaining]
+        tickets = itertools.count()
+
+        def submit_next() -> bool:
+            for ID in pending_ids:
+                ticket = next(tickets)
+                futures = {}
+                in_flight[ticket] = [ID, futures, len(endpoints)]
+                for item in endpoints.items():
+                    future = executor.submit(self.__fetch_url, item, ID)
+                    future.add_done_callback(lambda _, ticket=ticket: done.put(ticket))
+                    futures[item[0]] = future
+                return True
+            return False
+
+        for _ in range(max(1, max_ids_in_flight)):
+            if not submit_next():
+                break
+
+        try:
+            while in_flight:
+                ticket = done.get()
+                state = in_flight[ticket]
+                state[2] -= 1
+                if state[2]:
+                    continue
+
+                ID, futures, _ = in_flight.pop(ticket)
+                try:
+                    data = {key: future.result()[1] for key, future in futures.items()}
+                except Exception as e:
+                    data = e
+                submit_next()
+                yield ID, data
+        finally:
+            for _, futures, _ in in_flight.values():
+                for future in futures.values():
+                    future.cancel()
+
+    #END NEW
+    def save_multiple_to_master_csv(self, ids: list, is_umbrella: bool = False, directory: str = "", processes: int = None) -> None:
+        """
+        Saves data for multiple builders or umbrella companies to consolidated CSV files.
+        Creates one CSV file per data type, containing data from all IDs.
+        
+        Parameters:
+        - ids: List of builder or umbrella IDs to process
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - directory: Optional directory path for saving files
+        - processes: Worker processes that decode and normalize the responses while the
+          threads keep fetching (optional); see ExportPipeline. Output is in input order
+        """
+        self._write_master_csv(
+            self.__export_results(ids, is_umbrella, processes, "batch"), ids, is_umbrella, directory
+        )
+
+    def save_multiple_to_master_xlsx(self, ids: list, is_umbrella: bool = False, directory: str = "", processes: int = None) -> None:
+        """
+        Saves data for multiple builders or umbrella companies to a single Excel file.
+        Each data type becomes a separate sheet in the master Excel file.
+        
+        Parameters:
+        - ids: List of builder or umbrella IDs to process
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - directory: Optional directory path for saving files
+        - processes: Worker processes that decode and normalize the responses while the
+          threads keep fetching (optional); see ExportPipeline. Output is in input order
+        """
+        self._write_master_xlsx(
+            self.__export_results(ids, is_umbrella, processes, "batch"), ids, is_umbrella, directory
+        )
+
+    def save_multiple_to_master_sql(self, ids: list, is_umbrella: bool = False, db_name: str = "master_database", directory: str = "", resume: bool = False, stale_after: float = None, processes: int = None) -> None:
+        """
+        Saves data for multiple builders or umbrella companies to a single SQLite database.
+        Creates one table per data type, containing data from all IDs.
+        
+        Parameters:
+        - ids: List of builder or umbrella IDs to process
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - db_name: Name for the master database file
+        - directory: Optional directory path for saving the database
+        - resume: Sync incrementally instead of appending. IDs already marked processed in the
+          source_ids table are skipped, and for the others only the sections whose content hash
+          changed are rewritten, so an interrupted or repeated run picks up where it left off
+        - stale_after: With resume, seconds after which a processed ID is fetched again (optional)
+        - processes: Worker processes that decode and normalize the responses while the
+          threads keep fetching (optional); see ExportPipeline. Output is in input order
+        """
+        if resume:
+            ids = self._pending_master_sql_ids(ids, is_umbrella, db_name, directory, stale_after)
+        self._write_master_sql(
+            self.__export_results(ids, is_umbrella, processes, "sql", digests=resume), ids, is_umbrella, db_name, directory, resume
+        )
+
+    def save_multiple_to_master_parquet(self, ids: list, is_umbrella: bool = False, directory: str = "", partition_by: str = None, row_group_size: int = 50000, processes: int = None) -> None:
+        """
+        Saves data for multiple builders or umbrella companies to Parquet datasets.
+        Creates one typed, compressed dataset per data type under `<type>_master_parquet/`,
+        containing data from all IDs. Requires the optional `pyarrow` dependency.
+        
+        Parameters:
+        - ids: List of builder or umbrella IDs to process
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - directory: Optional directory path for saving the datasets
+        - partition_by: Optional Hive-style partitioning, "source_id" or "snapshot_date"
+        - row_group_size: Rows buffered per data type before a row group is written
+        - processes: Worker processes that decode and normalize the responses while the
+          threads keep fetching (optional); see ExportPipeline. Output is in input order
+        """
+        # Per-ID partitions split the records again, so workers only build Arrow tables otherwise
+        prepare = "batch" if partition_by == "source_id" else "arrow"
+        self._write_master_parquet(
+            self.__export_results(ids, is_umbrella, processes, prepare), ids, is_umbrella, directory, partition_by, row_group_size
+        )
+
+    def __export_results(self, ids: list, is_umbrella: bool, processes: int, prepare: str, digests: bool = False):
+        """
+        Returns the (ID, data) pairs a master exporter writes: from fetch_many, or from an
+        ExportPipeline when worker processes were requested.
+        """
+        if processes is None:
+            return self.fetch_many(ids, is_umbrella=is_umbrella)
+        from .pipeline import ExportPipeline
+
+        return ExportPipeline(self, processes=processes, prepare=prepare, digests=digests).run(ids, is_umbrella)
+
+    def save_multiple_to_change_feed(self, ids: list, is_umbrella: bool = False, db_name: str = "snapshots", directory: str = "", jsonl_filename: str = None, record_keys: dict = None, sections: list = None) -> dict:
+        """
+        Compares a new fetch of multiple builders or umbrella companies with the previous snapshot
+        and records only what changed. The snapshot is kept in a SQLite database keyed by
+        (ID, section, record key) with a hash per record; every added, removed or modified record
+        is appended to its `changes` table and, optionally, to a JSONL file.
+        
+        Parameters:
+        - ids: List of builder or umbrella IDs to process
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - db_name: Name for the snapshot database file
+        - directory: Optional directory path for the database and the JSONL file
+        - jsonl_filename: Optional JSONL file the changes are appended to
+        - record_keys: Optional fields identifying a record per section, e.g.
+          {"convictions": ("CONVICTIONID",)}; see snapshots.DEFAULT_RECORD_KEYS
+        - sections: Optional sections to fetch and compare (defaults to all); the snapshot of
+          other sections is left untouched
+        
+        Returns:
+        - The number of added, removed and modified records.
+        """
+        return self._write_change_feed(
+            self.fetch_many(ids, is_umbrella=is_umbrella, sections=sections),
+            ids, is_umbrella, db_name, directory, jsonl_filename, record_keys,
+        )
+
+    def save_registry_to_master_sql(self, db_name: str = "master_database", directory: str = "", seeds: list = None, follow_members: bool = True, stale_after: float = None, checkpoint_every: int = 100) -> None:
+        """
+        Crawls the whole registry into a single SQLite database, discovering IDs instead of taking
+        a list. Builders are enumerated from every page of the seed searches; umbrella companies
+        and further builders are found through `members` sections. Progress is checkpointed in the
+        crawl_frontier and crawl_seeds tables, so an interrupted crawl resumes where it stopped
+        and never fetches an ID twice in a run.
+        
+        Parameters:
+        - db_name: Name for the master database file
+        - directory: Optional directory path for saving the database
+        - seeds: Builder searches to enumerate, as dictionaries of search_builder arguments such as
+          [{"licenceStatus": "Licensed"}, {"yearsActive": "5"}] (defaults to one unfiltered search)
+        - follow_members: Queue the umbrella companies and builders listed as members
+        - stale_after: Seconds after which crawled IDs and completed searches are crawled again
+        - checkpoint_every: Number of IDs between two checkpoints
+        """
+        crawler = RegistryCrawler(
+            self,
+            seeds=seeds,
+            follow_members=follow_members,
+            checkpoint_every=checkpoint_every,
+            stale_after=stale_after,
+        )
+        self._write_registry_sql(crawler, db_name, directory)
+    #END NEW ALL
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the worker pool shared by all requests of this instance, creating it on first use.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hcraontario"
+                )
+            return self._executor
+
+    def __fetch_sections(self, ID: str, endpoints: dict, raw: bool = False) -> dict:
+        """
+        Fetches every endpoint for a single ID concurrently on the shared worker pool.
+
+        Parameters:
+        - ID (str): The builder or umbrella ID.
+        - endpoints (dict): Mapping of section name to endpoint path.
+        - raw (bool): Return the undecoded response bodies (optional).
+
+        Returns:
+        - A dictionary mapping each section name to its JSON result.
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(self.__fetch_url, item, ID, raw) for item in endpoints.items()]
+        return dict(future.result() for future in futures)
+
+    def __fetch_url(self, item, ID: str, raw: bool = False):
+        """
+        Helper function to perform concurrent HTTP GET requests.
+
+        Parameters:
+        - item (tuple): A tuple containing the key and the endpoint path for the request.
+        - ID (str): The builder or umbrella ID to request.
+        - raw (bool): Return the undecoded response body (optional).
+
+        Returns:
+        - A tuple containing the key and the JSON result of the request.
+        """
+        key, path = item
+        return key, self.__get_json(path, {"id": ID}, raw)
+
+    def __get_json(self, path: str, params: dict, raw: bool = False):
+        """
+        Performs a GET request against an endpoint path and decodes the JSON response. Concurrent
+        calls for the same path and parameters share one request.
+        """
+        if self.flights is None:
+            return self.__request_json(path, params, raw)
+        key = ResponseCache.key(path, params) + (" raw" if raw else "")
+        return self.flights.do(key, lambda: self.__request_json(path, params, raw))
+
+    def __request_json(self, path: str, params: dict, raw: bool = False):
+        """
+        Performs one GET request against an endpoint path and decodes the JSON response, or
+        returns the body undecoded when raw is True.
+
+        The request goes through the scheduler, which applies rate limiting, adaptive concurrency
+        and retries. When a cache is configured, fresh entries are served without touching the
+        network and expired entries are revalidated with the validators the server sent with them.
+        """
+        url = f"{self.base_url}/{path}"
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.lookup(path, params)
+            if entry is not None and entry.fresh:
+                return entry.body if raw else entry.json()
+
+        headers = {**self._headers, **(entry.conditional_headers() if entry is not None else {})}
+        metrics = self.metrics
+        attempts = 0
+
+        def send():
+            nonlocal attempts
+            if attempts:
+                metrics.retry(path)
+            attempts += 1
+            metrics.request_started(path)
+            start = time.perf_counter()
+            status, size = None, 0
+            try:
+                response = self.transport.get(url, params=params, headers=headers)
+                status, size = response.status_code, len(response.content)
+                return response
+            finally:
+                metrics.request_finished(path, time.perf_counter() - start, size, status)
+
+        try:
+            response, data = self.scheduler.request(
+                send,
+                lambda response: None if response.status_code == 304 else _json_body(response) if raw else loads(response.content),
+            )
+        except Exception as e:
+            metrics.error(path, _error_reason(e))
+            raise
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated(path, params, entry)
+            return entry.body if raw else entry.json()
+
+        if self.cache is not None and response.ok:
+            self.cache.store(
+                path,
+                params,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return data
+
+    def __search_params(
+        self,
+        builderName,
+        builderLocation,
+        builderNum,
+        officerDirector,
+        umbrellaCo,
+        licenceStatus,
+        yearsActive,
+    ) -> dict:
+        """
+        Builds the query parameters shared by every page of a builder search.
+        """
+        return {
+            "builderName": builderName,
+            "builderLocation": builderLocation,
+            "builderNum": builderNum,
+            "officerDirector": officerDirector,
+            "umbrellaCo": umbrellaCo,
+            "licenceStatus": licenceStatus,
+            "yearsActive": yearsActive,
+        }
+
+    def __fetch_search_page(self, params: dict, page: int):
+        """
+        Helper function to fetch a single page of builder search results.
+
+        Parameters:
+        - params (dict): Search parameters built by __search_params.
+        - page (int): The page number to fetch.
+
+        Returns:
+        - A tuple containing the list of records on the page and the total number of pages,
+          or None when the response does not report it.
+        """
+        payload = self.__get_json("builders", {**params, "page": str(page)})
+
+        if isinstance(payload, list):
+            return payload, None
+
+        # Some responses wrap the records in an envelope together with paging information.
+        records = []
+        if isinstance(payload, dict):
+            for key in ("data", "results", "builders", "items"):
+                if isinstance(payload.get(key), list):
+                    records = payload[key]
+                    break
+            for key in ("totalPages", "pageCount", "pages", "lastPage"):
+                if isinstance(payload.get(key), int):
+                    return records, payload[key]
+        return records, None
+
+class BuilderRecord:
+    """
+    Lazy view of one builder. Each section (summary, PDOs, convictions, ...) is an attribute
+    that is fetched on first access and memoized, so only the sections actually used cost a
+    request. prefetch() loads several sections at once, concurrently.
+
+        record = api.builder("B60767", prefetch=["summary", "convictions"])
+        if record.convictions:
+            print(record.summary)
+    """
+
+    ENDPOINTS = BUILDER_ENDPOINTS
+
+    def __init__(self, api: API, ID: str, prefetch: list = None) -> None:
+        self._api = api
+        self.ID = ID
+        self._sections = {}
+        if prefetch:
+            self.prefetch(prefetch)
+
+    def __getattr__(self, name: str):
+        # Only called for attributes that are not set, i.e. sections not loaded yet
+        if name in type(self).ENDPOINTS:
+            self.prefetch([name])
+            return self._sections[name]
+        raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+    def __dir__(self):
+        return list(super().__dir__()) + list(type(self).ENDPOINTS)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(ID={self.ID!r}, loaded={list(self._sections)})"
+
+    @property
+    def loaded(self) -> list:
+        """
+        Names of the sections fetched so far.
+        """
+        return list(self._sections)
+
+    def prefetch(self, sections: list = None):
+        """
+        Fetches the given sections (all of them by default) that are not loaded yet, concurrently.
+
+        Returns:
+        - The record itself, so calls can be chained.
+        """
+        selected = _select_endpoints(type(self).ENDPOINTS, sections)
+        missing = [section for section in selected if section not in self._sections]
+        if missing:
+            data = self._fetch(missing)
+            for section in missing:
+                self._sections[section] = data[section]
+                self.__dict__[section] = data[section]
+        return self
+
+    def to_dict(self, sections: list = None) -> dict:
+        """
+        Returns the requested sections (all of them by default) as get_builder_detail would,
+        fetching whatever is not loaded yet.
+        """
+        self.prefetch(sections)
+        selected = _select_endpoints(type(self).ENDPOINTS, sections)
+        return {section: self._sections[section] for section in selected}
+
+    def _fetch(self, sections: list) -> dict:
+        return self._api.get_builder_detail(self.ID, sections=sections)
+
+
+class UmbrellaRecord(BuilderRecord):
+    """
+    Lazy view of one umbrella company; see BuilderRecord. Sections are summary, properties,
+    members, condoProjects and enrolments.
+    """
+
+    ENDPOINTS = UMBRELLA_ENDPOINTS
+
+    def _fetch(self, sections: list) -> dict:
+        return self._api.get_umbrella_detail(self.ID, sections=sections)
+
+
+class AsyncAPI(_Exporters):
+    """
+    asyncio counterpart of API. All requests share one aiohttp connection pool, and a semaphore
+    bounds how many of them are in flight, so thousands of endpoint calls can be multiplexed on
+    a single event loop. Requires the optional `aiohttp` dependency.
+    """
+
+    def __init__(self, max_concurrency: int = 64, base_url: str = BASE_URL, timeout: float = 60, cache: ResponseCache = None, scheduler: RequestScheduler = None, metrics: Metrics = None, coalesce: bool = True) -> None:
+        """
+        Parameters:
+        - max_concurrency (int): Maximum number of HTTP requests in flight at once (optional).
+        - base_url (str): Root of the HCRA API, e.g. to point the client at a local server (optional).
+        - timeout (float): Total timeout in seconds for a single request (optional).
+        - cache (ResponseCache): Response cache consulted before every request (optional).
+        - scheduler (RequestScheduler): Rate limiting, adaptive concurrency and retry policy (optional).
+        - metrics (Metrics): Recorder for request and exporter metrics (optional, disabled by default).
+        - coalesce (bool): Share one in-flight request between concurrent callers asking for the
+          same endpoint and parameters (optional).
+        """
+        self.max_concurrency = max_concurrency
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=max_concurrency)
+        self.metrics = metrics or NULL_METRICS
+        self.flights = SingleFlight() if coalesce else None
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Closes the shared connection pool.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def search_builder(
+        self,
+        builderName: str = None,
+        builderLocation: str = None,
+        builderNum: str = None,
+        officerDirector: str = None,
+        umbrellaCo: str = None,
+        licenceStatus: str = None,
+        yearsActive: str = None,
+        page: int = 1,
+    ) -> list:
+        """
+        Performs a search for builders based on various criteria. See API.search_builder.
+
+        Returns:
+        - A list of dictionaries, where each dictionary represents a match with the search criteria.
+        """
+        params = {
+            "builderName": builderName,
+            "builderLocation": builderLocation,
+            "builderNum": builderNum,
+            "officerDirector": officerDirector,
+            "umbrellaCo": umbrellaCo,
+            "licenceStatus": licenceStatus,
+            "yearsActive": yearsActive,
+            "page": str(page),
+        }
+        return await self.__get_json("builders", params)
+
+    async def get_builder_detail(self, ID: str, sections: list = None) -> dict:
+        """
+        Retrieves comprehensive details for a specific builder using its ID.
+        See API.get_builder_detail for the sections returned.
+        """
+        return await self.__fetch_sections(ID, _select_endpoints(BUILDER_ENDPOINTS, sections))
+
+    async def get_umbrella_detail(self, ID: str, sections: list = None) -> dict:
+        """
+        Retrieves comprehensive details for a specific umbrella company using its ID.
+        See API.get_umbrella_detail for the sections returned.
+        """
+        return await self.__fetch_sections(ID, _select_endpoints(UMBRELLA_ENDPOINTS, sections))
+
+    async def fetch_many(self, ids: list, is_umbrella: bool = False, max_ids_in_flight: int = None, sections: list = None):
+        """
+        Fetches the details of many builders or umbrella companies concurrently.
+
+        Parameters:
+        - ids: Iterable of builder or umbrella IDs to fetch
+        - is_umbrella: Set to True for umbrella companies, False for builders
+        - max_ids_in_flight: Number of IDs fetched at once (optional, defaults to enough IDs to
+          saturate max_concurrency)
+        - sections: Names of the sections to fetch for every ID (optional, defaults to all)
+
+        Yields:
+        - A tuple (ID, data) as soon as every endpoint for that ID has completed, in completion
+          order. data is the detail dictionary, or the exception raised while fetching it.
+        """
+        import asyncio
+
+        endpoints = _select_endpoints(UMBRELLA_ENDPOINTS if is_umbrella else BUILDER_ENDPOINTS, sections)
+        if not endpoints:
+            # Nothing to request; get_builder_detail(ID, sections=[]) returns an empty dict too
+            for ID in ids:
+                yield ID, {}
+            return
+        if max_ids_in_flight is None:
+            max_ids_in_flight = 2 * max(1, self.max_concurrency // len(endpoints)) + 1
+
+        pending_ids = iter(ids)
+        tasks = {}
+
+        def submit_next() -> bool:
+            for ID in pending_ids:
+                tasks[asyncio.ensure_future(self.__fetch_sections(ID, endpoints))] = ID
+                return True
+            return False
+
+        for _ in range(max(1, max_ids_in_flight)):
+            if not submit_next():
+                break
+
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    ID = tasks.pop(task)
+                    try:
+                        data = task.result()
+                    except Exception as e:
+                        data = e
+                    submit_next()
+                    yield ID, data
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def save_multiple_to_master_csv(self, ids: list, is_umbrella: bool = False, directory: str = "") -> None:
+        """
+        Saves data for multiple builders or umbrella companies to consolidated CSV files.
+        See API.save_multiple_to_master_csv.
+        """
+        await self.__export(self._write_master_csv, ids, is_umbrella, directory)
+
+    async def save_multiple_to_master_xlsx(self, ids: list, is_umbrella: bool = False, directory: str = "") -> None:
+        """
+        Saves data for multiple builders or umbrella companies to a single Excel file.
+        See API.save_multiple_to_master_xlsx.
+        """
+        await self.__export(self._write_master_xlsx, ids, is_umbrella, directory)
+
+    async def save_multiple_to_master_sql(self, ids: list, is_umbrella: bool = False, db_name: str = "master_database", directory: str = "", resume: bool = False, stale_after: float = None) -> None:
+        """
+        Saves data for multiple builders or umbrella companies to a single SQLite database.
+        See API.save_multiple_to_master_sql.
+        """
+        import asyncio
+
+        if resume:
+            # The resume bookkeeping reads and writes SQLite; keep it off the event loop
+            ids = await asyncio.get_running_loop().run_in_executor(
+                None, self._pending_master_sql_ids, ids, is_umbrella, db_name, directory, stale_after
+            )
+        await self.__export(self._write_master_sql, ids, is_umbrella, db_name, directory, resume)
+
+    async def save_multiple_to_master_parquet(self, ids: list, is_umbrella: bool = False, directory: str = "", partition_by: str = None, row_group_size: int = 50000) -> None:
+        """
+        Saves data for multiple builders or umbrella companies to Parquet datasets.
+        See API.save_multiple_to_master_parquet.
+        """
+        await self.__export(self._write_master_parquet, ids, is_umbrella, directory, partition_by, row_group_size)
+
+    async def save_multiple_to_change_feed(self, ids: list, is_umbrella: bool = False, db_name: str = "snapshots", directory: str = "", jsonl_filename: str = None, record_keys: dict = None, sections: list = None) -> dict:
+        """
+        Records what changed since the previous snapshot of multiple builders or umbrella
+        companies. See API.save_multiple_to_change_feed.
+        """
+        return await self.__export(
+            self._write_change_feed, ids, is_umbrella, db_name, directory, jsonl_filename, record_keys,
+            sections=sections,
+        )
+
+    def _get_session(self):
+        """
+        Returns the shared aiohttp session, creating it and its connection pool on first use.
+        """
+        import asyncio
+
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError("AsyncAPI requires aiohttp: pip install hcraontario-api[async]")
+
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                headers=DEFAULT_HEADERS,
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def __get_json(self, path: str, params: dict):
+        """
+        Performs a GET request against an endpoint path. Concurrent calls for the same path and
+        parameters share one request.
+        """
+        # aiohttp rejects None values, whereas requests silently drops them.
+        params = {key: value for key, value in params.items() if value is not None}
+        if self.flights is None:
+            return await self.__request_json(path, params)
+        return await self.flights.do_async(ResponseCache.key(path, params), lambda: self.__request_json(path, params))
+
+    async def __request_json(self, path: str, params: dict):
+        """
+        Performs one GET request against an endpoint path through the request scheduler, bounded
+        by the concurrency semaphore. Uses the response cache the same way API does; its SQLite
+        reads and writes run in the default executor so they never block the event loop.
+        """
+        import asyncio
+
+        import aiohttp
+
+        session = self._get_session()
+        loop = asyncio.get_running_loop()
+
+        entry = None
+        if self.cache is not None:
+            entry = await loop.run_in_executor(None, self.cache.lookup, path, params)
+            if entry is not None and entry.fresh:
+                return entry.json()
+
+        headers = entry.conditional_headers() if entry is not None else {}
+        metrics = self.metrics
+        attempts = 0
+
+        async def send():
+            nonlocal attempts
+            if attempts:
+                metrics.retry(path)
+            attempts += 1
+            async with self._semaphore:
+                metrics.request_started(path)
+                start = time.perf_counter()
+                status, size = None, 0
+                try:
+                    async with session.get(f"{self.base_url}/{path}", params=params, headers=headers) as response:
+                        content = await response.read()
+                        status, size = response.status, len(content)
+                        return Response(response.status, response.headers, content)
+                except aiohttp.ClientError as e:
+                    raise ConnectionError(str(e)) from e
+                finally:
+                    metrics.request_finished(path, time.perf_counter() - start, size, status)
+
+        try:
+            response, data = await self.scheduler.request_async(
+                send, lambda response: None if response.status_code == 304 else loads(response.content)
+            )
+        except Exception as e:
+            metrics.error(path, _error_reason(e))
+            raise
+        if response.status_code == 304 and entry is not None:
+            await loop.run_in_executor(None, self.cache.revalidated, path, params, entry)
+            return entry.json()
+
+        if self.cache is not None and response.status_code < 400:
+            await loop.run_in_executor(
+                None,
+                functools.partial(
+                    self.cache.store,
+                    path,
+                    params,
+                    response.content,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                ),
+            )
+        return data
+
+    async def __fetch_sections(self, ID: str, endpoints: dict) -> dict:
+        """
+        Fetches every endpoint for a single ID concurrently.
+        """
+        import asyncio
+
+        results = await asyncio.gather(
+            *(self.__get_json(path, {"id": ID}) for path in endpoints.values())
+        )
+        return dict(zip(endpoints, results))
+
+    async def __export(self, writer, ids: list, is_umbrella: bool, *args, sections: list = None):
+        """
+        Runs a master writer in a worker thread, feeding it results as they arrive so that file
+        and database writes never block the event loop.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        results = queue.Queue()
+        finished, aborted = object(), object()
+
+        def iterate_results():
+            while True:
+                result = results.get()
+                if result is finished:
+                    return
+                if result is aborted:
+                    raise RuntimeError("Export interrupted before every ID was fetched")
+                yield result
+
+        writing = loop.run_in_executor(None, writer, iterate_results(), ids, is_umbrella, *args)
+        try:
+            async for result in self.fetch_many(ids, is_umbrella=is_umbrella, sections=sections):
+                if writing.done():
+                    # The writer failed, e.g. on a missing optional dependency: stop fetching
+                    break
+                results.put(result)
+        except BaseException:
+            # Let the writer close its files, then hand the cancellation or error to the caller
+            results.put(aborted)
+            try:
+                await asyncio.shield(writing)
+            except BaseException:
+                pass
+            raise
+        results.put(finished)
+        return await writing
+
 
 '''
 #Example usage of added functionality:
@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .records import loads
+
+# Default time-to-live in seconds per endpoint path. Summaries and search results change rarely
+# within a day; the large listing endpoints are refreshed less often still.
+DEFAULT_TTLS = {
+    "builders": 6 * 3600,
+    "buildersummary": 24 * 3600,
+    "umbrellaSummary": 24 * 3600,
+    "builderConvictions": 24 * 3600,
+    "builderConditions": 24 * 3600,
+    "builderEnrolments": 3 * 24 * 3600,
+    "builderProperties": 3 * 24 * 3600,
+    "umbrellaEnrolments": 3 * 24 * 3600,
+    "umbrellaProperties": 3 * 24 * 3600,
+}
+
+
+class CacheEntry:
+    """
+    A cached response body together with the validators needed to revalidate it.
+    """
+
+    __slots__ = ("body", "etag", "last_modified", "stored_at", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, last_modified: str, stored_at: float, expires_at: float) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def json(self):
+        """
+        Decodes the cached body. A new object is returned on every call, so callers may mutate it.
+        """
+        return loads(self.body)
+
+    def conditional_headers(self) -> dict:
+        """
+        Returns the If-None-Match/If-Modified-Since headers to revalidate this entry with.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Two-level HTTP response cache: an in-memory LRU in front of an optional SQLite file.
+
+    Entries are keyed by endpoint path and query parameters. Each endpoint has its own TTL;
+    once an entry expires it is kept so that it can be revalidated with its ETag/Last-Modified
+    validators instead of being downloaded again.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 1024, ttls: dict = None, default_ttl: float = 3600) -> None:
+        """
+        Parameters:
+        - path (str): SQLite file used as the persistent store. Without it, only the in-memory
+          LRU is used (optional).
+        - max_entries (int): Number of entries kept in the in-memory LRU (optional).
+        - ttls (dict): Time-to-live in seconds per endpoint path, merged over DEFAULT_TTLS (optional).
+        - default_ttl (float): Time-to-live for endpoints missing from ttls (optional).
+        """
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0}
+
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL,
+                    expires_at REAL
+                )
+                """
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def key(endpoint: str, params: dict) -> str:
+        """
+        Builds the cache key for an endpoint path and its query parameters. Parameters set to
+        None are not sent by the HTTP clients, so they are ignored here as well.
+        """
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)
+        return endpoint + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def lookup(self, endpoint: str, params: dict):
+        """
+        Returns the CacheEntry for a request, fresh or expired, or None if nothing is cached.
+        A fresh entry counts as a hit; anything else counts as a miss.
+        """
+        key = self.key(endpoint, params)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT body, etag, last_modified, stored_at, expires_at FROM responses WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    entry = CacheEntry(*row)
+                    self.__remember(key, entry)
+
+            if entry is not None and entry.fresh:
+                self._stats["hits"] += 1
+            else:
+                self._stats["misses"] += 1
+            return entry
+
+    def store(self, endpoint: str, params: dict, body: bytes, etag: str = None, last_modified: str = None) -> None:
+        """
+        Stores a response body with its validators.
+        """
+        now = time.time()
+        entry = CacheEntry(bytes(body), etag, last_modified, now, now + self.ttl(endpoint))
+        self.__save(self.key(endpoint, params), endpoint, entry)
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def revalidated(self, endpoint: str, params: dict, entry: CacheEntry) -> None:
+        """
+        Marks an expired entry as fresh again after the server answered 304 Not Modified.
+        """
+        now = time.time()
+        entry = CacheEntry(entry.body, entry.etag, entry.last_modified, now, now + self.ttl(endpoint))
+        self.__save(self.key(endpoint, params), endpoint, entry)
+        with self._lock:
+            self._stats["revalidated"] += 1
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss/revalidation/store counters and the hit ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries_in_memory"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """
+        Removes every entry from memory and from disk.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __remember(self, key: str, entry: CacheEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def __save(self, key: str, endpoint: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self.__remember(key, entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, endpoint, entry.body, entry.etag, entry.last_modified, entry.stored_at, entry.expires_at),
+                )
+                self._conn.commit()
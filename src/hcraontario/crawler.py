@@ -0,0 +1,301 @@
+import json
+import re
+import time
+from collections import deque
+
+from .sinks import SQLiteSink
+
+# Builder IDs look like "B12345"; umbrella company IDs are plain numbers.
+BUILDER_ID_PATTERN = re.compile(r"B\d+")
+UMBRELLA_ID_PATTERN = re.compile(r"\d+")
+
+# Record fields that may hold a builder or umbrella ID, compared case-insensitively and without
+# underscores. Values that match neither ID pattern are ignored. A bare "id" is not among them:
+# in records of other kinds it holds numeric row IDs that would pass for umbrella IDs.
+ID_FIELDS = (
+    "accountnumber",
+    "buildernum",
+    "builderid",
+    "umbrellaid",
+    "umbrellanum",
+    "umbrellaconum",
+)
+
+TYPE_LABELS = ("builder", "umbrella")
+
+
+def classify_id(value):
+    """
+    Returns "builder" or "umbrella" for a value that looks like an ID of that kind, else None.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        return None
+    value = str(value).strip()
+    if BUILDER_ID_PATTERN.fullmatch(value):
+        return "builder"
+    if UMBRELLA_ID_PATTERN.fullmatch(value):
+        return "umbrella"
+    return None
+
+
+def discover_ids(records, id_fields: tuple = ID_FIELDS) -> list:
+    """
+    Extracts the builder and umbrella IDs referenced by a list of records, such as search
+    results or a `members` section.
+
+    Returns:
+    - A list of (type_label, ID) tuples in first-seen order, without duplicates.
+    """
+    if isinstance(records, dict):
+        records = [records]
+    fields = {field.replace("_", "").lower() for field in id_fields}
+    found = {}
+    for record in records or ():
+        if not isinstance(record, dict):
+            continue
+        for key, value in record.items():
+            if str(key).replace("_", "").lower() not in fields:
+                continue
+            type_label = classify_id(value)
+            if type_label is not None:
+                found.setdefault((type_label, str(value).strip()), None)
+    return list(found)
+
+
+class Frontier:
+    """
+    Persistent, de-duplicating work queue of builder and umbrella IDs.
+
+    The queue itself lives in memory; every change is also written to the crawl_frontier table
+    through a SQLiteSink, so it becomes durable at the sink's next flush, in the same transaction
+    as any rows written with it. An ID enters the queue at most once per run. After a restart,
+    IDs that were queued or in flight are pending again, done IDs are skipped, and failed IDs are
+    retried until they have failed max_attempts times.
+    """
+
+    def __init__(self, sink: SQLiteSink, stale_after: float = None, max_attempts: int = 3) -> None:
+        """
+        Parameters:
+        - sink (SQLiteSink): Sink of the database holding the frontier tables.
+        - stale_after (float): Seconds after which a done ID or completed search seed is crawled
+          again (optional, never by default).
+        - max_attempts (int): Failed fetches after which an ID is no longer retried (optional).
+        """
+        self.sink = sink
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.pending = {type_label: deque() for type_label in TYPE_LABELS}
+        self._seen = set()
+        self._completed_seeds = set()
+
+        conn = sink.conn
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crawl_frontier (
+                id TEXT,
+                type TEXT,
+                state TEXT,
+                attempts INTEGER,
+                discovered_from TEXT,
+                updated_at REAL,
+                error TEXT,
+                PRIMARY KEY (id, type)
+            )
+            """
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS crawl_seeds (seed TEXT PRIMARY KEY, completed_at REAL)")
+        conn.commit()
+
+        cutoff = time.time() - stale_after if stale_after is not None else None
+        for id, type_label, state, attempts, updated_at in conn.execute(
+            "SELECT id, type, state, attempts, updated_at FROM crawl_frontier ORDER BY rowid"
+        ):
+            self._seen.add((type_label, id))
+            if state == "done" and (cutoff is None or updated_at >= cutoff):
+                continue
+            if state == "failed" and attempts >= max_attempts:
+                continue
+            self.pending[type_label].append(id)
+
+        for seed, completed_at in conn.execute("SELECT seed, completed_at FROM crawl_seeds"):
+            if cutoff is None or completed_at >= cutoff:
+                self._completed_seeds.add(seed)
+
+    def add(self, type_label: str, ID: str, discovered_from: str = None) -> bool:
+        """
+        Queues an ID unless it is already known. Returns True if it was new.
+        """
+        if (type_label, ID) in self._seen:
+            return False
+        self._seen.add((type_label, ID))
+        self.pending[type_label].append(ID)
+        self.sink.execute(
+            "INSERT OR IGNORE INTO crawl_frontier VALUES (?, ?, 'pending', 0, ?, ?, NULL)",
+            (ID, type_label, discovered_from, time.time()),
+        )
+        return True
+
+    def claim(self, type_label: str):
+        """
+        Yields pending IDs of one type, removing each from the queue as it is taken. IDs queued
+        while the iteration runs are picked up too.
+        """
+        queue = self.pending[type_label]
+        while queue:
+            yield queue.popleft()
+
+    def done(self, type_label: str, ID: str) -> None:
+        self.sink.execute(
+            "UPDATE crawl_frontier SET state = 'done', error = NULL, updated_at = ? WHERE id = ? AND type = ?",
+            (time.time(), ID, type_label),
+        )
+
+    def failed(self, type_label: str, ID: str, error: str) -> None:
+        self.sink.execute(
+            "UPDATE crawl_frontier SET state = 'failed', attempts = attempts + 1, error = ?, updated_at = ? "
+            "WHERE id = ? AND type = ?",
+            (error, time.time(), ID, type_label),
+        )
+
+    def seed_completed(self, seed: str) -> bool:
+        return seed in self._completed_seeds
+
+    def complete_seed(self, seed: str) -> None:
+        self._completed_seeds.add(seed)
+        self.sink.execute("INSERT OR REPLACE INTO crawl_seeds VALUES (?, ?)", (seed, time.time()))
+
+    def counts(self) -> dict:
+        """
+        Returns the number of IDs per type and state, as last checkpointed.
+        """
+        counts = {type_label: {} for type_label in TYPE_LABELS}
+        for type_label, state, count in self.sink.conn.execute(
+            "SELECT type, state, COUNT(*) FROM crawl_frontier GROUP BY type, state"
+        ):
+            counts.setdefault(type_label, {})[state] = count
+        return counts
+
+
+class RegistryCrawler:
+    """
+    Crawls the whole HCRA registry instead of a hand-picked list of IDs.
+
+    Builders are enumerated through every page of one or more builder searches (the seeds).
+    The `members` section of every fetched builder and umbrella company then leads to umbrella
+    companies and further builders. All IDs go through a de-duplicating Frontier, and details
+    are fetched with API.fetch_many on the API's bounded worker pool.
+
+    Progress is checkpointed to a SQLite database every `checkpoint_every` IDs, so a crawl that
+    is interrupted resumes where it stopped: completed searches are not enumerated again, and IDs
+    already fetched are not fetched again. A search interrupted halfway is enumerated again from
+    its first page; the IDs it finds are de-duplicated by the frontier.
+    """
+
+    def __init__(
+        self,
+        api,
+        db_path: str = "registry_crawl.db",
+        seeds: list = None,
+        follow_members: bool = True,
+        max_ids_in_flight: int = None,
+        checkpoint_every: int = 100,
+        stale_after: float = None,
+        max_attempts: int = 3,
+        id_fields: tuple = ID_FIELDS,
+    ) -> None:
+        """
+        Parameters:
+        - api (API): Client used for searches and detail requests.
+        - db_path (str): SQLite file holding the frontier, used when crawl() is given no sink (optional).
+        - seeds (list): Builder searches to enumerate, as dictionaries of search_builder keyword
+          arguments, e.g. [{"licenceStatus": "Licensed"}] (optional, defaults to one unfiltered search).
+        - follow_members (bool): Queue the umbrella companies and builders found in `members`
+          sections (optional).
+        - max_ids_in_flight (int): Passed to fetch_many (optional).
+        - checkpoint_every (int): Number of IDs between two checkpoints (optional).
+        - stale_after (float): Seconds after which done IDs and completed seeds are crawled again
+          (optional, never by default).
+        - max_attempts (int): Failed fetches after which an ID is given up on (optional).
+        - id_fields (tuple): Record fields searched for IDs (optional).
+        """
+        self.api = api
+        self.db_path = db_path
+        self.seeds = seeds if seeds is not None else [{}]
+        self.follow_members = follow_members
+        self.max_ids_in_flight = max_ids_in_flight
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.id_fields = id_fields
+        self.frontier = None
+
+    def crawl(self, sink: SQLiteSink = None):
+        """
+        Runs the crawl.
+
+        Parameters:
+        - sink (SQLiteSink): Sink whose database holds the frontier (optional). Statements and rows
+          the caller queues on it while handling a result are checkpointed in the same transaction
+          as that ID's completion. Without it, a sink on db_path is opened and closed here.
+
+        Yields:
+        - A tuple (type_label, ID, data) per fetched ID, where type_label is "builder" or
+          "umbrella" and data is the detail dictionary or the exception raised while fetching it.
+          An ID is marked done once the caller asks for the next result.
+        """
+        own_sink = sink is None
+        if own_sink:
+            sink = SQLiteSink(self.db_path)
+        try:
+            self.frontier = Frontier(sink, self.stale_after, self.max_attempts)
+            self.__enumerate_seeds()
+
+            fetched = 0
+            while any(self.frontier.pending.values()):
+                for type_label in TYPE_LABELS:
+                    if not self.frontier.pending[type_label]:
+                        continue
+                    results = self.api.fetch_many(
+                        self.frontier.claim(type_label),
+                        is_umbrella=type_label == "umbrella",
+                        max_ids_in_flight=self.max_ids_in_flight,
+                    )
+                    for ID, data in results:
+                        if not isinstance(data, Exception) and self.follow_members:
+                            for found_type, found_id in discover_ids(data.get("members"), self.id_fields):
+                                self.frontier.add(found_type, found_id, discovered_from=ID)
+
+                        yield type_label, ID, data
+
+                        if isinstance(data, Exception):
+                            self.frontier.failed(type_label, ID, f"{type(data).__name__}: {data}")
+                        else:
+                            self.frontier.done(type_label, ID)
+                        fetched += 1
+                        if fetched % self.checkpoint_every == 0:
+                            sink.flush()
+            sink.flush()
+        finally:
+            if own_sink:
+                sink.close()
+
+    def __enumerate_seeds(self) -> None:
+        """
+        Queues every builder found by the seed searches that have not been completed yet.
+        """
+        for seed in self.seeds:
+            key = json.dumps(seed, sort_keys=True)
+            if self.frontier.seed_completed(key):
+                continue
+
+            found = 0
+            for record in self.api.iter_search_builder(**seed):
+                for type_label, ID in discover_ids([record], self.id_fields):
+                    if self.frontier.add(type_label, ID, discovered_from="search"):
+                        found += 1
+                        if found % self.checkpoint_every == 0:
+                            self.frontier.sink.flush()
+
+            self.frontier.complete_seed(key)
+            self.frontier.sink.flush()
+            print(f"Search {key} queued {found} new IDs")
@@ -0,0 +1,349 @@
+import json
+import sqlite3
+import time
+
+from .crawler import ID_FIELDS, TYPE_LABELS, discover_ids
+from .search_index import FIELDS, field_values
+
+# Sections fetched per node type. Summaries give names and licence statuses, `members` gives the
+# edges, and the builder's convictions and conditions are counted for risk queries.
+DEFAULT_SECTIONS = {
+    "umbrella": ["summary", "members"],
+    "builder": ["summary", "members", "convictions", "conditions"],
+}
+
+NODE_COLUMNS = ("type", "id", "name", "licence_status", "convictions", "conditions", "summary", "fetched_at", "error")
+
+
+def _summary(data: dict):
+    summary = data.get("summary")
+    if isinstance(summary, list):
+        summary = summary[0] if summary else None
+    return summary if isinstance(summary, dict) else None
+
+
+def _count(value):
+    # Sections that were not fetched stay unknown (NULL) rather than counting as zero
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return len(value)
+    return 1 if value else 0
+
+
+class RelationshipGraph:
+    """
+    Local graph of umbrella companies, their member builders, and the umbrellas builders
+    belong to, stored as adjacency tables in SQLite.
+
+    expand() starts from umbrella and/or builder IDs and walks `members` sections breadth-first.
+    Every level is fetched with API.fetch_many, so requests are concurrent but bounded by the
+    API's worker pool, and every ID is fetched at most once per expansion. Nodes already in the
+    graph are reused instead of fetched again unless they are older than max_age, so an
+    interrupted expansion resumes from the levels it completed. Queries such as
+    builders_under_umbrellas_with_convictions() are then answered from the local tables.
+
+    Tables:
+    - nodes: one row per builder or umbrella, with name, licence status, the number of
+      convictions and conditions (builders) and when the node was fetched. Nodes that were
+      discovered but not fetched have a NULL fetched_at.
+    - edges: (from_type, from_id) lists (to_type, to_id) as a member.
+    - umbrella_builders: view joining both edge directions into (umbrella_id, builder_id) pairs.
+    """
+
+    def __init__(self, path: str = "relationship_graph.db", api=None, sections: dict = None, id_fields: tuple = ID_FIELDS) -> None:
+        """
+        Parameters:
+        - path (str): SQLite file holding the graph.
+        - api (API): Client used by expand() (optional when the graph is only queried).
+        - sections (dict): Sections fetched per node type, merged over DEFAULT_SECTIONS (optional).
+        - id_fields (tuple): Record fields searched for IDs in `members` sections (optional).
+        """
+        self.path = path
+        self.api = api
+        self.sections = {**DEFAULT_SECTIONS, **(sections or {})}
+        self.id_fields = id_fields
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                type TEXT,
+                id TEXT,
+                name TEXT,
+                licence_status TEXT,
+                convictions INTEGER,
+                conditions INTEGER,
+                summary TEXT,
+                fetched_at REAL,
+                error TEXT,
+                PRIMARY KEY (type, id)
+            );
+            CREATE TABLE IF NOT EXISTS edges (
+                from_type TEXT,
+                from_id TEXT,
+                to_type TEXT,
+                to_id TEXT,
+                observed_at REAL,
+                PRIMARY KEY (from_type, from_id, to_type, to_id)
+            );
+            CREATE INDEX IF NOT EXISTS edges_to ON edges (to_type, to_id);
+            CREATE VIEW IF NOT EXISTS umbrella_builders AS
+                SELECT from_id AS umbrella_id, to_id AS builder_id FROM edges
+                WHERE from_type = 'umbrella' AND to_type = 'builder'
+                UNION
+                SELECT to_id AS umbrella_id, from_id AS builder_id FROM edges
+                WHERE from_type = 'builder' AND to_type = 'umbrella';
+            """
+        )
+        self.conn.commit()
+
+    def expand(
+        self,
+        umbrella_ids: list = (),
+        builder_ids: list = (),
+        max_depth: int = None,
+        follow_builders: bool = True,
+        max_age: float = None,
+        max_ids_in_flight: int = None,
+    ) -> dict:
+        """
+        Expands the graph breadth-first from the given IDs.
+
+        Parameters:
+        - umbrella_ids (list): Umbrella companies to start from (optional).
+        - builder_ids (list): Builders to start from (optional).
+        - max_depth (int): Number of membership hops to follow from the start IDs; 0 fetches the
+          start IDs only (optional, unlimited by default).
+        - follow_builders (bool): Also follow builders back to the umbrella companies listed in
+          their `members` sections (optional). Those edges are recorded either way.
+        - max_age (float): Seconds after which a node already in the graph is fetched again
+          (optional, by default fetched nodes are reused).
+        - max_ids_in_flight (int): Passed to fetch_many (optional).
+
+        Returns:
+        - Counts of fetched umbrellas and builders, nodes reused from the graph, failed IDs,
+          edges recorded and the depth reached.
+        """
+        if self.api is None:
+            raise ValueError("expand() requires a RelationshipGraph created with an api")
+
+        level = list(dict.fromkeys(
+            [("umbrella", str(ID)) for ID in umbrella_ids] + [("builder", str(ID)) for ID in builder_ids]
+        ))
+        seen = set(level)
+        stats = {"umbrellas": 0, "builders": 0, "reused": 0, "failed": 0, "edges": 0, "depth": 0}
+        depth = 0
+        while level:
+            next_level = []
+            for type_label in TYPE_LABELS:
+                ids = [ID for found_type, ID in level if found_type == type_label]
+                if not ids:
+                    continue
+                for ID, neighbours in self.__visit(type_label, ids, max_age, max_ids_in_flight, stats):
+                    if type_label == "builder" and not follow_builders:
+                        continue
+                    for neighbour in neighbours:
+                        if neighbour not in seen:
+                            seen.add(neighbour)
+                            next_level.append(neighbour)
+            # Each completed level is durable, so an interrupted expansion keeps its progress
+            self.conn.commit()
+            print(f"Expanded depth {depth}: {len(level)} IDs, {len(next_level)} new IDs found")
+
+            stats["depth"] = depth
+            if max_depth is not None and depth >= max_depth:
+                break
+            level = next_level
+            depth += 1
+        return stats
+
+    def add(self, type_label: str, ID: str, data: dict) -> list:
+        """
+        Stores a fetched node and replaces its outgoing edges. Member IDs become nodes too,
+        without details until they are fetched. Call commit() to make the change durable.
+
+        Parameters:
+        - type_label (str): "builder" or "umbrella".
+        - ID (str): The builder or umbrella ID.
+        - data (dict): The dictionary returned by get_builder_detail/get_umbrella_detail.
+
+        Returns:
+        - The (type_label, ID) tuples of the node's members.
+        """
+        now = time.time()
+        summary = _summary(data)
+        values = field_values(summary, FIELDS) if summary is not None else {}
+        self.conn.execute(
+            """
+            INSERT INTO nodes (type, id, name, licence_status, convictions, conditions, summary, fetched_at, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)
+            ON CONFLICT (type, id) DO UPDATE SET
+                name = excluded.name, licence_status = excluded.licence_status,
+                convictions = excluded.convictions, conditions = excluded.conditions,
+                summary = excluded.summary, fetched_at = excluded.fetched_at, error = NULL
+            """,
+            (
+                type_label, ID, values.get("name") or None, values.get("licence_status") or None,
+                _count(data.get("convictions")), _count(data.get("conditions")),
+                json.dumps(summary, default=str) if summary is not None else None, now,
+            ),
+        )
+
+        members = [member for member in discover_ids(data.get("members"), self.id_fields) if member != (type_label, ID)]
+        self.conn.execute("DELETE FROM edges WHERE from_type = ? AND from_id = ?", (type_label, ID))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO edges VALUES (?, ?, ?, ?, ?)",
+            [(type_label, ID, member_type, member_id, now) for member_type, member_id in members],
+        )
+        self.conn.executemany("INSERT OR IGNORE INTO nodes (type, id) VALUES (?, ?)", members)
+        return members
+
+    def node(self, type_label: str, ID: str):
+        """
+        Returns a node as a dictionary, or None if it is not in the graph.
+        """
+        rows = self.query(f"SELECT {', '.join(NODE_COLUMNS)} FROM nodes WHERE type = ? AND id = ?", (type_label, str(ID)))
+        return rows[0] if rows else None
+
+    def builders_of(self, umbrella_id: str) -> list:
+        """
+        Returns the builder nodes under an umbrella company.
+        """
+        return self.query(
+            f"SELECT {', '.join('n.' + c for c in NODE_COLUMNS)} FROM umbrella_builders ub "
+            "JOIN nodes n ON n.type = 'builder' AND n.id = ub.builder_id WHERE ub.umbrella_id = ? ORDER BY n.id",
+            (str(umbrella_id),),
+        )
+
+    def umbrellas_of(self, builder_id: str) -> list:
+        """
+        Returns the umbrella company nodes a builder belongs to.
+        """
+        return self.query(
+            f"SELECT {', '.join('n.' + c for c in NODE_COLUMNS)} FROM umbrella_builders ub "
+            "JOIN nodes n ON n.type = 'umbrella' AND n.id = ub.umbrella_id WHERE ub.builder_id = ? ORDER BY n.id",
+            (str(builder_id),),
+        )
+
+    def related_builders(self, builder_id: str) -> list:
+        """
+        Returns the other builders that share an umbrella company with a builder.
+        """
+        return self.query(
+            f"SELECT DISTINCT {', '.join('n.' + c for c in NODE_COLUMNS)} FROM umbrella_builders mine "
+            "JOIN umbrella_builders other ON other.umbrella_id = mine.umbrella_id AND other.builder_id != mine.builder_id "
+            "JOIN nodes n ON n.type = 'builder' AND n.id = other.builder_id WHERE mine.builder_id = ? ORDER BY n.id",
+            (str(builder_id),),
+        )
+
+    def builders_under_umbrellas_with_convictions(self, min_convictions: int = 1) -> list:
+        """
+        Returns every builder under an umbrella company whose member builders have at least
+        min_convictions convictions in total. Builders without convictions are included: they
+        share the umbrella with builders that have some.
+
+        Returns:
+        - A list of dictionaries with umbrella_id, umbrella_name, umbrella_convictions,
+          builder_id, builder_name, licence_status, convictions and conditions, umbrellas with
+          the most convictions first.
+        """
+        return self.query(
+            """
+            WITH flagged AS (
+                SELECT ub.umbrella_id, SUM(b.convictions) AS umbrella_convictions
+                FROM umbrella_builders ub
+                JOIN nodes b ON b.type = 'builder' AND b.id = ub.builder_id
+                GROUP BY ub.umbrella_id
+                HAVING SUM(b.convictions) >= ?
+            )
+            SELECT f.umbrella_id, u.name AS umbrella_name, f.umbrella_convictions,
+                   ub.builder_id, b.name AS builder_name, b.licence_status, b.convictions, b.conditions
+            FROM flagged f
+            JOIN umbrella_builders ub ON ub.umbrella_id = f.umbrella_id
+            LEFT JOIN nodes u ON u.type = 'umbrella' AND u.id = f.umbrella_id
+            LEFT JOIN nodes b ON b.type = 'builder' AND b.id = ub.builder_id
+            ORDER BY f.umbrella_convictions DESC, f.umbrella_id, ub.builder_id
+            """,
+            (min_convictions,),
+        )
+
+    def query(self, sql: str, params: tuple = ()) -> list:
+        """
+        Runs a read query against the graph tables and returns the rows as dictionaries.
+        """
+        cursor = self.conn.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def counts(self) -> dict:
+        """
+        Returns the number of fetched and unfetched nodes per type, and the number of edges.
+        """
+        counts = {type_label: {"fetched": 0, "unfetched": 0} for type_label in TYPE_LABELS}
+        for type_label, fetched, count in self.conn.execute(
+            "SELECT type, fetched_at IS NOT NULL, COUNT(*) FROM nodes GROUP BY type, fetched_at IS NOT NULL"
+        ):
+            counts.setdefault(type_label, {})["fetched" if fetched else "unfetched"] = count
+        counts["edges"] = self.conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+        return counts
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        try:
+            self.conn.commit()
+        finally:
+            self.conn.close()
+
+    def __visit(self, type_label: str, ids: list, max_age: float, max_ids_in_flight: int, stats: dict):
+        """
+        Yields (ID, member IDs) for every ID of one level: from the graph for nodes fetched
+        recently enough, from the API for the others.
+        """
+        cutoff = time.time() - max_age if max_age is not None else None
+        stored = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            stored.update(self.conn.execute(
+                f"SELECT id, fetched_at FROM nodes WHERE type = ? AND fetched_at IS NOT NULL "
+                f"AND id IN ({', '.join('?' for _ in chunk)})",
+                (type_label, *chunk),
+            ).fetchall())
+
+        to_fetch = []
+        for ID in ids:
+            if ID in stored and (cutoff is None or stored[ID] >= cutoff):
+                stats["reused"] += 1
+                yield ID, [
+                    tuple(row) for row in self.conn.execute(
+                        "SELECT to_type, to_id FROM edges WHERE from_type = ? AND from_id = ?", (type_label, ID)
+                    )
+                ]
+            else:
+                to_fetch.append(ID)
+
+        if not to_fetch:
+            return
+        results = self.api.fetch_many(
+            to_fetch,
+            is_umbrella=type_label == "umbrella",
+            max_ids_in_flight=max_ids_in_flight,
+            sections=self.sections.get(type_label),
+        )
+        for ID, data in results:
+            if isinstance(data, Exception):
+                print(f"Error expanding {type_label} ID {ID}: {str(data)}")
+                self.conn.execute("INSERT OR IGNORE INTO nodes (type, id) VALUES (?, ?)", (type_label, ID))
+                self.conn.execute(
+                    "UPDATE nodes SET error = ? WHERE type = ? AND id = ?",
+                    (f"{type(data).__name__}: {data}", type_label, ID),
+                )
+                stats["failed"] += 1
+                continue
+            members = self.add(type_label, ID, data)
+            stats["umbrellas" if type_label == "umbrella" else "builders"] += 1
+            stats["edges"] += len(members)
+            yield ID, members
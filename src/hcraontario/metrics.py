@@ -0,0 +1,270 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class NullMetrics:
+    """
+    Metrics recorder that records nothing. It is the default, so instrumentation costs one
+    attribute lookup and an empty call when metrics are disabled.
+    """
+
+    enabled = False
+
+    def request_started(self, endpoint: str) -> None:
+        pass
+
+    def request_finished(self, endpoint: str, seconds: float, size: int = 0, status: int = None) -> None:
+        pass
+
+    def retry(self, endpoint: str) -> None:
+        pass
+
+    def error(self, endpoint: str, reason: str) -> None:
+        pass
+
+    def stage(self, stage: str, exporter: str):
+        return _NULL_CONTEXT
+
+    def timed(self, iterable, stage: str, exporter: str):
+        return iterable
+
+
+NULL_METRICS = NullMetrics()
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: tuple) -> None:
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics(NullMetrics):
+    """
+    In-process metrics for the fetch and export paths:
+
+    - per-endpoint request latency histograms, response byte counts and status counts
+    - per-endpoint retry and error counters
+    - per-endpoint in-flight request gauges
+    - per-exporter stage timing histograms (waiting on fetches, writing, finalizing)
+
+    Everything can be read as a JSON-friendly snapshot() or as Prometheus text exposition with
+    to_prometheus(). Hooks registered with add_hook() receive every event as it happens, e.g.
+    to forward them to StatsD or a tracing system.
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, prefix: str = "hcra") -> None:
+        """
+        Parameters:
+        - buckets (tuple): Upper bounds of the histogram buckets in seconds (optional).
+        - prefix (str): Prefix of the Prometheus metric names (optional).
+        """
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._hooks = []
+        self._latency = {}  # endpoint -> _Histogram
+        self._bytes = {}  # endpoint -> int
+        self._statuses = {}  # (endpoint, status) -> int
+        self._retries = {}  # endpoint -> int
+        self._errors = {}  # (endpoint, reason) -> int
+        self._in_flight = {}  # endpoint -> int
+        self._stages = {}  # (exporter, stage) -> _Histogram
+
+    def add_hook(self, hook) -> None:
+        """
+        Registers a callable invoked as hook(event, labels, value) for every recorded event.
+        Events are "request" (value: seconds), "retry", "error" (value: 1) and "stage"
+        (value: seconds). An exception raised by a hook is printed and otherwise ignored, so a
+        broken hook never fails the request or export it is called from.
+        """
+        self._hooks.append(hook)
+
+    def request_started(self, endpoint: str) -> None:
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def request_finished(self, endpoint: str, seconds: float, size: int = 0, status: int = None) -> None:
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) - 1
+            self.__observe(self._latency, endpoint, seconds)
+            self._bytes[endpoint] = self._bytes.get(endpoint, 0) + size
+            # Requests that got no response at all are counted under "error"
+            key = (endpoint, "error" if status is None else status)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+        self.__emit("request", {"endpoint": endpoint, "status": status, "bytes": size}, seconds)
+
+    def retry(self, endpoint: str) -> None:
+        with self._lock:
+            self._retries[endpoint] = self._retries.get(endpoint, 0) + 1
+        self.__emit("retry", {"endpoint": endpoint}, 1)
+
+    def error(self, endpoint: str, reason: str) -> None:
+        with self._lock:
+            key = (endpoint, reason)
+            self._errors[key] = self._errors.get(key, 0) + 1
+        self.__emit("error", {"endpoint": endpoint, "reason": reason}, 1)
+
+    @contextmanager
+    def stage(self, stage: str, exporter: str):
+        """
+        Times the enclosed block as one occurrence of an exporter stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.__stage_done(stage, exporter, time.perf_counter() - start)
+
+    def timed(self, iterable, stage: str, exporter: str):
+        """
+        Wraps an iterable, timing every wait for its next item as an exporter stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.__stage_done(stage, exporter, time.perf_counter() - start)
+            yield item
+
+    def snapshot(self) -> dict:
+        """
+        Returns every metric as plain dictionaries and lists.
+        """
+        with self._lock:
+            endpoints = sorted(set(self._latency) | set(self._retries) | set(self._in_flight) | {e for e, _ in self._errors})
+            return {
+                "endpoints": {
+                    endpoint: {
+                        "latency": self.__histogram_dict(self._latency.get(endpoint)),
+                        "bytes": self._bytes.get(endpoint, 0),
+                        "statuses": {str(s): n for (e, s), n in self._statuses.items() if e == endpoint},
+                        "retries": self._retries.get(endpoint, 0),
+                        "errors": {r: n for (e, r), n in self._errors.items() if e == endpoint},
+                        "in_flight": self._in_flight.get(endpoint, 0),
+                    }
+                    for endpoint in endpoints
+                },
+                "stages": {
+                    f"{exporter}.{stage}": self.__histogram_dict(histogram)
+                    for (exporter, stage), histogram in sorted(self._stages.items())
+                },
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += [f"# HELP {p}_request_duration_seconds HTTP request latency per endpoint.",
+                      f"# TYPE {p}_request_duration_seconds histogram"]
+            for endpoint, histogram in sorted(self._latency.items()):
+                lines += self.__histogram_lines(f"{p}_request_duration_seconds", {"endpoint": endpoint}, histogram)
+
+            lines += [f"# HELP {p}_response_bytes_total Response body bytes per endpoint.",
+                      f"# TYPE {p}_response_bytes_total counter"]
+            lines += [f'{p}_response_bytes_total{{endpoint="{e}"}} {n}' for e, n in sorted(self._bytes.items())]
+
+            lines += [f"# HELP {p}_requests_total HTTP responses per endpoint and status.",
+                      f"# TYPE {p}_requests_total counter"]
+            lines += [f'{p}_requests_total{{endpoint="{e}",status="{s}"}} {n}'
+                      for (e, s), n in sorted(self._statuses.items(), key=str)]
+
+            lines += [f"# HELP {p}_request_retries_total Retried requests per endpoint.",
+                      f"# TYPE {p}_request_retries_total counter"]
+            lines += [f'{p}_request_retries_total{{endpoint="{e}"}} {n}' for e, n in sorted(self._retries.items())]
+
+            lines += [f"# HELP {p}_request_errors_total Requests that failed for good, per endpoint and reason.",
+                      f"# TYPE {p}_request_errors_total counter"]
+            lines += [f'{p}_request_errors_total{{endpoint="{e}",reason="{r}"}} {n}'
+                      for (e, r), n in sorted(self._errors.items())]
+
+            lines += [f"# HELP {p}_requests_in_flight Requests currently in flight per endpoint.",
+                      f"# TYPE {p}_requests_in_flight gauge"]
+            lines += [f'{p}_requests_in_flight{{endpoint="{e}"}} {n}' for e, n in sorted(self._in_flight.items())]
+
+            lines += [f"# HELP {p}_stage_duration_seconds Time spent per exporter stage.",
+                      f"# TYPE {p}_stage_duration_seconds histogram"]
+            for (exporter, stage), histogram in sorted(self._stages.items()):
+                lines += self.__histogram_lines(
+                    f"{p}_stage_duration_seconds", {"exporter": exporter, "stage": stage}, histogram
+                )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for table in (self._latency, self._bytes, self._statuses, self._retries, self._errors, self._stages):
+                table.clear()
+
+    def __stage_done(self, stage: str, exporter: str, seconds: float) -> None:
+        with self._lock:
+            self.__observe(self._stages, (exporter, stage), seconds)
+        self.__emit("stage", {"exporter": exporter, "stage": stage}, seconds)
+
+    def __observe(self, table: dict, key, seconds: float) -> None:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = _Histogram(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram.counts[i] += 1
+                break
+        histogram.sum += seconds
+        histogram.count += 1
+
+    def __emit(self, event: str, labels: dict, value: float) -> None:
+        for hook in self._hooks:
+            try:
+                hook(event, labels, value)
+            except Exception as e:
+                print(f"Error in metrics hook {hook!r} for {event} event: {type(e).__name__}: {e}")
+
+    def __histogram_dict(self, histogram) -> dict:
+        if histogram is None:
+            return {"count": 0, "sum": 0.0, "buckets": {}}
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, histogram.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = histogram.count
+        return {"count": histogram.count, "sum": histogram.sum, "buckets": buckets}
+
+    def __histogram_lines(self, name: str, labels: dict, histogram) -> list:
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{label_text}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+        return lines
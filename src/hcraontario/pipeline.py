@@ -0,0 +1,237 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+
+from .Hcraontario import BUILDER_ENDPOINTS, UMBRELLA_ENDPOINTS, _select_endpoints
+from .records import PreparedSections, RecordBatch, loads, section_digest, tag_records
+from .sinks import _arrow_table, _sql_value
+
+# What worker processes turn each ID's sections into, per destination:
+# - "batch": tagged RecordBatches (CSV, Excel)
+# - "sql": RecordBatches whose values are already converted for SQLite
+# - "arrow": Arrow tables (Parquet)
+PREPARE_KINDS = ("batch", "sql", "arrow")
+
+_DONE = object()
+
+
+class _Failure:
+    # Carries an exception of the coordinator thread to the consuming thread
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def prepare_sections(ID: str, bodies: dict, kind: str = "batch", digests: bool = False) -> PreparedSections:
+    """
+    Decodes the raw section bodies of one ID and normalizes them for a sink. Runs in a worker
+    process of an ExportPipeline, so it only takes and returns picklable values.
+
+    Parameters:
+    - ID (str): The builder or umbrella ID.
+    - bodies (dict): Section name -> undecoded JSON body, as returned with raw=True.
+    - kind (str): One of PREPARE_KINDS (optional).
+    - digests (bool): Also compute the section hashes used by resumable SQL syncs (optional).
+
+    Returns:
+    - A PreparedSections mapping each non-empty section to a RecordBatch or Arrow table.
+    """
+    data = {key: loads(body) for key, body in bodies.items()}
+    tagged = tag_records(ID, data)
+    if kind == "sql":
+        tagged = {
+            key: RecordBatch({name: [_sql_value(value) for value in values] for name, values in batch.columns.items()}, len(batch))
+            for key, batch in tagged.items()
+        }
+    elif kind == "arrow":
+        tagged = {key: _arrow_table(batch, set()) for key, batch in tagged.items()}
+    return PreparedSections(tagged, {key: section_digest(ID, data[key]) for key in tagged} if digests else None)
+
+
+class ExportPipeline:
+    """
+    Staged pipeline for large master exports that keeps every core busy.
+
+    1. I/O threads fetch the raw response bodies of each ID (API.get_*_detail with raw=True).
+    2. A process pool decodes, normalizes and serializes them with prepare_sections.
+    3. The consumer of run(), usually one sink, writes the results.
+
+    JSON decoding and record conversion run in the worker processes instead of competing for the
+    GIL with the fetch threads. Each stage holds a bounded number of IDs (fetch_window,
+    process_window, queue_size), so a slow stage holds back the stages before it instead of
+    letting memory grow. IDs move through the stages in input order: the output for a given
+    list of IDs is the same on every run, whatever order the responses arrive in.
+
+    On platforms that start worker processes with spawn or forkserver (Windows, macOS, and
+    Linux from Python 3.14), the script creating the pipeline needs an
+    `if __name__ == "__main__":` guard.
+    """
+
+    def __init__(
+        self,
+        api,
+        processes: int = None,
+        prepare: str = "batch",
+        digests: bool = False,
+        sections: list = None,
+        fetch_window: int = None,
+        process_window: int = None,
+        queue_size: int = 32,
+        mp_context=None,
+    ) -> None:
+        """
+        Parameters:
+        - api (API): Client used to fetch the IDs.
+        - processes (int): Worker processes (optional, defaults to the number of CPUs); 0
+          prepares the IDs in a thread of this process instead.
+        - prepare (str): One of PREPARE_KINDS (optional).
+        - digests (bool): Compute the section hashes used by resumable SQL syncs (optional).
+        - sections (list): Names of the sections to fetch for every ID (optional, defaults to all).
+        - fetch_window (int): IDs being fetched at once (optional, defaults to enough IDs to keep
+          every API worker busy, given the number of sections each ID needs).
+        - process_window (int): IDs queued for or being processed by the workers (optional).
+        - queue_size (int): Prepared IDs waiting for the consumer (optional).
+        - mp_context: multiprocessing context or start method name for the worker processes
+          (optional, the platform default).
+        """
+        if prepare not in PREPARE_KINDS:
+            raise ValueError(f"Unknown prepare kind {prepare!r}; expected one of {list(PREPARE_KINDS)}")
+        self.api = api
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.prepare = prepare
+        self.digests = digests
+        self.sections = sections
+        self.fetch_window = fetch_window
+        self.process_window = process_window or 2 * max(1, self.processes) + 2
+        self.queue_size = max(1, queue_size)
+        self.mp_context = mp_context
+
+    def run(self, ids: list, is_umbrella: bool = False):
+        """
+        Runs the pipeline over a list of IDs.
+
+        Yields:
+        - A tuple (ID, prepared) per ID, in the order of ids. prepared is a PreparedSections, or
+          the exception raised while fetching or preparing that ID.
+        """
+        fetch_window = self.fetch_window
+        if not fetch_window:
+            # Same window fetch_many uses: umbrellas and builders have different section counts
+            endpoints = _select_endpoints(UMBRELLA_ENDPOINTS if is_umbrella else BUILDER_ENDPOINTS, self.sections)
+            fetch_window = 2 * max(1, self.api.max_workers // max(1, len(endpoints))) + 1
+
+        output = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        coordinator = threading.Thread(
+            target=self.__coordinate, args=(list(ids), is_umbrella, fetch_window, output, stop),
+            name="hcraontario-pipeline", daemon=True,
+        )
+        coordinator.start()
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            coordinator.join()
+
+    def __coordinate(self, ids: list, is_umbrella: bool, fetch_window: int, output: queue.Queue, stop: threading.Event) -> None:
+        """
+        Moves IDs through the fetch and prepare stages, in input order, into the output queue.
+        """
+        fetch = self.api.get_umbrella_detail if is_umbrella else self.api.get_builder_detail
+        io_pool = ThreadPoolExecutor(max_workers=fetch_window, thread_name_prefix="hcraontario-io")
+        cpu_pool = None
+        if self.processes:
+            # Loads multiprocessing, so only when worker processes are used
+            from concurrent.futures import ProcessPoolExecutor
+
+            cpu_pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=self.__context())
+        fetching, preparing = deque(), deque()
+        pending = iter(ids)
+
+        def put(item) -> bool:
+            # Blocks while the consumer is behind, unless the consumer has gone away
+            while not stop.is_set():
+                try:
+                    output.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def emit() -> bool:
+            ID, future = preparing.popleft()
+            try:
+                result = future.result()
+            except BrokenExecutor:
+                # A worker process died: every later ID would fail the same way
+                raise
+            except Exception as e:
+                result = e
+            return put((ID, result))
+
+        try:
+            while not stop.is_set():
+                for ID in pending:
+                    fetching.append((ID, io_pool.submit(fetch, ID, sections=self.sections, raw=True)))
+                    if len(fetching) >= fetch_window:
+                        break
+                if not fetching and not preparing:
+                    break
+
+                # Hand on everything at the head of the queues that is ready, without waiting
+                while preparing and preparing[0][1].done():
+                    if not emit():
+                        return
+                if fetching and len(preparing) < self.process_window:
+                    ID, future = fetching.popleft()
+                    try:
+                        bodies = future.result()
+                    except Exception as e:
+                        preparing.append((ID, self.__resolved(e)))
+                        continue
+                    if cpu_pool is not None:
+                        job = cpu_pool.submit(prepare_sections, ID, bodies, self.prepare, self.digests)
+                    else:
+                        job = self.__resolved(None, ID, bodies)
+                    preparing.append((ID, job))
+                elif preparing:
+                    if not emit():
+                        return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            for _, future in list(fetching) + list(preparing):
+                future.cancel()
+            io_pool.shutdown(wait=True)
+            if cpu_pool is not None:
+                cpu_pool.shutdown(wait=True)
+
+    def __resolved(self, error: Exception, ID: str = None, bodies: dict = None) -> Future:
+        """
+        Returns a completed future holding an error, or the result of preparing an ID in this
+        thread.
+        """
+        future = Future()
+        if error is not None:
+            future.set_exception(error)
+            return future
+        try:
+            future.set_result(prepare_sections(ID, bodies, self.prepare, self.digests))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __context(self):
+        if self.mp_context is None or not isinstance(self.mp_context, str):
+            return self.mp_context
+        import multiprocessing
+
+        return multiprocessing.get_context(self.mp_context)
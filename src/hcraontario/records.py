@@ -0,0 +1,210 @@
+import functools
+import hashlib
+import json
+
+
+@functools.lru_cache(maxsize=None)
+def _load_orjson():
+    """
+    Imports orjson on first use, so that importing this package stays fast. Returns None when
+    the optional dependency is not installed.
+    """
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def loads(data):
+    """
+    Decodes a JSON document with orjson when it is installed, otherwise with the json module.
+    orjson decodes several times faster than the standard library and allocates less.
+
+    Documents orjson rejects but the json module accepts, such as NaN literals or UTF-16 text,
+    are decoded with the json module. Invalid documents raise json.JSONDecodeError, a ValueError.
+    """
+    orjson = _load_orjson()
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+class RecordBatch:
+    """
+    The records of one section in column-oriented form.
+
+    Each column is a list holding one value per record, None where a record lacks the field.
+    Sinks consume batches directly: SQLite inserts their rows as tuples, Parquet builds Arrow
+    arrays from the columns and CSV/Excel spool the rows. Compared with a list of dictionaries,
+    a batch stores every field name once rather than once per record, and building one leaves
+    the decoded response untouched.
+    """
+
+    __slots__ = ("columns", "num_rows")
+
+    def __init__(self, columns: dict, num_rows: int) -> None:
+        """
+        Parameters:
+        - columns (dict): Column name -> list of num_rows values, in column order.
+        - num_rows (int): Number of records in the batch.
+        """
+        self.columns = columns
+        self.num_rows = num_rows
+
+    @classmethod
+    def from_records(cls, records: list, constants: dict = None) -> "RecordBatch":
+        """
+        Builds a batch from a list of records. Non-dict records are stored in a `value` column.
+
+        Parameters:
+        - records (list): The records, usually one section of a detail response.
+        - constants (dict): Columns holding the same value in every record, appended after the
+          record fields, e.g. {"source_id": ID} (optional).
+        """
+        columns = {}
+        for n, record in enumerate(records):
+            if not isinstance(record, dict):
+                record = {"value": record}
+            added = False
+            for key, value in record.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = [None] * n
+                    added = True
+                column.append(value)
+            # Records usually share their fields; only pad when this one lacked some
+            if added or len(record) != len(columns):
+                for column in columns.values():
+                    if len(column) <= n:
+                        column.append(None)
+
+        num_rows = len(records)
+        for key, value in (constants or {}).items():
+            columns[key] = [value] * num_rows
+        return cls(columns, num_rows)
+
+    @classmethod
+    def concat(cls, batches: list) -> "RecordBatch":
+        """
+        Joins batches into one. Columns are unified by name in first-seen order; records of a
+        batch lacking a column get None.
+        """
+        columns, num_rows = {}, 0
+        for batch in batches:
+            for name, values in batch.columns.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * num_rows
+                column.extend(values)
+            num_rows += batch.num_rows
+            for column in columns.values():
+                if len(column) < num_rows:
+                    column.extend([None] * (num_rows - len(column)))
+        return cls(columns, num_rows)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __repr__(self) -> str:
+        return f"<RecordBatch {self.num_rows} rows, columns={list(self.columns)}>"
+
+    @property
+    def names(self) -> list:
+        return list(self.columns)
+
+    def rows(self):
+        """
+        Yields each record as a tuple of values in column order.
+        """
+        return zip(*self.columns.values()) if self.columns else iter(() for _ in range(self.num_rows))
+
+    def to_records(self) -> list:
+        """
+        Returns the records as dictionaries, with None for missing fields.
+        """
+        names = self.names
+        return [dict(zip(names, row)) for row in self.rows()]
+
+    def split(self, column: str) -> dict:
+        """
+        Splits the batch by the values of one column.
+
+        Returns:
+        - A dictionary mapping each value of the column (None when the column is missing) to
+          the batch of the records holding it, in order of first appearance.
+        """
+        values = self.columns.get(column)
+        if values is None:
+            return {None: self}
+        first = values[0] if values else None
+        if all(value == first for value in values):
+            return {first: self}
+
+        positions = {}
+        for position, value in enumerate(values):
+            positions.setdefault(value, []).append(position)
+        return {
+            value: RecordBatch({name: [data[p] for p in kept] for name, data in self.columns.items()}, len(kept))
+            for value, kept in positions.items()
+        }
+
+
+def as_batch(records) -> RecordBatch:
+    """
+    Returns records as a RecordBatch, converting a list of records if needed.
+    """
+    if isinstance(records, RecordBatch):
+        return records
+    return RecordBatch.from_records(records)
+
+
+class PreparedSections(dict):
+    """
+    Sections of one ID already normalized into tagged RecordBatches (or Arrow tables), e.g. by
+    the worker processes of an ExportPipeline. The master exporters write them as they are.
+    digests holds the section hashes used by resumable SQL syncs, when they were computed.
+    """
+
+    def __init__(self, sections: dict = (), digests: dict = None) -> None:
+        super().__init__(sections)
+        self.digests = digests
+
+
+def tag_records(ID: str, data: dict) -> dict:
+    """
+    Normalizes the result of a detail call into record batches tagged with their source ID.
+    The data itself is left unchanged.
+
+    Parameters:
+    - ID (str): The builder or umbrella ID the data belongs to.
+    - data (dict): The dictionary returned by get_builder_detail/get_umbrella_detail.
+
+    Returns:
+    - A dictionary mapping each non-empty section to a RecordBatch with a `source_id` column.
+    """
+    if isinstance(data, PreparedSections):
+        return data
+    tagged = {}
+    for key, value in data.items():
+        if not value:
+            continue
+        # Ensure we're working with a list of records
+        if isinstance(value, dict):
+            value = [value]
+        if isinstance(value, list):
+            tagged[key] = RecordBatch.from_records(value, constants={"source_id": ID})
+    return tagged
+
+
+def section_digest(ID: str, value) -> str:
+    """
+    Returns the content hash of one section of an ID, computed over its records tagged with
+    the ID so that hashes stored by earlier versions still match.
+    """
+    records = value if isinstance(value, list) else [value]
+    tagged_records = [{**item, "source_id": ID} if isinstance(item, dict) else item for item in records]
+    return hashlib.sha256(json.dumps(tagged_records, sort_keys=True, default=str).encode("utf-8")).hexdigest()
@@ -0,0 +1,422 @@
+import copy
+import random
+import threading
+import time
+
+# Statuses that mean "slow down": the server is shedding load.
+THROTTLE_STATUSES = {429, 503}
+# Statuses worth retrying because they are usually transient.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RequestFailedError(Exception):
+    """
+    Raised when a request still fails after every retry.
+
+    Attributes:
+    - status_code: HTTP status of the last attempt, or None if it failed without a response.
+    - attempts: Number of attempts made.
+    """
+
+    def __init__(self, message: str, status_code: int = None, attempts: int = 0) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all workers. Tokens are reserved ahead of time, so
+    waiting callers queue up fairly instead of polling.
+    """
+
+    def __init__(self, rate: float, burst: float = None) -> None:
+        """
+        Parameters:
+        - rate (float): Tokens added per second, i.e. the sustained request rate.
+        - burst (float): Bucket capacity, i.e. how many requests may be sent back to back
+          (optional, defaults to one second worth of tokens).
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes one token and returns how many seconds the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+def _resolve(future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit. Every healthy response grows the limit additively (by roughly one
+    slot per limit's worth of responses); a throttling response or a latency spike shrinks it
+    multiplicatively, at most once per cooldown so that one burst of errors is one signal.
+    """
+
+    def __init__(self, min_limit: int = 1, max_limit: int = 16, initial: float = None, decrease_factor: float = 0.5, latency_factor: float = 3.0) -> None:
+        """
+        Parameters:
+        - min_limit (int): Lowest concurrency the limiter backs off to (optional).
+        - max_limit (int): Highest concurrency it ramps up to (optional).
+        - initial (float): Starting limit (optional, defaults to max_limit).
+        - decrease_factor (float): Multiplier applied to the limit on a backoff signal (optional).
+        - latency_factor (float): A response slower than this multiple of the baseline latency
+          counts as a latency spike (optional).
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial if initial is not None else max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._async_waiters = []
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """
+        asyncio variant of acquire: a waiting coroutine sleeps until a slot is released or the
+        limit grows, without polling.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    elif waiter.done() and not waiter.cancelled():
+                        # Woken and cancelled at once: hand the wake-up to the next waiter
+                        self.__wake_async(1)
+                raise
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+            self.__wake_async(1)
+
+    def __wake_async(self, count: int = None) -> None:
+        # Called with the condition held; waiters may belong to a loop in another thread
+        woken = self._async_waiters[:count] if count is not None else self._async_waiters[:]
+        del self._async_waiters[:len(woken)]
+        for waiter in woken:
+            waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+
+    def on_success(self, latency: float) -> None:
+        with self._condition:
+            if self._baseline is None:
+                self._baseline = latency
+            spike = latency > self.latency_factor * self._baseline
+            # The baseline follows healthy responses only, so a slow period cannot become normal
+            if not spike:
+                self._baseline = 0.9 * self._baseline + 0.1 * latency
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self._condition.notify_all()
+                self.__wake_async()
+        if spike:
+            self.on_backoff(cooldown=self._baseline)
+
+    def on_backoff(self, cooldown: float = 1.0) -> None:
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= cooldown:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+
+
+class RequestScheduler:
+    """
+    Central scheduler every HTTP request goes through.
+
+    It combines an optional token-bucket rate limit, an AIMD adaptive concurrency limit, and
+    retries with jittered exponential backoff. Responses with status 429 or 503 shrink the
+    concurrency limit, and a Retry-After header pauses every worker for the requested time.
+    Other 5xx responses, bodies that fail to parse (such as HTML error pages) and connection
+    errors are retried. Any other 4xx response is a permanent error and fails at once.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: float = None,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_exceptions: tuple = (OSError,),
+    ) -> None:
+        """
+        Parameters:
+        - rate (float): Maximum sustained requests per second (optional, unlimited by default).
+        - burst (float): Requests allowed back to back before rate applies (optional).
+        - min_concurrency (int): Concurrency the adaptive limit never drops below (optional).
+        - max_concurrency (int): Concurrency the adaptive limit never exceeds (optional).
+        - max_retries (int): Retries per request after the first attempt (optional).
+        - backoff_base (float): Base delay in seconds of the exponential backoff (optional).
+        - backoff_max (float): Upper bound of a single backoff delay in seconds, including a
+          delay asked for with Retry-After (optional).
+        - retry_exceptions (tuple): Exception types raised by the transport that are retried
+          (optional; connection errors and timeouts are OSError subclasses).
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.limiter = AdaptiveLimiter(min_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_exceptions = retry_exceptions
+        self._paused_until = 0.0
+        self._pause_lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds every worker back for the given time, e.g. while honouring Retry-After.
+        """
+        with self._pause_lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def request(self, send, parse=None):
+        """
+        Sends a request, retrying it until it succeeds or the retries are exhausted.
+
+        Parameters:
+        - send: Callable performing one attempt and returning a response with `status_code`
+          and `headers`.
+        - parse: Callable turning a response into its result, e.g. decoding JSON (optional).
+          A ValueError raised here is treated like a failed attempt.
+
+        Returns:
+        - A tuple of the final response and the result of parse (None without parse).
+        """
+        for attempt in range(self.max_retries + 1):
+            wait = self.__wait()
+            if wait > 0:
+                time.sleep(wait)
+            self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = send()
+            except self.retry_exceptions as e:
+                outcome = self.__failed(attempt, None, e)
+            else:
+                outcome = self.__outcome(attempt, response, time.monotonic() - start, parse)
+            finally:
+                self.limiter.release()
+
+            if outcome[0] == "done":
+                return outcome[1]
+            time.sleep(outcome[1])
+
+    async def request_async(self, send, parse=None):
+        """
+        asyncio variant of request. send is a coroutine function; waiting never blocks the loop.
+        """
+        import asyncio
+
+        for attempt in range(self.max_retries + 1):
+            wait = self.__wait()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.limiter.acquire_async()
+            start = time.monotonic()
+            try:
+                response = await send()
+            except self.retry_exceptions as e:
+                outcome = self.__failed(attempt, None, e)
+            else:
+                outcome = self.__outcome(attempt, response, time.monotonic() - start, parse)
+            finally:
+                self.limiter.release()
+
+            if outcome[0] == "done":
+                return outcome[1]
+            await asyncio.sleep(outcome[1])
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns the "full jitter" exponential backoff delay for a retry attempt.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def __wait(self) -> float:
+        """
+        Returns how many seconds to wait before the next attempt, for the rate limit and for a
+        pause requested with Retry-After.
+        """
+        wait = self.bucket.reserve() if self.bucket is not None else 0.0
+        return max(wait, self._paused_until - time.monotonic())
+
+    def __outcome(self, attempt: int, response, latency: float, parse):
+        """
+        Classifies one attempt. Returns ("done", (response, result)) or ("retry", delay).
+        """
+        status = response.status_code
+        if status in THROTTLE_STATUSES:
+            self.limiter.on_backoff()
+        if status in RETRY_STATUSES:
+            delay = self.__retry_after(response)
+            if delay is not None:
+                # Never park a worker for longer than any other backoff, e.g. for a day
+                delay = min(delay, self.backoff_max)
+                self.pause(delay)
+            return self.__failed(attempt, status, None, delay)
+        if 400 <= status < 500:
+            # Retrying a bad request, a missing record or a refusal cannot change the answer
+            raise RequestFailedError(f"Request failed with HTTP {status}", status_code=status, attempts=attempt + 1)
+
+        try:
+            result = parse(response) if parse is not None else None
+        except ValueError as e:
+            return self.__failed(attempt, status, e)
+
+        self.limiter.on_success(latency)
+        return "done", (response, result)
+
+    def __failed(self, attempt: int, status: int, error: Exception, delay: float = None):
+        if attempt >= self.max_retries:
+            reason = f"HTTP {status}" if error is None else f"{type(error).__name__}: {error}"
+            raise RequestFailedError(
+                f"Request failed after {attempt + 1} attempts ({reason})",
+                status_code=status,
+                attempts=attempt + 1,
+            ) from error
+        if delay is None:
+            delay = self.backoff(attempt)
+        return "retry", delay
+
+    def __retry_after(self, response) -> float:
+        """
+        Reads the Retry-After header, given either in seconds or as an HTTP date.
+        """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self, done) -> None:
+        self.done = done
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the call, and callers
+    arriving while it is in flight wait for it and share its outcome instead of repeating it.
+    Followers receive a deep copy of the result, so no two callers ever share mutable objects.
+    Nothing is remembered once the call completes; caching is the ResponseCache's job.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+        self.coalesced = 0
+
+    def do(self, key, call):
+        """
+        Runs call() unless a call for the same key is in flight, in which case its result is
+        returned (or its exception raised) once it completes.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(threading.Event())
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            return self.__outcome(flight)
+
+        try:
+            flight.result = call()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key, call):
+        """
+        asyncio variant of do. call is a coroutine function; waiting never blocks the loop.
+        If the leading caller is cancelled, a waiting caller runs the call itself instead of
+        receiving a cancellation it did not ask for.
+        """
+        import asyncio
+
+        flight = self._async_flights.get(key)
+        while flight is not None:
+            flight.waiters += 1
+            self.coalesced += 1
+            await asyncio.shield(flight.done)
+            if not isinstance(flight.error, asyncio.CancelledError):
+                return self.__outcome(flight)
+            # Another waiter may already have taken over as leader
+            flight = self._async_flights.get(key)
+
+        flight = self._async_flights[key] = _Flight(asyncio.get_running_loop().create_future())
+        try:
+            flight.result = await call()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            del self._async_flights[key]
+            flight.done.set_result(None)
+
+    def __outcome(self, flight: _Flight):
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
@@ -0,0 +1,416 @@
+import bisect
+import difflib
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+
+from .crawler import classify_id, discover_ids
+
+# Indexed columns and the record fields they are read from, compared case-insensitively and
+# without underscores. Several matching fields are joined.
+FIELDS = {
+    "name": ("NAME", "BUILDERNAME", "OPERATINGNAME", "LEGALNAME", "UMBRELLANAME"),
+    "location": ("LOCATION", "BUILDERLOCATION", "CITY", "MUNICIPALITY", "ADDRESS"),
+    "officer_director": ("OFFICERDIRECTOR", "OFFICERS", "DIRECTORS", "OFFICERNAME"),
+    "umbrella_co": ("UMBRELLACO", "UMBRELLA", "UMBRELLACOMPANY"),
+    "licence_status": ("LICENSESTATUS", "LICENCESTATUS", "STATUS"),
+}
+
+# search_builder criteria and the column each one matches against.
+CRITERIA = {
+    "builderName": "name",
+    "builderLocation": "location",
+    "officerDirector": "officer_director",
+    "umbrellaCo": "umbrella_co",
+}
+
+TEXT_COLUMNS = ("name", "location", "officer_director", "umbrella_co")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    # Same folding as the unicode61 tokenizer with remove_diacritics
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _tokens(text: str) -> list:
+    return _TOKEN.findall(_normalize(text or ""))
+
+
+def field_values(record: dict, fields: dict) -> dict:
+    """
+    Reads the indexed columns of a record, joining every field that maps to the same column.
+    Shared with the relationship graph, which stores the same columns per node.
+
+    Parameters:
+    - record (dict): A search result or summary record.
+    - fields (dict): Column -> record field names, e.g. FIELDS.
+
+    Returns:
+    - A dictionary mapping every column to its text, "" when the record has none of its fields.
+    """
+    keys = {}
+    for column, names in fields.items():
+        for name in names:
+            keys[name.replace("_", "").lower()] = column
+    values = {column: [] for column in fields}
+    for key, value in record.items():
+        column = keys.get(str(key).replace("_", "").lower())
+        if column is not None and value not in (None, ""):
+            values[column].append(str(value))
+    return {column: " ".join(parts) for column, parts in values.items()}
+
+
+class SearchIndex:
+    """
+    Offline builder search over a local SQLite FTS5 index.
+
+    The index is built from harvested search results and `members` sections, and answers the
+    same criteria as API.search_builder locally. Terms match as prefixes ("matt" finds
+    "Mattamy"), and a term that matches nothing is widened to the closest indexed terms, so small
+    typos still find results. refresh() re-harvests incrementally: records whose content did not
+    change are not rewritten. When the index is older than max_age and an API is attached,
+    search() asks the live API instead and indexes what it returns.
+    """
+
+    def __init__(self, path: str = "search_index.db", api=None, max_age: float = 24 * 3600, fields: dict = None) -> None:
+        """
+        Parameters:
+        - path (str): SQLite file holding the index.
+        - api (API): Client used by refresh() and by the live fallback (optional).
+        - max_age (float): Seconds after the last refresh at which the index counts as stale
+          (optional).
+        - fields (dict): Record fields read into each indexed column, merged over FIELDS (optional).
+        """
+        self.path = path
+        self.api = api
+        self.max_age = max_age
+        self.fields = {**FIELDS, **(fields or {})}
+        self._vocabulary = None
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS builders (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT UNIQUE,
+                    name TEXT,
+                    location TEXT,
+                    officer_director TEXT,
+                    umbrella_co TEXT,
+                    licence_status TEXT,
+                    record TEXT,
+                    hash TEXT,
+                    updated_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS builder_links (
+                    builder_id TEXT,
+                    field TEXT,
+                    value TEXT,
+                    source TEXT,
+                    PRIMARY KEY (builder_id, field, value)
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS builders_fts USING fts5(
+                    name, location, officer_director, umbrella_co,
+                    prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2'
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS builders_vocab USING fts5vocab(builders_fts, 'row');
+                CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, refreshed_at REAL);
+                CREATE INDEX IF NOT EXISTS builders_licence_status ON builders (licence_status COLLATE NOCASE);
+                """
+            )
+        except sqlite3.OperationalError as e:
+            self.conn.close()
+            raise RuntimeError(f"SearchIndex requires SQLite built with FTS5: {e}") from e
+        self.conn.commit()
+
+    def search(
+        self,
+        builderName: str = None,
+        builderLocation: str = None,
+        officerDirector: str = None,
+        umbrellaCo: str = None,
+        licenceStatus: str = None,
+        fuzzy: bool = True,
+        limit: int = 50,
+        fallback: bool = True,
+    ) -> list:
+        """
+        Searches the local index with the criteria of API.search_builder.
+
+        Parameters:
+        - builderName, builderLocation, officerDirector, umbrellaCo (str): Text matched word by
+          word against the indexed column, each word as a prefix (optional).
+        - licenceStatus (str): Exact licence status, case-insensitive (optional).
+        - fuzzy (bool): Widen words without any match to the closest indexed terms (optional).
+        - limit (int): Maximum number of results, best matches first (optional).
+        - fallback (bool): Query the live API when the index is stale and an API is attached
+          (optional).
+
+        Returns:
+        - A list of records, as harvested from the API where available.
+        """
+        criteria = {
+            "builderName": builderName,
+            "builderLocation": builderLocation,
+            "officerDirector": officerDirector,
+            "umbrellaCo": umbrellaCo,
+        }
+        if fallback and self.api is not None and self.is_stale():
+            return self.__live_search(criteria, licenceStatus, limit)
+
+        expressions = []
+        for criterion, text in criteria.items():
+            terms = [self.__term_expression(token, fuzzy) for token in _tokens(text)]
+            if terms:
+                expressions.append(f"{CRITERIA[criterion]} : ({' AND '.join(terms)})")
+
+        if expressions:
+            sql = (
+                "SELECT b.id, b.record, b.name, b.location, b.officer_director, b.umbrella_co, b.licence_status "
+                "FROM builders_fts JOIN builders b ON b.rowid = builders_fts.rowid WHERE builders_fts MATCH ?"
+            )
+            params = [" AND ".join(expressions)]
+        else:
+            sql = "SELECT id, record, name, location, officer_director, umbrella_co, licence_status FROM builders b WHERE 1"
+            params = []
+        if licenceStatus:
+            sql += " AND b.licence_status = ? COLLATE NOCASE"
+            params.append(licenceStatus)
+        sql += " ORDER BY bm25(builders_fts)" if expressions else " ORDER BY b.name"
+        sql += " LIMIT ?"
+        params.append(limit)
+
+        results = []
+        for ID, record, *columns in self.conn.execute(sql, params):
+            if record is not None:
+                results.append(json.loads(record))
+            else:
+                # Known only through member links: report what the links say about the builder
+                values = dict(zip(TEXT_COLUMNS + ("licence_status",), columns))
+                for field, value in self.__linked_values(ID).items():
+                    values[field] = values[field] or value
+                results.append({"id": ID, **values})
+        return results
+
+    def add_search_results(self, records: list, commit: bool = True, refreshed: bool = True) -> int:
+        """
+        Indexes builder records as returned by search_builder. Records identical to the indexed
+        version are skipped.
+
+        Parameters:
+        - records (list): Builder records.
+        - commit (bool): Commit the changes (optional).
+        - refreshed (bool): Mark the index as refreshed now, so search() answers from it until
+          max_age has passed (optional).
+
+        Returns:
+        - The number of builders added or updated.
+        """
+        changed = 0
+        for record in records:
+            ids = [ID for type_label, ID in discover_ids([record]) if type_label == "builder"]
+            if not ids:
+                continue
+            body = json.dumps(record, sort_keys=True, default=str)
+            digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+            row = self.conn.execute("SELECT hash FROM builders WHERE id = ?", (ids[0],)).fetchone()
+            if row is not None and row[0] == digest:
+                continue
+            values = field_values(record, self.fields)
+            self.conn.execute(
+                """
+                INSERT INTO builders (id, name, location, officer_director, umbrella_co, licence_status, record, hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    name = excluded.name, location = excluded.location,
+                    officer_director = excluded.officer_director, umbrella_co = excluded.umbrella_co,
+                    licence_status = excluded.licence_status, record = excluded.record,
+                    hash = excluded.hash, updated_at = excluded.updated_at
+                """,
+                (
+                    ids[0], values["name"], values["location"], values["officer_director"],
+                    values["umbrella_co"], values["licence_status"], body, digest, time.time(),
+                ),
+            )
+            self.__reindex(ids[0])
+            changed += 1
+        if refreshed:
+            self.__mark_refreshed()
+        if commit:
+            self.conn.commit()
+        return changed
+
+    def add_members(
+        self, type_label: str, ID: str, members: list, name: str = None, commit: bool = True, refreshed: bool = True
+    ) -> None:
+        """
+        Indexes the `members` section of a builder or umbrella company.
+
+        For an umbrella company, every member builder becomes searchable by the umbrella's name
+        (or its ID when no name is given) through umbrellaCo. For a builder, the names of its
+        members become searchable through officerDirector. Earlier links from the same source
+        are replaced. Like add_search_results, marks the index as refreshed unless refreshed=False.
+        """
+        source = f"{type_label}:{ID}"
+        affected = {row[0] for row in self.conn.execute("SELECT builder_id FROM builder_links WHERE source = ?", (source,))}
+        self.conn.execute("DELETE FROM builder_links WHERE source = ?", (source,))
+
+        links = []
+        if type_label == "umbrella":
+            for found_type, builder_id in discover_ids(members):
+                if found_type == "builder":
+                    links.append((builder_id, "umbrella_co", name or ID, source))
+        else:
+            for record in members or ():
+                if isinstance(record, dict):
+                    member_name = field_values(record, self.fields)["name"]
+                    if member_name and classify_id(member_name) is None:
+                        links.append((ID, "officer_director", member_name, source))
+        self.conn.executemany("INSERT OR IGNORE INTO builder_links VALUES (?, ?, ?, ?)", links)
+
+        for builder_id in affected | {link[0] for link in links}:
+            self.conn.execute("INSERT OR IGNORE INTO builders (id, updated_at) VALUES (?, ?)", (builder_id, time.time()))
+            self.__reindex(builder_id)
+        if refreshed:
+            self.__mark_refreshed()
+        if commit:
+            self.conn.commit()
+
+    def refresh(self, seeds: list = None, umbrella_ids: list = (), builder_member_ids: list = ()) -> dict:
+        """
+        Harvests the API into the index. Only records that changed are rewritten.
+
+        Parameters:
+        - seeds (list): Builder searches to harvest, as dictionaries of search_builder keyword
+          arguments (optional, defaults to one unfiltered search of every page).
+        - umbrella_ids (list): Umbrella companies whose summary and members are indexed (optional).
+        - builder_member_ids (list): Builders whose members are indexed (optional).
+
+        Returns:
+        - Counts of updated builders and indexed member sections.
+        """
+        if self.api is None:
+            raise ValueError("refresh() requires a SearchIndex created with an api")
+        stats = {"builders_updated": 0, "members_indexed": 0}
+        page = []
+        for seed in seeds if seeds is not None else [{}]:
+            for record in self.api.iter_search_builder(**seed):
+                page.append(record)
+                if len(page) >= 500:
+                    stats["builders_updated"] += self.add_search_results(page, refreshed=False)
+                    page = []
+        stats["builders_updated"] += self.add_search_results(page, refreshed=False)
+
+        for type_label, ids, sections in (
+            ("umbrella", umbrella_ids, ["summary", "members"]),
+            ("builder", builder_member_ids, ["members"]),
+        ):
+            if not ids:
+                continue
+            for ID, data in self.api.fetch_many(ids, is_umbrella=type_label == "umbrella", sections=sections):
+                if isinstance(data, Exception):
+                    print(f"Error indexing {type_label} ID {ID}: {str(data)}")
+                    continue
+                summary = data.get("summary")
+                if isinstance(summary, list):
+                    summary = summary[0] if summary else None
+                name = field_values(summary, self.fields)["name"] if isinstance(summary, dict) else None
+                self.add_members(type_label, ID, data.get("members"), name=name, commit=False, refreshed=False)
+                stats["members_indexed"] += 1
+            self.conn.commit()
+
+        self.__mark_refreshed()
+        self.conn.commit()
+        print(f"Search index refreshed: {stats}")
+        return stats
+
+    def is_stale(self) -> bool:
+        refreshed_at = self.refreshed_at()
+        return refreshed_at is None or time.time() - refreshed_at > self.max_age
+
+    def refreshed_at(self):
+        row = self.conn.execute("SELECT refreshed_at FROM index_state WHERE key = 'refreshed_at'").fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __live_search(self, criteria: dict, licenceStatus: str, limit: int) -> list:
+        """
+        Answers a search from the live API and indexes the results on the way.
+        """
+        records = []
+        for record in self.api.iter_search_builder(**criteria, licenceStatus=licenceStatus):
+            records.append(record)
+            if len(records) >= limit:
+                break
+        # A handful of live results does not make the rest of the index current
+        self.add_search_results(records, refreshed=False)
+        return records
+
+    def __mark_refreshed(self) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO index_state VALUES ('refreshed_at', ?)", (time.time(),))
+
+    def __linked_values(self, builder_id: str) -> dict:
+        """
+        Joins the values that member links add to the columns of one builder.
+        """
+        values = {}
+        for field, value in self.conn.execute(
+            "SELECT field, value FROM builder_links WHERE builder_id = ? ORDER BY value", (builder_id,)
+        ):
+            values[field] = f"{values.get(field, '')} {value}".strip()
+        return values
+
+    def __reindex(self, builder_id: str) -> None:
+        """
+        Rewrites the full-text row of one builder from its own columns and its member links.
+        """
+        row = self.conn.execute(
+            "SELECT rowid, name, location, officer_director, umbrella_co FROM builders WHERE id = ?", (builder_id,)
+        ).fetchone()
+        rowid, *columns = row
+        values = dict(zip(TEXT_COLUMNS, (value or "" for value in columns)))
+        for field, value in self.__linked_values(builder_id).items():
+            values[field] = f"{values[field]} {value}".strip()
+        self.conn.execute("DELETE FROM builders_fts WHERE rowid = ?", (rowid,))
+        self.conn.execute(
+            "INSERT INTO builders_fts (rowid, name, location, officer_director, umbrella_co) VALUES (?, ?, ?, ?, ?)",
+            (rowid, *(values[column] for column in TEXT_COLUMNS)),
+        )
+        self._vocabulary = None
+
+    def __term_expression(self, token: str, fuzzy: bool) -> str:
+        """
+        Builds the MATCH expression of one query word: a prefix query, widened to the closest
+        indexed terms when nothing starts with the word.
+        """
+        prefix = f'"{token}"*'
+        if not fuzzy:
+            return prefix
+        vocabulary = self.__vocabulary()
+        # Terms are sorted, so the first term not below the word tells whether it is a prefix
+        position = bisect.bisect_left(vocabulary, token)
+        if position < len(vocabulary) and vocabulary[position].startswith(token):
+            return prefix
+        candidates = [
+            term for term in vocabulary
+            if term[:1] == token[:1] and abs(len(term) - len(token)) <= 2
+        ]
+        close = difflib.get_close_matches(token, candidates, n=3, cutoff=0.75)
+        if not close:
+            return prefix
+        return "(" + " OR ".join([prefix] + [f'"{term}"' for term in close]) + ")"
+
+    def __vocabulary(self) -> list:
+        if self._vocabulary is None:
+            self._vocabulary = [row[0] for row in self.conn.execute("SELECT term FROM builders_vocab ORDER BY term")]
+        return self._vocabulary
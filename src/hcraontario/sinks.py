@@ -0,0 +1,680 @@
+import csv
+import datetime
+import json
+import os
+import sqlite3
+
+from .records import RecordBatch, as_batch, loads
+
+# Excel refuses more rows than this per sheet, header included.
+EXCEL_MAX_ROWS = 1048576
+
+
+class _SectionSpool:
+    """
+    Append-only spool of the rows of one section.
+
+    Rows are written to `<path>.part` as JSON arrays as soon as they arrive, so only the column
+    list is kept in memory. Columns first seen later in the stream are appended to that list and
+    recorded in the `<path>.columns.json` sidecar; earlier rows are padded when the spool is read
+    back. A run that dies leaves the part file and its sidecar behind, so nothing already
+    fetched is lost.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.part_path = path + ".part"
+        self.schema_path = path + ".columns.json"
+        self.columns = []
+        self.count = 0
+        self._positions = {}
+        self._file = open(self.part_path, "w", encoding="utf-8")
+
+    def write(self, records) -> None:
+        batch = as_batch(records)
+        new_columns = False
+        for column in batch.columns:
+            if column not in self._positions:
+                self._positions[column] = len(self.columns)
+                self.columns.append(column)
+                new_columns = True
+
+        positions = [self._positions[column] for column in batch.columns]
+        width = max(positions, default=-1) + 1
+        in_order = positions == list(range(width))
+        for values in batch.rows():
+            if in_order:
+                row = list(values)
+            else:
+                row = [None] * width
+                for position, value in zip(positions, values):
+                    row[position] = value
+            # Trailing missing values are implied by the final header
+            while row and row[-1] is None:
+                row.pop()
+            self._file.write(json.dumps(row, default=str))
+            self._file.write("\n")
+        self.count += len(batch)
+        if new_columns:
+            with open(self.schema_path, "w", encoding="utf-8") as f:
+                json.dump(self.columns, f)
+
+    def rows(self):
+        """
+        Closes the spool for writing and yields every row padded to the final set of columns.
+        """
+        self._file.close()
+        width = len(self.columns)
+        with open(self.part_path, encoding="utf-8") as f:
+            for line in f:
+                row = loads(line)
+                row.extend([None] * (width - len(row)))
+                yield row
+
+    def discard(self) -> None:
+        self._file.close()
+        for path in (self.part_path, self.schema_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _cell(value):
+    # Nested structures are stored as their text representation, as pandas did
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+
+class CSVSink:
+    """
+    Streams records into one CSV file per section with flat memory use.
+
+    Records are spooled to disk as they are written; the CSV files, with a header covering every
+    column seen in the stream, are produced by close().
+    """
+
+    def __init__(self, path_template: str) -> None:
+        """
+        Parameters:
+        - path_template (str): Output path containing a `{section}` placeholder,
+          e.g. "builder_{section}_master.csv".
+        """
+        self.path_template = path_template
+        self._spools = {}
+
+    def write(self, section: str, records) -> None:
+        """
+        Appends records (a list or a RecordBatch) to a section.
+        """
+        if section not in self._spools:
+            self._spools[section] = _SectionSpool(self.path_template.format(section=section))
+        self._spools[section].write(records)
+
+    def close(self) -> dict:
+        """
+        Writes the final CSV files and removes the spools.
+
+        Returns:
+        - A dictionary mapping each section to a (filename, record count) tuple.
+        """
+        written = {}
+        for section, spool in self._spools.items():
+            with open(spool.path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(spool.columns)
+                for row in spool.rows():
+                    writer.writerow([_cell(value) for value in row])
+            spool.discard()
+            written[section] = (spool.path, spool.count)
+        self._spools = {}
+        return written
+
+
+class XLSXSink:
+    """
+    Streams records into one sheet per section of a single Excel workbook.
+
+    Records are spooled to disk as they are written. close() builds the workbook with
+    openpyxl's write-only mode, which keeps memory flat. A section with more rows than one
+    sheet can hold continues on `<section>_2`, `<section>_3`, ...
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Parameters:
+        - filename (str): Path of the Excel file to create.
+        """
+        import openpyxl  # noqa: F401  # fail before anything is fetched when the optional dependency is missing
+
+        self.filename = filename
+        self._spools = {}
+
+    def write(self, section: str, records) -> None:
+        """
+        Appends records (a list or a RecordBatch) to a section.
+        """
+        if section not in self._spools:
+            # Sheet names are unique per workbook, so they make unique spool names
+            spool_path = f"{self.filename}.{section[:31]}"
+            self._spools[section] = _SectionSpool(spool_path)
+        self._spools[section].write(records)
+
+    def close(self) -> dict:
+        """
+        Writes the workbook and removes the spools.
+
+        Returns:
+        - A dictionary mapping each section to a (sheet name, record count) tuple.
+        """
+        from openpyxl import Workbook
+
+        written = {}
+        if not self._spools:
+            return written
+
+        workbook = Workbook(write_only=True)
+        for section, spool in self._spools.items():
+            # Excel has a 31 character limit for sheet names
+            sheet_name = section[:31]
+            sheet, sheet_rows, sheet_number = None, EXCEL_MAX_ROWS, 1
+            for row in spool.rows():
+                if sheet_rows >= EXCEL_MAX_ROWS:
+                    title = sheet_name if sheet_number == 1 else f"{section[:27]}_{sheet_number}"
+                    sheet = workbook.create_sheet(title=title)
+                    sheet.append(spool.columns)
+                    sheet_rows, sheet_number = 1, sheet_number + 1
+                sheet.append([_cell(value) for value in row])
+                sheet_rows += 1
+            written[section] = (sheet_name, spool.count)
+
+        workbook.save(self.filename)
+        for spool in self._spools.values():
+            spool.discard()
+        self._spools = {}
+        return written
+
+
+def _sql_value(value):
+    # SQLite has no nested types, so lists and dicts are stored as JSON text
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _sql_type(value) -> str:
+    if isinstance(value, bool) or isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SQLiteSink:
+    """
+    Batched, transactional writer for SQLite.
+
+    Rows are buffered per table and written with executemany inside a single transaction per
+    batch. Tables are created on first use and gain new columns with ALTER TABLE ADD COLUMN when
+    later records bring fields the table does not have yet. Tables with an index_column (by
+    default `source_id`) get an index on it. The connection runs in WAL mode with pragmas tuned
+    for bulk loading.
+
+    Statements queued with execute() are run in the same transaction as the buffered rows, before
+    them, which lets bookkeeping such as "mark this ID processed" commit atomically with its data.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-65536",
+    )
+
+    def __init__(self, db_path: str, batch_size: int = 5000, index_column: str = "source_id") -> None:
+        """
+        Parameters:
+        - db_path (str): Path of the SQLite database file.
+        - batch_size (int): Number of buffered rows after which commit_point() flushes (optional).
+        - index_column (str): Column that gets an index in every table that has it (optional).
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.index_column = index_column
+        self.conn = sqlite3.connect(db_path)
+        for pragma in self.PRAGMAS:
+            self.conn.execute(pragma)
+
+        self._columns = {}  # table -> list of existing columns
+        self._indexed = set()
+        self._buffers = {}  # table -> list of RecordBatch
+        self._statements = []
+        self._buffered = 0
+        self.rows_written = {}
+
+    def write(self, table: str, records) -> None:
+        """
+        Buffers records (a list or a RecordBatch) for a table. Non-dict records are stored in a
+        `value` column.
+        """
+        batch = as_batch(records)
+        self._buffers.setdefault(table, []).append(batch)
+        self._buffered += len(batch)
+
+    def execute(self, sql: str, params: tuple = ()) -> None:
+        """
+        Queues a statement to run in the next flush, before the buffered rows are inserted.
+        """
+        self._statements.append((sql, params))
+
+    def has_table(self, table: str) -> bool:
+        """
+        Returns True if the table exists in the database (rows still in the buffer do not count).
+        """
+        return bool(self.__existing_columns(table))
+
+    def drop_table(self, table: str) -> None:
+        """
+        Flushes pending work and drops a table, so that it is recreated by the next write.
+        """
+        self.flush()
+        self.conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+        self.conn.commit()
+        self._columns.pop(table, None)
+        self._indexed.discard(table)
+
+    def commit_point(self) -> None:
+        """
+        Marks a consistent point in the stream, e.g. the end of an ID. Flushes if the buffer holds
+        at least batch_size rows.
+        """
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes every queued statement and buffered row in one transaction.
+        """
+        if not self._buffers and not self._statements:
+            return
+
+        with self.conn:
+            for sql, params in self._statements:
+                self.conn.execute(sql, params)
+            for table, batches in self._buffers.items():
+                rows = sum(len(batch) for batch in batches)
+                if rows:
+                    self.__insert(table, batches)
+                    self.rows_written[table] = self.rows_written.get(table, 0) + rows
+
+        self._statements = []
+        self._buffers = {}
+        self._buffered = 0
+
+    def close(self) -> dict:
+        """
+        Flushes and closes the connection.
+
+        Returns:
+        - A dictionary mapping each table to the number of rows written through this sink.
+        """
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+        return self.rows_written
+
+    def __existing_columns(self, table: str) -> list:
+        if table not in self._columns:
+            columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({_quote(table)})")]
+            if not columns:
+                return []
+            self._columns[table] = columns
+        return self._columns[table]
+
+    def __insert(self, table: str, batches: list) -> None:
+        # Union of the columns in this batch, in first-seen order, with a sample value for typing
+        samples = {}
+        for batch in batches:
+            for column, values in batch.columns.items():
+                if samples.get(column) is None:
+                    samples[column] = next((value for value in values if value is not None), None)
+
+        existing = self.__existing_columns(table)
+        if not existing:
+            definitions = ", ".join(f"{_quote(c)} {_sql_type(v)}" for c, v in samples.items())
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({definitions})")
+            existing = self._columns[table] = list(samples)
+        else:
+            new_columns = [c for c in samples if c not in existing]
+            for column in new_columns:
+                self.conn.execute(
+                    f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} {_sql_type(samples[column])}"
+                )
+                existing.append(column)
+
+        if self.index_column in existing and table not in self._indexed:
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote('idx_' + table + '_' + self.index_column)} "
+                f"ON {_quote(table)} ({_quote(self.index_column)})"
+            )
+            self._indexed.add(table)
+
+        columns = list(samples)
+        placeholders = ", ".join("?" for _ in columns)
+        self.conn.executemany(
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) VALUES ({placeholders})",
+            (row for batch in batches for row in self.__rows(batch, columns)),
+        )
+
+    @staticmethod
+    def __rows(batch: RecordBatch, columns: list):
+        # Each batch's columns are placed into the insert's column order; missing ones are NULL
+        missing = [None] * batch.num_rows
+        values = [batch.columns.get(column, missing) for column in columns]
+        for row in zip(*values):
+            yield [_sql_value(value) for value in row]
+
+
+def _arrow_value(value):
+    # Parquet columns are flat here, so lists and dicts are stored as JSON text
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _arrow_table(records, string_columns: set):
+    """
+    Builds a pyarrow Table from records (a list or a RecordBatch). Nested values become JSON
+    text. A column holding values of incompatible types is added to string_columns and stored
+    as text.
+    """
+    import pyarrow as pa
+
+    batch = as_batch(records)
+    arrays, names = [], []
+    for column, values in batch.columns.items():
+        kinds = {type(value) for value in values if value is not None}
+        if kinds & {dict, list}:
+            values = [_arrow_value(value) for value in values]
+            kinds = {type(value) for value in values if value is not None}
+        # int and float mix fine (as float); any other mix of types is stored as text
+        if len(kinds) > 1 and not kinds <= {int, float}:
+            string_columns.add(column)
+        if column in string_columns:
+            values = [None if value is None else str(value) for value in values]
+        names.append(column)
+        arrays.append(pa.array(values))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _concat_tables(tables: list, string_columns: set):
+    """
+    Concatenates tables built by _arrow_table. Columns are unified by name; nulls and
+    int/float mixes are promoted. A column whose types conflict across tables is added to
+    string_columns and converted to text in every table.
+    """
+    import pyarrow as pa
+
+    if len(tables) == 1:
+        return tables[0]
+    try:
+        return pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    types = {}
+    for table in tables:
+        for field in table.schema:
+            if not pa.types.is_null(field.type):
+                types.setdefault(field.name, set()).add(field.type)
+    for name, kinds in types.items():
+        if len(kinds) > 1 and not all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in kinds):
+            string_columns.add(name)
+
+    def as_text(table):
+        for i, name in enumerate(table.column_names):
+            if name in string_columns and not pa.types.is_string(table.schema.field(i).type):
+                # Converted in Python so the text matches what str() gives for a single table
+                values = [None if value is None else str(value) for value in table.column(i).to_pylist()]
+                table = table.set_column(i, name, pa.array(values, pa.string()))
+        return table
+
+    return pa.concat_tables([as_text(table) for table in tables], promote_options="permissive")
+
+
+def _conform(table, schema):
+    """
+    Reorders, casts and null-fills a table's columns to match a schema.
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            arrays.append(table.column(field.name).cast(field.type))
+        else:
+            arrays.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet_file(path: str, records: list, compression: str = "zstd") -> int:
+    """
+    Writes records to a single Parquet file.
+
+    Returns:
+    - The number of rows written.
+    """
+    import pyarrow.parquet as pq
+
+    table = _arrow_table(records, set())
+    pq.write_table(table, path, compression=compression)
+    return table.num_rows
+
+
+class _ParquetSection:
+    """
+    Incremental writer for one section of a ParquetSink: each flushed batch becomes a row group.
+    When a batch widens the schema, the current file is closed and a new part file is started.
+    """
+
+    def __init__(self, directory: str, compression: str) -> None:
+        self.directory = directory
+        self.compression = compression
+        self.writer = None
+        self.parts = 0
+        self.string_columns = set()
+
+    def write(self, table) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is not None:
+            try:
+                schema = pa.unify_schemas([self.writer.schema, table.schema], promote_options="permissive")
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Types changed incompatibly: from now on the conflicting columns are text
+                for field in table.schema:
+                    if field.name in self.writer.schema.names and self.writer.schema.field(field.name).type != field.type:
+                        self.string_columns.add(field.name)
+                schema = None
+            if schema is not None and schema.equals(self.writer.schema):
+                self.writer.write_table(_conform(table, schema))
+                return
+            self.writer.close()
+            self.writer = None
+            if schema is None:
+                table = table.cast(
+                    pa.schema(
+                        pa.field(f.name, pa.string()) if f.name in self.string_columns else f
+                        for f in table.schema
+                    )
+                )
+            else:
+                table = _conform(table, schema)
+
+        # A column with no values yet has Arrow's null type, which dataset readers cannot cast
+        # other files' values to; store it as text, the type of nearly every HCRA field
+        if any(pa.types.is_null(field.type) for field in table.schema):
+            table = table.cast(pa.schema(
+                pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema
+            ))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"part-{self.parts:05d}.parquet")
+        self.parts += 1
+        self.writer = pq.ParquetWriter(path, table.schema, compression=self.compression)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ParquetSink:
+    """
+    Streams records into one compressed, typed Parquet dataset per section.
+
+    Records are converted to Arrow columns in chunks as they arrive, buffered per section and
+    written as a new row group every row_group_size rows, so memory stays bounded while IDs
+    stream in. Each section is a directory under root that pyarrow, pandas, DuckDB or Spark can
+    read as one dataset. Optionally the datasets are
+    partitioned Hive-style by `source_id` or by `snapshot_date`, so readers can skip
+    partitions as well as columns.
+    """
+
+    # Rows accumulated per section before they are converted to Arrow columns.
+    CHUNK_ROWS = 2048
+
+    def __init__(self, root: str, partition_by: str = None, row_group_size: int = 50000, compression: str = "zstd", snapshot_date: str = None) -> None:
+        """
+        Parameters:
+        - root (str): Directory holding one dataset directory per section.
+        - partition_by (str): None, "source_id" or "snapshot_date" (optional).
+        - row_group_size (int): Rows buffered per section before a row group is written (optional).
+        - compression (str): Parquet compression codec (optional).
+        - snapshot_date (str): Value of the snapshot_date partition (optional, defaults to today).
+        """
+        if partition_by not in (None, "source_id", "snapshot_date"):
+            raise ValueError("partition_by must be None, 'source_id' or 'snapshot_date'")
+        import pyarrow  # noqa: F401  # fail early when the optional dependency is missing
+
+        self.root = root
+        self.partition_by = partition_by
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.snapshot_date = snapshot_date or datetime.date.today().isoformat()
+        self._buffers = {}  # section -> {source_id partition or None: (pending batches, Arrow tables)}
+        self._buffered = {}
+        self._sections = {}  # (section, partition) -> _ParquetSection
+        self._string_columns = {}  # section -> columns stored as text
+        self._counts = {}
+
+    def write(self, section: str, records) -> None:
+        """
+        Appends records (a list, a RecordBatch or a pyarrow Table built by _arrow_table) to a
+        section, writing a row group once enough rows are buffered.
+        """
+        import pyarrow as pa
+
+        if isinstance(records, pa.Table):
+            batch = records
+            if self.partition_by == "source_id":
+                batch = RecordBatch(records.to_pydict(), records.num_rows)
+        else:
+            batch = as_batch(records)
+        if not len(batch):
+            return
+        buffer = self._buffers.setdefault(section, {})
+        parts = batch.split("source_id").items() if self.partition_by == "source_id" else [(None, batch)]
+        for key, part in parts:
+            pending, tables = buffer.setdefault(key, ([], []))
+            pending.append(part)
+            # Pending rows are converted to Arrow in large chunks: the Arrow columns take a
+            # fraction of the memory of the Python values, and few large tables carry far less
+            # overhead than one table per ID
+            if sum(len(b) for b in pending) >= self.CHUNK_ROWS:
+                tables.append(self.__convert(pending, self._string_columns.setdefault(section, set())))
+                pending.clear()
+        self._counts[section] = self._counts.get(section, 0) + len(batch)
+        self._buffered[section] = self._buffered.get(section, 0) + len(batch)
+        if self._buffered[section] >= self.row_group_size:
+            self.flush(section)
+
+    def flush(self, section: str = None) -> None:
+        """
+        Writes the buffered rows of one section (or of all sections) as row groups.
+        """
+        import pyarrow as pa
+
+        for name in [section] if section is not None else list(self._buffers):
+            buffer = self._buffers.pop(name, None)
+            self._buffered.pop(name, None)
+            if not buffer:
+                continue
+            string_columns = self._string_columns.setdefault(name, set())
+            for key, (pending, tables) in buffer.items():
+                if pending:
+                    tables.append(self.__convert(pending, string_columns))
+                table = _concat_tables(tables, string_columns)
+                if self.partition_by == "source_id":
+                    # The directory name holds the ID; readers reject a file column of the same name
+                    table = table.select([column for column in table.column_names if column != "source_id"])
+                    # One file per ID and flush: keeping a writer open per ID would exhaust file handles
+                    writer = self.__section(name, f"source_id={key}")
+                    writer.write(table)
+                    writer.close()
+                elif self.partition_by == "snapshot_date":
+                    self.__section(name, f"snapshot_date={self.snapshot_date}").write(table)
+                else:
+                    self.__section(name, None).write(table)
+        # Arrow's allocator keeps freed pages for reuse; returning them after each row group keeps
+        # the process size close to what the buffers actually hold
+        pa.default_memory_pool().release_unused()
+
+    def close(self) -> dict:
+        """
+        Flushes every buffer and closes the files.
+
+        Returns:
+        - A dictionary mapping each section to a (dataset directory, record count) tuple.
+        """
+        self.flush()
+        for writer in self._sections.values():
+            writer.close()
+        self._sections = {}
+        return {section: (os.path.join(self.root, section), count) for section, count in self._counts.items()}
+
+    @staticmethod
+    def __convert(pending: list, string_columns: set):
+        """
+        Converts pending RecordBatches and small Arrow tables, e.g. one per ID from the workers
+        of an ExportPipeline, into one contiguous Arrow table.
+        """
+        tables, batches = [], []
+        for item in pending + [None]:
+            if isinstance(item, RecordBatch):
+                batches.append(item)
+                continue
+            if batches:
+                tables.append(_arrow_table(RecordBatch.concat(batches), string_columns))
+                batches = []
+            if item is not None:
+                tables.append(item)
+        table = _concat_tables(tables, string_columns)
+        return table.combine_chunks() if len(tables) > 1 else table
+
+    def __section(self, section: str, partition: str) -> _ParquetSection:
+        key = (section, partition)
+        writer = self._sections.get(key)
+        if writer is None:
+            directory = os.path.join(self.root, section, partition) if partition else os.path.join(self.root, section)
+            writer = self._sections[key] = _ParquetSection(directory, self.compression)
+            writer.string_columns = self._string_columns.setdefault(section, set())
+        return writer
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# Fields identifying a record within a section, so that a record whose other fields changed is
+# reported as modified rather than as removed and added. An empty tuple keys records by their
+# position, which suits single-record sections such as summary. Sections without an entry are
+# keyed by content hash: a change then shows up as one removed and one added record.
+DEFAULT_RECORD_KEYS = {
+    "summary": (),
+}
+
+
+def _dump(record) -> str:
+    return json.dumps(record, sort_keys=True, default=str)
+
+
+def keyed_records(value, key_fields) -> dict:
+    """
+    Splits a section into records keyed by their record key.
+
+    Parameters:
+    - value: The section as returned by the API, a list of records or a single record.
+    - key_fields (tuple): Fields forming the record key, () to key by position, or None to key
+      by content hash. Records missing one of the fields are keyed by content hash.
+
+    Returns:
+    - A dictionary mapping each record key to a tuple (hash, canonical JSON of the record).
+      Records sharing a key are told apart by a "#<n>" suffix in order of appearance.
+    """
+    if value is None:
+        records = []
+    elif isinstance(value, list):
+        records = value
+    else:
+        records = [value]
+
+    keyed = {}
+    for position, record in enumerate(records):
+        if not isinstance(record, dict):
+            record = {"value": record}
+        body = _dump(record)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        if key_fields == ():
+            key = str(position)
+        elif key_fields and all(field in record for field in key_fields):
+            key = _dump([record[field] for field in key_fields])
+        else:
+            key = digest
+
+        unique_key, n = key, 1
+        while unique_key in keyed:
+            n += 1
+            unique_key = f"{key}#{n}"
+        keyed[unique_key] = (digest, body)
+    return keyed
+
+
+class SnapshotStore:
+    """
+    Latest snapshot of every fetched builder and umbrella company, stored in SQLite and keyed by
+    (type, ID, section, record key) with a hash per record.
+
+    diff() compares a new fetch with the stored snapshot, updates the snapshot, and returns only
+    the records that were added, removed or modified. Unchanged sections are recognised by a
+    section hash without looking at their records. Every change is also appended to the
+    `changes` table, whose increasing `seq` lets downstream jobs read only what they have not
+    seen yet. Changes and snapshot updates commit in the same transaction.
+    """
+
+    def __init__(self, path: str, record_keys: dict = None, keep_changes: bool = True) -> None:
+        """
+        Parameters:
+        - path (str): SQLite file holding the snapshot and the change feed.
+        - record_keys (dict): Fields forming the record key per section, merged over
+          DEFAULT_RECORD_KEYS, e.g. {"convictions": ("CONVICTIONID",)} (optional).
+        - keep_changes (bool): Append every change to the `changes` table (optional).
+        """
+        self.path = path
+        self.record_keys = {**DEFAULT_RECORD_KEYS, **(record_keys or {})}
+        self.keep_changes = keep_changes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS snapshot_sections (
+                type TEXT,
+                id TEXT,
+                section TEXT,
+                hash TEXT,
+                updated_at REAL,
+                PRIMARY KEY (type, id, section)
+            );
+            CREATE TABLE IF NOT EXISTS snapshot_records (
+                type TEXT,
+                id TEXT,
+                section TEXT,
+                record_key TEXT,
+                hash TEXT,
+                record TEXT,
+                PRIMARY KEY (type, id, section, record_key)
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                observed_at REAL,
+                type TEXT,
+                id TEXT,
+                section TEXT,
+                record_key TEXT,
+                change TEXT,
+                changed_fields TEXT,
+                old TEXT,
+                new TEXT
+            );
+            """
+        )
+        self.conn.commit()
+
+    def diff(self, type_label: str, ID: str, data: dict) -> list:
+        """
+        Compares a fetched detail dictionary with the stored snapshot of that ID and replaces the
+        snapshot with it. Sections absent from data are left untouched; a section fetched empty
+        counts as every stored record removed. The update becomes durable on commit().
+
+        Parameters:
+        - type_label (str): "builder" or "umbrella".
+        - ID (str): The builder or umbrella ID.
+        - data (dict): The dictionary returned by get_builder_detail/get_umbrella_detail.
+
+        Returns:
+        - A list of change dictionaries with the keys type, id, section, record_key, change
+          ("added", "removed" or "modified"), changed_fields, old, new and observed_at.
+        """
+        now = time.time()
+        stored_hashes = dict(
+            self.conn.execute(
+                "SELECT section, hash FROM snapshot_sections WHERE type = ? AND id = ?", (type_label, ID)
+            ).fetchall()
+        )
+
+        changes = []
+        for section, value in data.items():
+            records = keyed_records(value, self.record_keys.get(section))
+            section_hash = hashlib.sha256(
+                "".join(f"{key}:{digest}" for key, (digest, _) in sorted(records.items())).encode("utf-8")
+            ).hexdigest()
+            if stored_hashes.get(section) == section_hash:
+                continue
+
+            changes += self.__diff_section(type_label, ID, section, records)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshot_sections VALUES (?, ?, ?, ?, ?)",
+                (type_label, ID, section, section_hash, now),
+            )
+
+        for change in changes:
+            change["observed_at"] = now
+        if self.keep_changes and changes:
+            self.conn.executemany(
+                "INSERT INTO changes (observed_at, type, id, section, record_key, change, changed_fields, old, new) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        now, c["type"], c["id"], c["section"], c["record_key"], c["change"],
+                        json.dumps(c["changed_fields"]),
+                        _dump(c["old"]) if c["old"] is not None else None,
+                        _dump(c["new"]) if c["new"] is not None else None,
+                    )
+                    for c in changes
+                ],
+            )
+        return changes
+
+    def changes(self, since: int = 0, limit: int = None):
+        """
+        Yields the recorded changes with a seq greater than since, oldest first, as
+        dictionaries that also carry their seq and observed_at.
+        """
+        sql = "SELECT seq, observed_at, type, id, section, record_key, change, changed_fields, old, new FROM changes WHERE seq > ? ORDER BY seq"
+        params = (since,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        for seq, observed_at, type_label, ID, section, record_key, change, changed_fields, old, new in self.conn.execute(sql, params):
+            yield {
+                "seq": seq,
+                "observed_at": observed_at,
+                "type": type_label,
+                "id": ID,
+                "section": section,
+                "record_key": record_key,
+                "change": change,
+                "changed_fields": json.loads(changed_fields),
+                "old": json.loads(old) if old is not None else None,
+                "new": json.loads(new) if new is not None else None,
+            }
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        try:
+            self.conn.commit()
+        finally:
+            self.conn.close()
+
+    def __diff_section(self, type_label: str, ID: str, section: str, records: dict) -> list:
+        stored = {
+            key: (digest, body)
+            for key, digest, body in self.conn.execute(
+                "SELECT record_key, hash, record FROM snapshot_records WHERE type = ? AND id = ? AND section = ?",
+                (type_label, ID, section),
+            )
+        }
+
+        changes = []
+        for key, (digest, body) in records.items():
+            old = stored.get(key)
+            if old is not None and old[0] == digest:
+                continue
+            new_record = json.loads(body)
+            if old is None:
+                changes.append(self.__change(type_label, ID, section, key, "added", [], None, new_record))
+            else:
+                old_record = json.loads(old[1])
+                changed_fields = sorted(
+                    field for field in set(old_record) | set(new_record)
+                    if old_record.get(field) != new_record.get(field)
+                )
+                changes.append(
+                    self.__change(type_label, ID, section, key, "modified", changed_fields, old_record, new_record)
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshot_records VALUES (?, ?, ?, ?, ?, ?)",
+                (type_label, ID, section, key, digest, body),
+            )
+
+        for key, (_, body) in stored.items():
+            if key not in records:
+                changes.append(self.__change(type_label, ID, section, key, "removed", [], json.loads(body), None))
+                self.conn.execute(
+                    "DELETE FROM snapshot_records WHERE type = ? AND id = ? AND section = ? AND record_key = ?",
+                    (type_label, ID, section, key),
+                )
+        return changes
+
+    def __change(self, type_label: str, ID: str, section: str, key: str, change: str, changed_fields: list, old, new) -> dict:
+        return {
+            "type": type_label,
+            "id": ID,
+            "section": section,
+            "record_key": key,
+            "change": change,
+            "changed_fields": changed_fields,
+            "old": old,
+            "new": new,
+        }
+
+
+class JSONLChangeFeed:
+    """
+    Appends changes to a JSON Lines file, one change per line.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, changes: list) -> None:
+        for change in changes:
+            self._file.write(json.dumps(change, default=str) + "\n")
+        self.count += len(changes)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> int:
+        """
+        Closes the file and returns the number of changes written.
+        """
+        self._file.close()
+        return self.count
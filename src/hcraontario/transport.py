@@ -0,0 +1,211 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+
+from .records import loads
+
+# Response headers worth keeping in a recording. Bodies are stored decoded, so transfer and
+# encoding headers would be wrong on replay.
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After", "Cache-Control")
+
+
+class _Headers(dict):
+    """
+    Response headers with case-insensitive lookup, like requests' CaseInsensitiveDict.
+    """
+
+    def __init__(self, headers=()) -> None:
+        super().__init__((str(k).lower(), v) for k, v in dict(headers).items())
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+
+class Response:
+    """
+    Fully read HTTP response, shaped like the parts of requests.Response the client uses.
+    """
+
+    def __init__(self, status_code: int, headers, content: bytes) -> None:
+        self.status_code = status_code
+        self.headers = _Headers(headers)
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return loads(self.content)
+
+
+class ReplayMissError(LookupError):
+    """
+    Raised in replay mode for a request that was never recorded.
+    """
+
+
+def _accept_encoding(compression: bool) -> str:
+    if not compression:
+        return "identity"
+    encodings = "gzip, deflate"
+    # urllib3 decodes brotli only when one of these packages is installed
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        return encodings + ", br"
+    return encodings
+
+
+class RequestsTransport:
+    """
+    HTTP transport built on a requests.Session with a tuned connection pool.
+
+    The default requests adapter keeps at most 10 connections per host, so any concurrency
+    above that opens and tears down TCP/TLS connections on every request. Here the pool is sized
+    to the client's concurrency, connections are kept alive between requests, and every request
+    has connect and read timeouts.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 16,
+        pool_connections: int = 4,
+        keep_alive: bool = True,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        compression: bool = True,
+        headers: dict = None,
+    ) -> None:
+        """
+        Parameters:
+        - pool_maxsize (int): Connections kept open per host; should be at least the number of
+          concurrent requests (optional).
+        - pool_connections (int): Number of hosts a pool is kept for (optional).
+        - keep_alive (bool): Reuse connections between requests (optional).
+        - connect_timeout (float): Seconds to wait for a connection (optional).
+        - read_timeout (float): Seconds to wait for the server between bytes (optional).
+        - compression (bool): Ask for gzip/deflate compressed responses, and brotli when the
+          brotli package is installed (optional).
+        - headers (dict): Headers sent with every request. API adds its default headers to the
+          session for every header not given here (optional).
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.headers = dict(headers or {})
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers or {})
+        self.session.headers["Accept-Encoding"] = _accept_encoding(compression)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def get(self, url: str, params: dict = None, headers: dict = None):
+        """
+        Sends a GET request and returns the response with its body read.
+        """
+        return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class RecordReplayTransport:
+    """
+    Transport that records real responses to disk and serves them back without any network.
+
+    Each request is stored as one JSON file named after a hash of its URL and parameters.
+    Modes:
+
+    - "record": send every request through the wrapped transport and save the response
+    - "replay": serve recorded responses only; an unrecorded request raises ReplayMissError
+    - "auto": serve recorded responses, and record the ones that are missing
+    """
+
+    MODES = ("record", "replay", "auto")
+
+    def __init__(self, directory: str, mode: str = "replay", transport=None) -> None:
+        """
+        Parameters:
+        - directory (str): Directory holding the recordings; created if missing.
+        - mode (str): "record", "replay" or "auto" (optional).
+        - transport: Transport used to reach the network in record and auto modes (optional,
+          defaults to a RequestsTransport).
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode {mode!r}; expected one of {list(self.MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.transport = transport
+        if self.transport is None and mode != "replay":
+            self.transport = RequestsTransport()
+        self.hits = 0
+        self.recorded = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url: str, params: dict = None) -> str:
+        """
+        Returns the file a request is recorded in. Parameters set to None are not sent, so they
+        do not count.
+        """
+        items = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+        digest = hashlib.sha256(json.dumps([url, items]).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, url: str, params: dict = None, headers: dict = None):
+        path = self.path(url, params)
+        if self.mode != "record" and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                recording = json.load(f)
+            self.hits += 1
+            if "body_base64" in recording:
+                content = base64.b64decode(recording["body_base64"])
+            else:
+                content = recording["body"].encode("utf-8")
+            return Response(recording["status_code"], recording["headers"], content)
+        if self.mode == "replay":
+            raise ReplayMissError(f"No recording of GET {url} {params or {}} in {self.directory}")
+
+        response = self.transport.get(url, params=params, headers=headers)
+        self.__save(path, url, params, response)
+        return response
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    def __save(self, path: str, url: str, params: dict, response) -> None:
+        # Conditional requests answered with 304 carry no body worth replaying
+        if response.status_code == 304:
+            return
+        recording = {
+            "url": url,
+            "params": {k: v for k, v in (params or {}).items() if v is not None},
+            "status_code": response.status_code,
+            "headers": {k: response.headers[k] for k in RECORDED_HEADERS if k in response.headers},
+        }
+        try:
+            recording["body"] = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            recording["body_base64"] = base64.b64encode(response.content).decode("ascii")
+
+        # Written to a temporary file first, so concurrent readers never see half a recording
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(recording, f)
+        os.replace(temp_path, path)
+        self.recorded += 1
@@ -0,0 +1,87 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API, DEFAULT_HEADERS  # noqa: E402
+from hcraontario.transport import RequestsTransport  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockServer(MockConfig(records=2)) as server:
+        yield server
+
+
+@pytest.fixture
+def api(server):
+    with API(base_url=server.base_url, max_workers=8) as api:
+        yield api
+
+
+def test_fetch_many_yields_every_id(api):
+    ids = builder_ids(20)
+    results = dict(api.fetch_many(ids, sections=["summary", "PDOs"]))
+    assert sorted(results) == sorted(ids)
+    assert all(set(data) == {"summary", "PDOs"} for data in results.values())
+
+
+def test_fetch_many_without_sections(api):
+    assert list(api.fetch_many(["B10001", "B10002"], sections=[])) == [("B10001", {}), ("B10002", {})]
+    assert api.get_builder_detail("B10001", sections=[]) == {}
+
+
+def test_session_forwards_to_the_transport(api):
+    api.session.headers["X-Test"] = "1"
+    assert api.transport.session.headers["X-Test"] == "1"
+
+
+def test_session_headers_override_the_defaults(api, server):
+    api.get_builder_detail("B10001", sections=["summary"])
+    assert server.stats.last_headers["user-agent"] == DEFAULT_HEADERS["user-agent"]
+
+    api.session.headers["user-agent"] = "my-bot/1.0"
+    api.session.headers["referer"] = "https://example.org"
+    api.get_builder_detail("B10002", sections=["summary"])
+    assert server.stats.last_headers["user-agent"] == "my-bot/1.0"
+    assert server.stats.last_headers["referer"] == "https://example.org"
+
+
+def test_transport_headers_take_precedence(server):
+    transport = RequestsTransport(headers={"User-Agent": "custom/2.0"})
+    with API(base_url=server.base_url, transport=transport) as api:
+        api.get_builder_detail("B10001", sections=["summary"])
+    assert server.stats.last_headers["user-agent"] == "custom/2.0"
+    assert server.stats.last_headers["referer"] == DEFAULT_HEADERS["referer"]
+
+
+def test_builder_record_fetches_sections_on_first_access(api, server):
+    record = api.builder("B10001")
+    assert record.loaded == [] and server.stats.snapshot() == {}
+
+    assert record.convictions == api.get_builder_detail("B10001", sections=["convictions"])["convictions"]
+    assert record.loaded == ["convictions"]
+    record.convictions
+    # One request for the record, one for the comparison above
+    assert server.stats.snapshot().get("path:builderConvictions") == 2
+    assert "path:buildersummary" not in server.stats.snapshot()
+
+    with pytest.raises(AttributeError):
+        record.not_a_section
+
+
+def test_builder_record_prefetch_loads_only_missing_sections(api, server):
+    record = api.builder("B10001", prefetch=["summary", "PDOs"])
+    assert sorted(record.loaded) == ["PDOs", "summary"]
+    data = record.to_dict()
+    assert set(data) == {"summary", "PDOs", "convictions", "conditions", "members", "properties", "enrolments", "condoProjects"}
+    stats = server.stats.snapshot()
+    assert stats.get("200") == 8 and stats.get("path:buildersummary") == 1
+
+    umbrella = api.umbrella("12000001", prefetch=["members"])
+    assert umbrella.loaded == ["members"] and len(umbrella.members) == 3
@@ -0,0 +1,157 @@
+import asyncio
+import csv
+import os
+import sys
+import threading
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import BUILDER_ENDPOINTS, AsyncAPI  # noqa: E402
+from hcraontario.cache import ResponseCache  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids, detail  # noqa: E402
+
+pytest.importorskip("aiohttp")
+
+
+@pytest.fixture
+def server():
+    with MockServer(MockConfig(records=3)) as server:
+        yield server
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_builder_detail(server):
+    async def main():
+        async with AsyncAPI(base_url=server.base_url) as api:
+            return await api.get_builder_detail("B10001")
+
+    data = run(main())
+    assert set(data) == set(BUILDER_ENDPOINTS)
+    assert data["summary"] == detail(server.config, BUILDER_ENDPOINTS["summary"], "B10001")
+
+
+def test_fetch_many_yields_every_id(server):
+    ids = builder_ids(25)
+
+    async def main():
+        async with AsyncAPI(base_url=server.base_url, max_concurrency=8) as api:
+            return [item async for item in api.fetch_many(ids, sections=["summary", "PDOs"])]
+
+    results = run(main())
+    assert sorted(ID for ID, _ in results) == sorted(ids)
+    assert all(set(data) == {"summary", "PDOs"} for _, data in results)
+
+
+def test_save_multiple_to_master_csv(server, tmp_path):
+    ids = builder_ids(10)
+
+    async def main():
+        async with AsyncAPI(base_url=server.base_url) as api:
+            await api.save_multiple_to_master_csv(ids, directory=str(tmp_path))
+
+    run(main())
+    with open(tmp_path / "builder_PDOs_master.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 10 * server.config.records
+    assert {row["source_id"] for row in rows} == set(ids)
+
+
+def test_cancelled_export_is_reported_as_cancelled(server, tmp_path, capsys):
+    server.config.latency = 0.05
+
+    async def main():
+        async with AsyncAPI(base_url=server.base_url, max_concurrency=4) as api:
+            task = asyncio.ensure_future(api.save_multiple_to_master_csv(builder_ids(200), directory=str(tmp_path)))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return task
+
+    task = run(main())
+    assert task.cancelled()
+    assert "Completed processing" not in capsys.readouterr().out
+    # The writer still closed its files with what was fetched
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_fetch_error_reaches_the_caller(server, tmp_path):
+    class Failing(AsyncAPI):
+        async def fetch_many(self, ids, **kwargs):
+            yield ids[0], {"summary": {"ID": ids[0]}}
+            raise OSError("connection pool exploded")
+
+    async def main():
+        async with Failing(base_url=server.base_url) as api:
+            await api.save_multiple_to_master_csv(builder_ids(5), directory=str(tmp_path))
+
+    with pytest.raises(OSError, match="exploded"):
+        run(main())
+
+
+def test_fetch_many_without_sections(server):
+    async def main():
+        async with AsyncAPI(base_url=server.base_url) as api:
+            return [item async for item in api.fetch_many(["B10001", "B10002"], sections=[])]
+
+    assert run(main()) == [("B10001", {}), ("B10002", {})]
+
+
+def test_cache_runs_off_the_event_loop(server, tmp_path):
+    class RecordingCache(ResponseCache):
+        threads = set()
+
+        def lookup(self, endpoint, params):
+            self.threads.add(threading.current_thread())
+            return super().lookup(endpoint, params)
+
+        def store(self, *args, **kwargs):
+            self.threads.add(threading.current_thread())
+            return super().store(*args, **kwargs)
+
+    cache = RecordingCache(str(tmp_path / "cache.db"))
+
+    async def main():
+        async with AsyncAPI(base_url=server.base_url, cache=cache) as api:
+            first = await api.get_builder_detail("B10001")
+            second = await api.get_builder_detail("B10001")
+            return first, second, threading.current_thread()
+
+    first, second, loop_thread = run(main())
+    assert first == second
+    assert RecordingCache.threads and loop_thread not in RecordingCache.threads
+    assert server.stats.snapshot().get("200") == len(BUILDER_ENDPOINTS)
+
+
+def test_resumable_master_sql(server, tmp_path):
+    ids = builder_ids(6)
+
+    async def main():
+        async with AsyncAPI(base_url=server.base_url) as api:
+            await api.save_multiple_to_master_sql(ids, directory=str(tmp_path), resume=True)
+            before = server.stats.snapshot().get("200")
+            await api.save_multiple_to_master_sql(ids, directory=str(tmp_path), resume=True)
+            return before, server.stats.snapshot().get("200")
+
+    before, after = run(main())
+    # Every ID was processed by the first run, so the second fetches nothing
+    assert before == after == len(ids) * len(BUILDER_ENDPOINTS)
+
+
+def test_export_stops_fetching_when_the_writer_fails(server, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "openpyxl", None)
+
+    async def main():
+        async with AsyncAPI(base_url=server.base_url, max_concurrency=4) as api:
+            await api.save_multiple_to_master_xlsx(builder_ids(200), directory=str(tmp_path))
+
+    with pytest.raises(ImportError):
+        run(main())
+    assert server.stats.snapshot().get("200", 0) < 200 * len(BUILDER_ENDPOINTS)
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.cache import ResponseCache  # noqa: E402
+from mock_server import MockServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockServer() as server:
+        yield server
+
+
+def fetch_summary(api, ID="B10001"):
+    return api.get_builder_detail(ID, sections=["summary"])
+
+
+def test_fresh_entries_are_served_without_a_request(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    with API(base_url=server.base_url, cache=cache) as api:
+        first = fetch_summary(api)
+        second = fetch_summary(api)
+    assert first == second
+    assert server.stats.snapshot().get("200") == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_entries_are_revalidated_with_304(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttls={"buildersummary": 0.2})
+    with API(base_url=server.base_url, cache=cache) as api:
+        first = fetch_summary(api)
+        time.sleep(0.3)
+        second = fetch_summary(api)
+        # The 304 made the entry fresh again for another TTL
+        third = fetch_summary(api)
+    assert first == second == third
+    assert server.stats.snapshot().get("200") == 1
+    assert server.stats.snapshot().get("304") == 1
+    assert server.stats.last_headers.get("if-none-match")
+    stats = cache.stats()
+    assert stats["revalidated"] == 1 and stats["hits"] == 1
+
+
+def test_entries_survive_in_the_sqlite_file(server, tmp_path):
+    path = str(tmp_path / "cache.db")
+    with API(base_url=server.base_url, cache=ResponseCache(path)) as api:
+        fetch_summary(api)
+    # A new cache on the same file starts with an empty memory LRU
+    with API(base_url=server.base_url, cache=ResponseCache(path)) as api:
+        fetch_summary(api)
+    assert server.stats.snapshot().get("200") == 1
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.crawler import Frontier, RegistryCrawler, discover_ids  # noqa: E402
+from hcraontario.sinks import SQLiteSink  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids, umbrella_ids  # noqa: E402
+
+
+def reopen(path, **kwargs):
+    sink = SQLiteSink(str(path))
+    return sink, Frontier(sink, **kwargs)
+
+
+def pending(frontier):
+    return {type_label: list(queue) for type_label, queue in frontier.pending.items()}
+
+
+def test_discover_ids_ignores_bare_id_fields():
+    records = [{"id": "17", "ACCOUNTNUMBER": "B1"}, {"UMBRELLA_ID": "12000001", "ID": 3}]
+    assert discover_ids(records) == [("builder", "B1"), ("umbrella", "12000001")]
+
+
+def test_frontier_resumes_after_a_restart(tmp_path):
+    sink, frontier = reopen(tmp_path / "crawl.db")
+    for ID in ("B1", "B2", "B3"):
+        frontier.add("builder", ID)
+    frontier.add("umbrella", "12000001")
+    claimed = frontier.claim("builder")
+    frontier.done("builder", next(claimed))
+    frontier.failed("builder", next(claimed), "HTTP 500")
+    sink.close()
+
+    sink, frontier = reopen(tmp_path / "crawl.db")
+    # Queued and in-flight IDs are pending again, failed ones are retried, done ones skipped
+    assert pending(frontier) == {"builder": ["B2", "B3"], "umbrella": ["12000001"]}
+    assert not frontier.add("builder", "B1")
+    assert frontier.counts()["builder"] == {"done": 1, "failed": 1, "pending": 1}
+    sink.close()
+
+
+def test_frontier_gives_up_after_max_attempts(tmp_path):
+    sink, frontier = reopen(tmp_path / "crawl.db", max_attempts=2)
+    frontier.add("builder", "B1")
+    for _ in range(2):
+        frontier.failed("builder", "B1", "HTTP 500")
+    sink.close()
+
+    sink, frontier = reopen(tmp_path / "crawl.db", max_attempts=2)
+    assert pending(frontier) == {"builder": [], "umbrella": []}
+    sink.close()
+
+
+@pytest.mark.parametrize("stale_after, requeued", [(None, False), (0, True)])
+def test_stale_done_ids_and_seeds_are_requeued(tmp_path, stale_after, requeued):
+    sink, frontier = reopen(tmp_path / "crawl.db")
+    frontier.add("builder", "B1")
+    frontier.done("builder", "B1")
+    frontier.complete_seed("{}")
+    sink.close()
+
+    sink, frontier = reopen(tmp_path / "crawl.db", stale_after=stale_after)
+    assert pending(frontier)["builder"] == (["B1"] if requeued else [])
+    assert frontier.seed_completed("{}") is not requeued
+    sink.close()
+
+
+def test_interrupted_crawl_resumes_without_refetching(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    with MockServer(MockConfig(builders=25, page_size=10)) as server, API(base_url=server.base_url) as api:
+        first = []
+        for type_label, ID, data in RegistryCrawler(api, db_path=path, follow_members=False, checkpoint_every=2).crawl():
+            first.append(ID)
+            if len(first) == 5:
+                break
+        searches = server.stats.snapshot().get("path:builders")
+
+        second = [ID for _, ID, _ in RegistryCrawler(api, db_path=path, follow_members=False).crawl()]
+        # The completed search is not enumerated again, and IDs marked done are not refetched
+        assert server.stats.snapshot().get("path:builders") == searches
+        # An ID is done once the next one is asked for, so only the fifth is fetched again
+        assert not set(first[:4]) & set(second) and first[4] in second
+        # Search results name 25 builders and their 25 umbrella companies
+        assert sorted(set(first) | set(second)) == sorted(builder_ids(25) + umbrella_ids(25))
+
+        assert list(RegistryCrawler(api, db_path=path, follow_members=False).crawl()) == []
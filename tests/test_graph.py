@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.graph import RelationshipGraph  # noqa: E402
+from mock_server import MockServer, umbrella_ids  # noqa: E402
+
+
+@pytest.fixture
+def graph(tmp_path):
+    graph = RelationshipGraph(str(tmp_path / "graph.db"))
+    yield graph
+    graph.close()
+
+
+def ids(rows, column="id"):
+    return [row[column] for row in rows]
+
+
+def test_queries_follow_both_edge_directions(graph):
+    graph.add("umbrella", "100", {"summary": {"NAME": "Acme Group"}, "members": [{"ACCOUNTNUMBER": "B1"}, {"ACCOUNTNUMBER": "B2"}]})
+    graph.add("umbrella", "200", {"summary": {"NAME": "Zenith"}, "members": [{"ACCOUNTNUMBER": "B3"}]})
+    # B3 lists an umbrella that does not list it back
+    graph.add("builder", "B3", {"summary": {"NAME": "Three"}, "members": [{"UMBRELLA_ID": "100"}], "convictions": [{}, {}]})
+    graph.add("builder", "B1", {"summary": {"NAME": "One", "LICENSESTATUS": "Licensed"}, "convictions": [], "conditions": [{}]})
+
+    assert ids(graph.builders_of("100")) == ["B1", "B2", "B3"]
+    assert ids(graph.umbrellas_of("B3")) == ["100", "200"]
+    assert ids(graph.related_builders("B1")) == ["B2", "B3"]
+    assert graph.node("builder", "B1")["licence_status"] == "Licensed"
+    # B2 was only discovered: no details, so no counts either
+    assert graph.node("builder", "B2")["fetched_at"] is None
+    assert graph.node("builder", "B2")["convictions"] is None
+
+    risky = graph.builders_under_umbrellas_with_convictions()
+    assert [(row["umbrella_id"], row["builder_id"], row["umbrella_convictions"]) for row in risky] == [
+        ("100", "B1", 2), ("100", "B2", 2), ("100", "B3", 2), ("200", "B3", 2),
+    ]
+    assert graph.builders_under_umbrellas_with_convictions(min_convictions=3) == []
+    assert graph.counts() == {"umbrella": {"fetched": 2, "unfetched": 0}, "builder": {"fetched": 2, "unfetched": 1}, "edges": 4}
+
+
+def test_expand_walks_members_breadth_first_and_resumes(tmp_path):
+    start = umbrella_ids(1)
+    with MockServer() as server, API(base_url=server.base_url) as api:
+        graph = RelationshipGraph(str(tmp_path / "graph.db"), api=api)
+        stats = graph.expand(umbrella_ids=start, max_depth=0)
+        assert (stats["umbrellas"], stats["builders"], stats["depth"]) == (1, 0, 0)
+        members = ids(graph.builders_of(start[0]))
+        assert len(members) == 3
+
+        stats = graph.expand(umbrella_ids=start, max_depth=1)
+        # The start umbrella comes from the graph; only its builders are fetched
+        assert (stats["reused"], stats["umbrellas"], stats["builders"]) == (1, 0, 3)
+        assert server.stats.snapshot().get("path:umbrellaSummary") == 1
+        # Builders were fetched with the builder sections only
+        assert server.stats.snapshot().get("path:builderConvictions") == 3
+        assert "path:builderPDOs" not in server.stats.snapshot()
+        assert all(graph.node("builder", ID)["convictions"] == 10 for ID in members)
+
+        requests = server.stats.snapshot().get("200")
+        stats = graph.expand(umbrella_ids=start, max_depth=1)
+        assert stats["reused"] == 4 and server.stats.snapshot().get("200") == requests
+
+        stats = graph.expand(umbrella_ids=start, max_depth=1, max_age=0)
+        assert (stats["umbrellas"], stats["builders"]) == (1, 3)
+        graph.close()
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockServer(MockConfig(records=3)) as server:
+        yield server
+
+
+def row_counts(directory):
+    conn = sqlite3.connect(os.path.join(directory, "master_database.db"))
+    try:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'builder_%'")]
+        return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+    finally:
+        conn.close()
+
+
+def detail_requests(server):
+    return server.stats.snapshot().get("path:buildersummary", 0)
+
+
+def test_resume_skips_processed_ids(server, tmp_path):
+    directory = str(tmp_path)
+    with API(base_url=server.base_url) as api:
+        # An interrupted run that only got through the first three IDs
+        api.save_multiple_to_master_sql(builder_ids(3), directory=directory, resume=True)
+        assert detail_requests(server) == 3
+
+        api.save_multiple_to_master_sql(builder_ids(5), directory=directory, resume=True)
+        assert detail_requests(server) == 5
+        api.save_multiple_to_master_sql(builder_ids(5), directory=directory, resume=True)
+        assert detail_requests(server) == 5
+
+    assert row_counts(directory)["builder_summary"] == 5
+    assert row_counts(directory)["builder_PDOs"] == 5 * 3
+
+
+def test_rerun_leaves_no_duplicate_rows(server, tmp_path):
+    directory = str(tmp_path)
+    with API(base_url=server.base_url) as api:
+        api.save_multiple_to_master_sql(builder_ids(4), directory=directory, resume=True)
+        first = row_counts(directory)
+        # stale_after=0 fetches every ID again; unchanged sections are not rewritten
+        api.save_multiple_to_master_sql(builder_ids(4), directory=directory, resume=True, stale_after=0)
+        assert detail_requests(server) == 8
+        assert row_counts(directory) == first
+
+        # Changed sections replace their old rows
+        server.config.records = 4
+        api.save_multiple_to_master_sql(builder_ids(4), directory=directory, resume=True, stale_after=0)
+    counts = row_counts(directory)
+    assert counts["builder_summary"] == 4
+    assert counts["builder_PDOs"] == 4 * 4
+    assert counts["builder_properties"] == 4 * 4 * 5
+
+
+def test_without_resume_every_run_appends(server, tmp_path):
+    directory = str(tmp_path)
+    with API(base_url=server.base_url) as api:
+        for _ in range(2):
+            api.save_multiple_to_master_sql(builder_ids(2), directory=directory)
+    assert row_counts(directory)["builder_summary"] == 4
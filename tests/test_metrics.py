@@ -0,0 +1,38 @@
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.metrics import Metrics  # noqa: E402
+from mock_server import MockServer  # noqa: E402
+
+
+def test_a_failing_hook_does_not_fail_the_request(capsys):
+    metrics = Metrics()
+    events = []
+
+    def broken(event, labels, value):
+        raise RuntimeError("collector down")
+
+    metrics.add_hook(broken)
+    metrics.add_hook(lambda event, labels, value: events.append(event))
+    with MockServer() as server, API(base_url=server.base_url, metrics=metrics) as api:
+        data = api.get_builder_detail("B10001", sections=["summary"])
+    assert data["summary"]
+    # Later hooks still see every event
+    assert "request" in events
+    assert "collector down" in capsys.readouterr().out
+    assert metrics.snapshot()["endpoints"]["buildersummary"]["statuses"] == {"200": 1}
+
+
+def test_requests_without_a_response_are_labelled_error():
+    metrics = Metrics()
+    metrics.request_finished("buildersummary", 0.2, status=None)
+    metrics.request_finished("buildersummary", 0.1, size=10, status=200)
+    assert metrics.snapshot()["endpoints"]["buildersummary"]["statuses"] == {"error": 1, "200": 1}
+    exposition = metrics.to_prometheus()
+    assert 'hcra_requests_total{endpoint="buildersummary",status="error"} 1' in exposition
+    assert 'status="None"' not in exposition
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.records import RecordBatch  # noqa: E402
+from hcraontario.sinks import ParquetSink  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids  # noqa: E402
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.mark.parametrize("partition_by", [None, "source_id", "snapshot_date"])
+def test_dataset_reads_back(tmp_path, partition_by):
+    sink = ParquetSink(str(tmp_path), partition_by=partition_by, row_group_size=4)
+    for i in range(5):
+        # The first ID has no value at all in column B
+        records = [{"A": n, "B": None if i == 0 else f"x{n}"} for n in range(3)]
+        sink.write("PDOs", RecordBatch.from_records(records, constants={"source_id": f"B{i}"}))
+    written = sink.close()
+
+    table = pq.read_table(written["PDOs"][0])
+    assert table.num_rows == 15
+    assert sorted(set(table.column("source_id").to_pylist())) == [f"B{i}" for i in range(5)]
+    assert sorted(value for value in table.column("B").to_pylist() if value) == sorted([f"x{n}" for n in range(3)] * 4)
+
+
+def test_partitioned_files_hold_no_partition_column(tmp_path):
+    sink = ParquetSink(str(tmp_path), partition_by="source_id")
+    sink.write("PDOs", [{"A": 1, "source_id": "B1"}, {"A": 2, "source_id": "B2"}])
+    sink.close()
+    for ID in ("B1", "B2"):
+        directory = tmp_path / "PDOs" / f"source_id={ID}"
+        for name in os.listdir(directory):
+            assert pq.read_schema(str(directory / name)).names == ["A"]
+
+
+def test_master_parquet_reads_back_with_pandas(tmp_path):
+    pd = pytest.importorskip("pandas")
+    ids = builder_ids(6)
+    with MockServer(MockConfig(records=2)) as server, API(base_url=server.base_url) as api:
+        api.save_multiple_to_master_parquet(ids, directory=str(tmp_path), partition_by="source_id")
+
+    frame = pd.read_parquet(tmp_path / "builder_master_parquet" / "PDOs")
+    assert len(frame) == 12
+    assert sorted(frame["source_id"].astype(str).unique()) == sorted(ids)
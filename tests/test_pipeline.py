@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario import pipeline  # noqa: E402
+from hcraontario.pipeline import ExportPipeline  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids, umbrella_ids  # noqa: E402
+
+
+@pytest.fixture
+def api():
+    with MockServer(MockConfig(records=3, jitter=0.01)) as server, API(base_url=server.base_url, max_workers=8) as api:
+        yield api
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_run_yields_in_input_order(api, processes):
+    ids = builder_ids(30)
+    results = list(ExportPipeline(api, processes=processes).run(ids))
+    assert [ID for ID, _ in results] == ids
+    assert all(data["PDOs"].columns["source_id"] == [ID] * 3 for ID, data in results)
+
+
+@pytest.mark.parametrize("is_umbrella, sections", [(False, 8), (True, 5)])
+def test_default_fetch_window_follows_the_section_count(api, monkeypatch, is_umbrella, sections):
+    sizes = []
+
+    class RecordingPool(pipeline.ThreadPoolExecutor):
+        def __init__(self, max_workers=None, **kwargs):
+            sizes.append(max_workers)
+            super().__init__(max_workers=max_workers, **kwargs)
+
+    monkeypatch.setattr(pipeline, "ThreadPoolExecutor", RecordingPool)
+    # 40 workers: 11 builders (8 sections each) or 17 umbrellas (5 sections each) in flight
+    api.max_workers = 40
+    ids = umbrella_ids(3) if is_umbrella else builder_ids(3)
+    assert [ID for ID, _ in ExportPipeline(api, processes=0).run(ids, is_umbrella)] == ids
+    assert sizes == [2 * max(1, api.max_workers // sections) + 1]
+
+
+def test_explicit_processes_are_kept(api):
+    assert ExportPipeline(api, processes=3).processes == 3
+
+
+def test_master_csv_is_deterministic(api, tmp_path):
+    ids = builder_ids(20)
+    for run in ("a", "b"):
+        os.makedirs(tmp_path / run)
+        api.save_multiple_to_master_csv(ids, directory=str(tmp_path / run), processes=2)
+    for name in os.listdir(tmp_path / "a"):
+        assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+
+
+def test_import_does_not_load_multiprocessing():
+    probe = "import sys, hcraontario.Hcraontario; print('multiprocessing' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=SRC)
+    assert subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True).stdout.strip() == "False"
@@ -0,0 +1,56 @@
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from hcraontario.records import RecordBatch, tag_records  # noqa: E402
+
+
+def test_from_records_pads_ragged_records():
+    records = [{"A": 1, "B": 2}, {"A": 3}, {"C": 4, "A": 5}, {"B": 6, "C": 7}, "loose"]
+    batch = RecordBatch.from_records(records, constants={"source_id": "B1"})
+    assert len(batch) == 5
+    assert batch.columns == {
+        "A": [1, 3, 5, None, None],
+        "B": [2, None, None, 6, None],
+        "C": [None, None, 4, 7, None],
+        "value": [None, None, None, None, "loose"],
+        "source_id": ["B1"] * 5,
+    }
+    assert all(len(values) == len(batch) for values in batch.columns.values())
+    assert batch.to_records()[1] == {"A": 3, "B": None, "C": None, "value": None, "source_id": "B1"}
+
+
+def test_concat_unifies_columns_by_name():
+    batches = [
+        RecordBatch.from_records([{"A": 1}, {"A": 2}]),
+        RecordBatch.from_records([]),
+        RecordBatch.from_records([{"B": "x"}]),
+        RecordBatch.from_records([{"B": "y", "A": 3}]),
+    ]
+    batch = RecordBatch.concat(batches)
+    assert batch.num_rows == 4
+    assert batch.columns == {"A": [1, 2, None, 3], "B": [None, None, "x", "y"]}
+    assert list(batch.rows()) == [(1, None), (2, None), (None, "x"), (3, "y")]
+    assert RecordBatch.concat([]).num_rows == 0
+
+
+def test_split_groups_records_by_column_value():
+    batch = RecordBatch.concat([
+        tag_records("B1", {"PDOs": [{"NAME": "a"}, {"NAME": "b"}]})["PDOs"],
+        tag_records("B2", {"PDOs": {"NAME": "c", "ROLE": "Director"}})["PDOs"],
+    ])
+    parts = batch.split("source_id")
+    assert list(parts) == ["B1", "B2"]
+    assert parts["B1"].to_records() == [
+        {"NAME": "a", "source_id": "B1", "ROLE": None}, {"NAME": "b", "source_id": "B1", "ROLE": None},
+    ]
+    assert parts["B2"].columns["ROLE"] == ["Director"]
+    assert batch.split("missing") == {None: batch}
+
+
+def test_tag_records_skips_empty_sections():
+    tagged = tag_records("B1", {"summary": {"NAME": "Acme"}, "PDOs": [], "convictions": None})
+    assert list(tagged) == ["summary"]
+    assert tagged["summary"].to_records() == [{"NAME": "Acme", "source_id": "B1"}]
@@ -0,0 +1,118 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from hcraontario.scheduler import RequestFailedError, RequestScheduler  # noqa: E402
+from hcraontario.transport import Response  # noqa: E402
+
+
+def throttled(retry_after: str) -> Response:
+    return Response(429, {"Retry-After": retry_after}, b"")
+
+
+def test_retry_after_is_capped_at_backoff_max():
+    scheduler = RequestScheduler(max_retries=1, backoff_max=0.2)
+    start = time.monotonic()
+    with pytest.raises(RequestFailedError) as error:
+        scheduler.request(lambda: throttled("86400"))
+    assert error.value.status_code == 429
+    assert time.monotonic() - start < 1.0
+
+
+def test_retry_after_pauses_every_worker_without_a_rate_limit():
+    scheduler = RequestScheduler(max_retries=1, backoff_max=5)
+    responses = iter([throttled("0.5"), Response(200, {}, b"[]")])
+    first = threading.Thread(target=scheduler.request, args=(lambda: next(responses),))
+    first.start()
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    scheduler.request(lambda: Response(200, {}, b"[]"))
+    waited = time.monotonic() - start
+    first.join()
+    assert 0.25 < waited < 1.0
+
+
+def test_single_flight_follower_survives_leader_cancellation():
+    import asyncio
+
+    from hcraontario.scheduler import SingleFlight
+
+    flights = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.1)
+        return {"calls": len(calls)}
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do_async("key", call))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flights.do_async("key", call)) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        return leader, results
+
+    leader, results = asyncio.run(main())
+    assert leader.cancelled()
+    # One follower took over as leader; the others shared its result
+    assert results == [{"calls": 2}] * 3
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("body", [b"<html>Not Found</html>", b'{"error": "not found"}'])
+def test_client_errors_fail_on_the_first_attempt(body):
+    scheduler = RequestScheduler(max_retries=4, backoff_base=1.0)
+    attempts = []
+
+    def send():
+        attempts.append(None)
+        return Response(404, {"Content-Type": "text/html"}, body)
+
+    limit = scheduler.limiter.limit
+    with pytest.raises(RequestFailedError) as error:
+        scheduler.request(send, lambda response: __import__("json").loads(response.content))
+    assert error.value.status_code == 404
+    assert len(attempts) == 1
+    assert scheduler.limiter.limit == limit
+
+
+def test_html_server_errors_are_retried():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0.01)
+    responses = iter([Response(502, {}, b"<html>Bad Gateway</html>"), Response(200, {}, b"[1]")])
+    response, data = scheduler.request(lambda: next(responses), lambda response: __import__("json").loads(response.content))
+    assert data == [1]
+
+
+def test_async_limiter_waits_without_polling():
+    import asyncio
+
+    from hcraontario.scheduler import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(max_limit=1)
+    order = []
+
+    async def worker(n):
+        await limiter.acquire_async()
+        order.append(n)
+        await asyncio.sleep(0.01)
+        limiter.release()
+
+    async def main():
+        tasks = [asyncio.ensure_future(worker(n)) for n in range(4)]
+        await asyncio.sleep(0.005)
+        # One worker holds the slot; the others sleep on futures until it is released
+        assert limiter.in_flight == 1 and len(limiter._async_waiters) == 3
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert sorted(order) == [0, 1, 2, 3]
+    assert limiter.in_flight == 0
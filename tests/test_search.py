@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids  # noqa: E402
+
+
+def search(config: MockConfig, **kwargs):
+    with MockServer(config) as server, API(base_url=server.base_url, max_workers=4) as api:
+        records = list(api.iter_search_builder(**kwargs))
+        time.sleep(0.05)
+        return records, server.stats.snapshot()
+
+
+def test_walks_every_page_until_a_short_page():
+    records, stats = search(MockConfig(builders=45, page_size=10))
+    assert [record["ACCOUNTNUMBER"] for record in records] == builder_ids(45)
+
+
+def test_stops_on_an_empty_page_after_full_pages():
+    records, _ = search(MockConfig(builders=40, page_size=10))
+    assert len(records) == 40
+
+
+def test_stops_on_the_reported_page_count():
+    # With the page count known, nothing past the last page is requested
+    records, stats = search(MockConfig(builders=40, page_size=10, envelope=True), prefetch=8)
+    assert len(records) == 40
+    assert stats.get("200") == 4
+
+
+def test_max_pages():
+    records, stats = search(MockConfig(builders=100, page_size=10), max_pages=2)
+    assert [record["ACCOUNTNUMBER"] for record in records] == builder_ids(20)
+
+    records, stats = search(MockConfig(builders=100, page_size=10), max_pages=0)
+    assert records == [] and stats == {}
+
+
+def test_early_stop_cancels_prefetched_pages():
+    config = MockConfig(builders=1000, page_size=10, latency=0.05)
+    with MockServer(config) as server, API(base_url=server.base_url, max_workers=2) as api:
+        pages = api.iter_search_builder(prefetch=3)
+        next(pages)
+        pages.close()
+        time.sleep(0.3)
+        served = server.stats.snapshot().get("200")
+    # The first page plus, at most, the prefetched pages already running
+    assert served <= 1 + 3
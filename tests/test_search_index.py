@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.search_index import SearchIndex  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockServer(MockConfig(builders=30, page_size=10)) as server:
+        yield server
+
+
+@pytest.fixture
+def index(server, tmp_path):
+    with API(base_url=server.base_url) as api:
+        index = SearchIndex(str(tmp_path / "index.db"), api=api)
+        index.refresh()
+        yield index
+        index.close()
+
+
+def ids(results):
+    return sorted(record.get("ACCOUNTNUMBER", record.get("id")) for record in results)
+
+
+def test_refresh_is_incremental(index):
+    assert index.refresh()["builders_updated"] == 0
+
+
+def test_words_match_as_prefixes(index):
+    assert ids(index.search(builderName="builder 1", limit=100))[:2] == ["B10001", "B10010"]
+    assert ids(index.search(builderLocation="toron", limit=100)) == ["B10000", "B10008", "B10016", "B10024"]
+    assert ids(index.search(builderName="build", builderLocation="ottawa", licenceStatus="licensed", limit=100)) == [
+        "B10001", "B10025",
+    ]
+
+
+def test_fuzzy_matching_widens_words_without_a_match(index):
+    assert index.search(builderLocation="otawa", fuzzy=False) == []
+    assert len(index.search(builderLocation="otawa")) == 4
+
+
+def test_a_stale_index_falls_back_to_the_live_api(server, index):
+    index.max_age = -1
+    before = server.stats.snapshot().get("path:builders")
+    assert len(index.search(builderName="builder", limit=5)) == 5
+    assert server.stats.snapshot().get("path:builders") > before
+    # The live results are indexed, but do not make the index current
+    assert index.is_stale()
+
+
+def test_added_data_marks_the_index_as_refreshed(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    assert index.is_stale()
+    index.add_search_results([{"ACCOUNTNUMBER": "B1", "NAME": "Acme Homes"}], refreshed=False)
+    assert index.is_stale()
+    index.add_search_results([{"ACCOUNTNUMBER": "B2", "NAME": "Zenith Homes"}])
+    assert not index.is_stale()
+    index.close()
+
+
+def test_umbrella_members_are_searchable_by_the_umbrella_name(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.add_members("umbrella", "12000001", [{"ACCOUNTNUMBER": "B7"}, {"ACCOUNTNUMBER": "B8"}], name="Acme Group")
+    results = index.search(umbrellaCo="acme")
+    assert [(record["id"], record["umbrella_co"]) for record in sorted(results, key=lambda r: r["id"])] == [
+        ("B7", "Acme Group"), ("B8", "Acme Group"),
+    ]
+    index.close()
@@ -0,0 +1,64 @@
+import csv
+import os
+import sqlite3
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.sinks import CSVSink, SQLiteSink, XLSXSink  # noqa: E402
+from mock_server import MockServer, builder_ids  # noqa: E402
+
+
+def test_csv_header_covers_columns_seen_late(tmp_path):
+    sink = CSVSink(str(tmp_path / "{section}.csv"))
+    sink.write("PDOs", [{"A": 1, "B": 2}])
+    sink.write("PDOs", [{"A": 3, "C": 4}, {"B": 5, "D": 6}])
+    written = sink.close()
+
+    assert written == {"PDOs": (str(tmp_path / "PDOs.csv"), 3)}
+    with open(tmp_path / "PDOs.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["A", "B", "C", "D"], ["1", "2", "", ""], ["3", "", "4", ""], ["", "5", "", "6"]]
+    # The spool and its column sidecar are removed
+    assert sorted(os.listdir(tmp_path)) == ["PDOs.csv"]
+
+
+def test_sqlite_sink_adds_late_columns(tmp_path):
+    path = str(tmp_path / "out.db")
+    sink = SQLiteSink(path)
+    sink.write("PDOs", [{"source_id": "B1", "A": 1}])
+    sink.flush()
+    sink.write("PDOs", [{"source_id": "B2", "B": "x"}, {"source_id": "B3", "A": 2, "C": 1.5}])
+    assert sink.close() == {"PDOs": 3}
+
+    # A new sink reads the existing columns from the database before altering the table
+    sink = SQLiteSink(path)
+    sink.write("PDOs", [{"source_id": "B4", "D": True}])
+    sink.close()
+
+    conn = sqlite3.connect(path)
+    columns = [(row[1], row[2]) for row in conn.execute("PRAGMA table_info(PDOs)")]
+    rows = conn.execute("SELECT source_id, A, B, C, D FROM PDOs ORDER BY source_id").fetchall()
+    indexes = [row[1] for row in conn.execute("PRAGMA index_list(PDOs)")]
+    conn.close()
+    assert columns == [("source_id", "TEXT"), ("A", "INTEGER"), ("B", "TEXT"), ("C", "REAL"), ("D", "INTEGER")]
+    assert rows == [("B1", 1, None, None, None), ("B2", None, "x", None, None), ("B3", 2, None, 1.5, None), ("B4", None, None, None, 1)]
+    assert indexes == ["idx_PDOs_source_id"]
+
+
+def test_xlsx_sink_needs_openpyxl_up_front(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "openpyxl", None)
+    with pytest.raises(ImportError):
+        XLSXSink(str(tmp_path / "out.xlsx"))
+
+    with MockServer() as server, API(base_url=server.base_url) as api:
+        with pytest.raises(ImportError):
+            api.save_multiple_to_master_xlsx(builder_ids(20), directory=str(tmp_path))
+        # Nothing was fetched or spooled
+        assert server.stats.snapshot() == {}
+    assert os.listdir(tmp_path) == []
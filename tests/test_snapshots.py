@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from hcraontario.Hcraontario import API  # noqa: E402
+from hcraontario.snapshots import SnapshotStore  # noqa: E402
+from mock_server import MockConfig, MockServer, builder_ids  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"), record_keys={"convictions": ("CONVICTIONID",)})
+    yield store
+    store.close()
+
+
+def summarize(changes):
+    return sorted((c["section"], c["record_key"], c["change"], tuple(c["changed_fields"])) for c in changes)
+
+
+def test_diff_reports_added_modified_and_removed_records(store):
+    first = {
+        "summary": {"NAME": "Acme", "LICENSESTATUS": "Licensed"},
+        "convictions": [{"CONVICTIONID": 1, "FINE": 100}, {"CONVICTIONID": 2, "FINE": 200}],
+    }
+    assert summarize(store.diff("builder", "B1", first)) == [
+        ("convictions", "[1]", "added", ()),
+        ("convictions", "[2]", "added", ()),
+        ("summary", "0", "added", ()),
+    ]
+    assert store.diff("builder", "B1", first) == []
+
+    second = {
+        "summary": {"NAME": "Acme", "LICENSESTATUS": "Revoked"},
+        "convictions": [{"CONVICTIONID": 2, "FINE": 250}, {"CONVICTIONID": 3, "FINE": 50}],
+    }
+    changes = store.diff("builder", "B1", second)
+    assert summarize(changes) == [
+        ("convictions", "[1]", "removed", ()),
+        ("convictions", "[2]", "modified", ("FINE",)),
+        ("convictions", "[3]", "added", ()),
+        ("summary", "0", "modified", ("LICENSESTATUS",)),
+    ]
+    modified = next(c for c in changes if c["section"] == "summary")
+    assert (modified["old"]["LICENSESTATUS"], modified["new"]["LICENSESTATUS"]) == ("Licensed", "Revoked")
+
+
+def test_unkeyed_sections_report_a_change_as_removal_and_addition(store):
+    store.diff("builder", "B1", {"PDOs": [{"NAME": "A"}, {"NAME": "B"}]})
+    changes = store.diff("builder", "B1", {"PDOs": [{"NAME": "A"}, {"NAME": "C"}]})
+    assert sorted((c["change"], json.dumps(c["old"] or c["new"])) for c in changes) == [
+        ("added", '{"NAME": "C"}'), ("removed", '{"NAME": "B"}'),
+    ]
+    # Sections missing from a fetch are left alone; an empty one removes every record
+    assert store.diff("builder", "B1", {}) == []
+    assert [c["change"] for c in store.diff("builder", "B1", {"PDOs": []})] == ["removed", "removed"]
+
+
+def test_changes_are_read_back_by_seq(store):
+    store.diff("builder", "B1", {"PDOs": [{"NAME": "A"}]})
+    store.diff("builder", "B2", {"PDOs": [{"NAME": "B"}]})
+    store.commit()
+    changes = list(store.changes())
+    assert [(c["seq"], c["id"]) for c in changes] == [(1, "B1"), (2, "B2")]
+    assert [c["id"] for c in store.changes(since=changes[0]["seq"])] == ["B2"]
+
+
+def test_change_feed_against_the_api(tmp_path):
+    directory = str(tmp_path)
+    ids = builder_ids(3)
+    with MockServer(MockConfig(records=3)) as server, API(base_url=server.base_url) as api:
+        first = api.save_multiple_to_change_feed(ids, directory=directory, jsonl_filename="changes.jsonl")
+        # 8 sections: one summary and one member, 3 records in four lists, 15 in two
+        assert first == {"added": 3 * (1 + 1 + 4 * 3 + 2 * 15), "removed": 0, "modified": 0}
+        assert api.save_multiple_to_change_feed(ids, directory=directory) == {"added": 0, "removed": 0, "modified": 0}
+
+        server.config.records = 2
+        assert api.save_multiple_to_change_feed(ids, directory=directory) == {
+            "added": 0, "removed": 3 * (4 * 1 + 2 * 5), "modified": 0,
+        }
+    with open(tmp_path / "changes.jsonl", encoding="utf-8") as f:
+        assert sum(1 for _ in f) == first["added"]